@@ -1,44 +1,65 @@
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
 from PyQt5.QtWidgets import (
     QDialog,
     QVBoxLayout,
-    QFormLayout,
-    QLineEdit,
     QDialogButtonBox,
     QLabel,
-    QScrollArea,
-    QWidget,
+    QTableView,
+    QHeaderView,
+    QCheckBox,
 )
-from PIL import Image
-from PIL.ExifTags import TAGS
+
+from bulk_edit import run_bulk_edit
+from metadata_model import TagEditModel
+from metadata_session import ImageDocument, apply_edits, get_document
 
 
 class MetadataEditorDialog(QDialog):
     """
-    Dynamic EXIF editor dialog. It discovers existing EXIF entries and
-    builds editable fields for text-like values. Updates in-memory data
-    without automatically saving to the file.
+    EXIF editor dialog for one image, or for many at once.
+
+    It lists the existing EXIF entries (text, numbers and rationals) in an
+    editable table. With one image, the edits go into the shared
+    ImageDocument for the file without automatically saving it. With
+    several, only the tags they all have are listed, values that differ
+    show as mixed, and accepting leaves the changed tags in self.edits
+    for the caller to apply to every file (see bulk_edit.py).
     """
 
-    def __init__(self, parent, image_path: str):
+    def __init__(self, parent, image_paths):
         super().__init__(parent)
-        self.setWindowTitle("Edit EXIF Metadata")
-        self.image_path = image_path
+        if isinstance(image_paths, str):
+            image_paths = [image_paths]
+        self.image_paths = list(image_paths)
+        self.image_path = self.image_paths[0]
+        self.bulk = len(self.image_paths) > 1
         self.parent_window = parent  # Store reference to parent
+        self.setWindowTitle(
+            f"Edit EXIF Metadata - {len(self.image_paths)} images" if self.bulk else "Edit EXIF Metadata"
+        )
 
-        self._editors = {}  # tag_id -> (QLineEdit, was_bytes: bool)
+        self.document = None
+        self.model = None
+        self.edits = {}  # (ifd, tag_id) -> value, filled in on accept
         self._build_ui()
         self._load_existing_values()
 
     def _build_ui(self):
         layout = QVBoxLayout(self)
+        self.resize(520, 560)
+
+        # Rows are only turned into editors when a cell is edited
+        self.table = QTableView(self)
+        self.table.verticalHeader().hide()
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setEditTriggers(QTableView.AllEditTriggers)
+        self.table.setWordWrap(False)
+        layout.addWidget(self.table)
 
-        # Scrollable area for many tags
-        self.scroll = QScrollArea(self)
-        self.scroll.setWidgetResizable(True)
-        self.container = QWidget()
-        self.form = QFormLayout(self.container)
-        self.scroll.setWidget(self.container)
-        layout.addWidget(self.scroll)
+        self.overwrite_check = QCheckBox("Overwrite the originals (otherwise save *_modified copies)")
+        self.overwrite_check.setVisible(self.bulk)
+        layout.addWidget(self.overwrite_check)
 
         self.status_label = QLabel("")
         layout.addWidget(self.status_label)
@@ -52,55 +73,57 @@ class MetadataEditorDialog(QDialog):
 
     def _load_existing_values(self):
         try:
-            with Image.open(self.image_path) as img:
-                exif = img.getexif()
-                if exif:
-                    count = 0
-                    for tag_id, value in exif.items():
-                        # Only edit text-like values (str or bytes)
-                        was_bytes = False
-                        text_value = None
-                        if isinstance(value, bytes):
-                            try:
-                                text_value = value.decode("utf-8", errors="replace")
-                                was_bytes = True
-                            except Exception:
-                                continue
-                        elif isinstance(value, str):
-                            text_value = value
-                        else:
-                            # Skip non-text values for safety
-                            continue
-
-                        label = TAGS.get(tag_id, str(tag_id))
-                        editor = QLineEdit()
-                        editor.setText(text_value)
-                        self.form.addRow(label, editor)
-                        self._editors[tag_id] = (editor, was_bytes)
-                        count += 1
-
-                    if count == 0:
-                        self.status_label.setText("No text-like EXIF fields available to edit.")
-                else:
+            if self.bulk:
+                documents = [ImageDocument(path) for path in self.image_paths]
+            else:
+                # Same document the viewer uses, so the file isn't parsed again
+                # and pending edits (e.g. from Randomize) show up here
+                self.document = get_document(self.image_path)
+                documents = [self.document]
+            self.model = TagEditModel(documents, self)
+            self.model.invalid.connect(self.status_label.setText)
+            self.table.setModel(self.model)
+            self.table.setColumnWidth(0, 180)
+
+            if self.model.rowCount() == 0:
+                if not any(document.tree for document in documents):
                     self.status_label.setText("No EXIF data found.")
+                elif self.bulk:
+                    self.status_label.setText("The selected images have no editable EXIF fields in common.")
+                else:
+                    self.status_label.setText("No editable EXIF fields available.")
         except Exception as e:
             self.status_label.setText(f"Warning: Unable to read EXIF ({e})")
 
     def _on_save(self):
-        """Update the parent's in-memory EXIF data without saving to file."""
+        """Record the edited values (in the shared document, or in self.edits for bulk mode)."""
+        if self.model is None:
+            self.reject()
+            return
         try:
-            with Image.open(self.image_path) as img:
-                exif = img.getexif() or {}
-
-                # Update exif dictionary with edited values
-                for tag_id, (editor, was_bytes) in self._editors.items():
-                    text = editor.text()
-                    exif[tag_id] = text.encode("utf-8") if was_bytes else text
-
-                # Update parent's _last_exif_data instead of saving to file
-                if hasattr(self.parent_window, '_last_exif_data'):
-                    self.parent_window._last_exif_data = dict(exif)
-
+            # Only tags that actually changed end up in the diff
+            self.edits = self.model.edits()
+            if not self.bulk:
+                apply_edits(self.document, self.edits)
             self.accept()
         except Exception as e:
             self.status_label.setText(f"Error updating metadata: {e}")
+
+
+class BulkEditSignals(QObject):
+    progress = pyqtSignal(int, int)  # done, total
+    finished = pyqtSignal(list)  # [(src_path, error, mode)]
+
+
+class BulkEditTask(QRunnable):
+    """QThreadPool job applying a bulk edit diff to (src, dst) jobs."""
+
+    def __init__(self, jobs, edits):
+        super().__init__()
+        self.jobs = jobs
+        self.edits = edits
+        self.signals = BulkEditSignals()
+
+    def run(self):
+        results = run_bulk_edit(self.jobs, self.edits, progress=self.signals.progress.emit)
+        self.signals.finished.emit(results)
@@ -0,0 +1,50 @@
+"""
+Bundled files (img/, metadata.db) and the GUI's images.
+
+Paths are resolved from this file (or PyInstaller's unpack directory)
+instead of the working directory, so the app can be started from anywhere.
+Images are decoded on first use, straight to the size they're shown at,
+and cached. Nothing here imports Qt until a pixmap is asked for.
+"""
+import functools
+import os
+import sys
+
+BASE_DIR = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+
+MOON_ICON = "dark mode mod.png"
+SUN_ICON = "sun light.png"
+LOGO_DARK = "exifuscator_dark.png"
+LOGO_WHITE = "exifuscator_white.png"
+FAVICON = "favicon.png"
+
+
+def resource_path(*parts):
+    """Absolute path of a file shipped next to the code."""
+    return os.path.join(BASE_DIR, *parts)
+
+
+def image_path(name):
+    return resource_path("img", name)
+
+
+@functools.lru_cache(maxsize=None)
+def pixmap(name, height=None):
+    """
+    img/<name> as a QPixmap, smoothly scaled to height (keeping the aspect
+    ratio), cached per (name, height).
+
+    Returns:
+        QPixmap; a null one if the file is missing or unreadable
+    """
+    from PyQt5.QtCore import QSize
+    from PyQt5.QtGui import QImageReader, QPixmap
+
+    reader = QImageReader(image_path(name))
+    if height is not None:
+        # Scale while reading, the full-size image is never kept around
+        size = reader.size()
+        if size.isValid() and size.height() > 0:
+            height = int(height)
+            reader.setScaledSize(QSize(max(1, round(size.width() * height / size.height())), height))
+    return QPixmap.fromImage(reader.read())
@@ -0,0 +1,269 @@
+"""
+Minimal asyncio HTTP/1.1 client with keep-alive connection pooling.
+
+Only what the remote scrubber needs: streaming response bodies
+(Content-Length, chunked or read-to-close), request bodies from bytes or
+an async iterator, and a small pool of idle connections per host so
+hundreds of range requests don't pay for a TCP/TLS handshake each.
+"""
+import asyncio
+import ssl
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+READ_CHUNK = 256 * 1024
+MAX_HEADER_LINES = 200
+
+
+class HttpError(Exception):
+    """Raised for malformed responses and unexpected status codes."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class Response:
+    """
+    Status, headers and a streaming body.
+
+    The body must be consumed (read() or iter_chunks()) or the response
+    closed; only then does the connection go back to the pool.
+    """
+
+    def __init__(self, pool, key, reader, writer, status, reason, headers, method):
+        self.pool = pool
+        self.key = key
+        self.reader = reader
+        self.writer = writer
+        self.status = status
+        self.reason = reason
+        self.headers = headers  # lower-case names
+        self._done = False
+        self._keep_alive = headers.get("connection", "").lower() != "close"
+
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            self._remaining = 0
+            self._chunked = False
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            self._remaining = None
+            self._chunked = True
+        elif "content-length" in headers:
+            self._remaining = int(headers["content-length"])
+            self._chunked = False
+        else:
+            self._remaining = None  # read until the server closes
+            self._chunked = False
+            self._keep_alive = False
+        if self._remaining == 0:
+            self._finish()
+
+    async def iter_chunks(self):
+        """Yield the body in chunks as it arrives."""
+        try:
+            if self._chunked:
+                async for chunk in self._iter_chunked():
+                    yield chunk
+            elif self._remaining is None:
+                while True:
+                    chunk = await self.reader.read(READ_CHUNK)
+                    if not chunk:
+                        break
+                    yield chunk
+            else:
+                while self._remaining > 0:
+                    chunk = await self.reader.read(min(READ_CHUNK, self._remaining))
+                    if not chunk:
+                        raise HttpError("Connection closed before the body was complete")
+                    self._remaining -= len(chunk)
+                    yield chunk
+        except BaseException:
+            self.close()
+            raise
+        self._finish()
+
+    async def _iter_chunked(self):
+        while True:
+            size_line = await self.reader.readline()
+            try:
+                size = int(size_line.split(b";", 1)[0].strip(), 16)
+            except ValueError:
+                raise HttpError(f"Bad chunk size line: {size_line!r}") from None
+            if size == 0:
+                # Trailers end with an empty line
+                while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return
+            remaining = size
+            while remaining > 0:
+                chunk = await self.reader.read(min(READ_CHUNK, remaining))
+                if not chunk:
+                    raise HttpError("Connection closed inside a chunk")
+                remaining -= len(chunk)
+                yield chunk
+            await self.reader.readline()  # CRLF after the chunk
+
+    async def read(self, limit=None):
+        """
+        The whole body (or its first `limit` bytes, after which the
+        connection is closed rather than drained).
+        """
+        parts = []
+        size = 0
+        async for chunk in self.iter_chunks():
+            parts.append(chunk)
+            size += len(chunk)
+            if limit is not None and size >= limit and not self._done:
+                self.close()
+                break
+        return b"".join(parts)
+
+    def _finish(self):
+        if not self._done:
+            self._done = True
+            self.pool.release(self.key, self.reader, self.writer, self._keep_alive)
+
+    def close(self):
+        """Drop the connection without reading the rest of the body."""
+        if not self._done:
+            self._done = True
+            self.pool.release(self.key, self.reader, self.writer, False)
+
+
+class ConnectionPool:
+    """
+    Idle keep-alive connections per (scheme, host, port).
+
+    Args:
+        limit_per_host: max open connections to one host; further
+            requests wait for a free one
+    """
+
+    def __init__(self, limit_per_host=8):
+        self.limit_per_host = limit_per_host
+        self.idle = defaultdict(list)
+        self.slots = defaultdict(lambda: asyncio.Semaphore(limit_per_host))
+        self.ssl_context = ssl.create_default_context()
+
+    async def acquire(self, key):
+        await self.slots[key].acquire()
+        while self.idle[key]:
+            reader, writer = self.idle[key].pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        scheme, host, port = key
+        try:
+            reader, writer = await asyncio.open_connection(
+                host, port, ssl=self.ssl_context if scheme == "https" else None,
+            )
+        except BaseException:
+            self.slots[key].release()
+            raise
+        return reader, writer, False
+
+    def release(self, key, reader, writer, reusable):
+        if reusable and not writer.is_closing():
+            self.idle[key].append((reader, writer))
+        else:
+            writer.close()
+        self.slots[key].release()
+
+    async def close(self):
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle.clear()
+
+
+class HttpClient:
+    """
+    Pooled HTTP/1.1 client.
+
+    Usage:
+        client = HttpClient()
+        response = await client.request("GET", url, {"Range": "bytes=0-65535"})
+        head = await response.read()
+    """
+
+    def __init__(self, limit_per_host=8, user_agent="exifuscator"):
+        self.pool = ConnectionPool(limit_per_host)
+        self.user_agent = user_agent
+
+    async def request(self, method, url, headers=None, body=None, content_length=None):
+        """
+        Send a request and return the Response once its headers arrived.
+
+        Args:
+            body: bytes, or an async iterator of bytes (then
+                content_length is required, the body is streamed)
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https"):
+            raise HttpError(f"Unsupported URL scheme: {url}")
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+        headers = dict(headers or {})
+        lower = {name.lower() for name in headers}
+        if "host" not in lower:
+            default_port = 443 if scheme == "https" else 80
+            headers["Host"] = parts.hostname if port == default_port else f"{parts.hostname}:{port}"
+        if "user-agent" not in lower:
+            headers["User-Agent"] = self.user_agent
+        if isinstance(body, (bytes, bytearray)):
+            content_length = len(body)
+        if body is not None or method in ("PUT", "POST"):
+            headers["Content-Length"] = str(content_length or 0)
+
+        head = f"{method} {target} HTTP/1.1\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        head = (head + "\r\n").encode("latin-1")
+
+        # A reused connection may have been closed by the server meanwhile;
+        # retry once on a fresh one when nothing of the body was sent yet
+        for attempt in range(2):
+            reader, writer, reused = await self.pool.acquire(key)
+            try:
+                writer.write(head)
+                if isinstance(body, (bytes, bytearray)):
+                    writer.write(body)
+                elif body is not None:
+                    async for chunk in body:
+                        writer.write(chunk)
+                        await writer.drain()
+                await writer.drain()
+                status, reason, response_headers = await _read_head(reader)
+                return Response(self.pool, key, reader, writer, status, reason, response_headers, method)
+            except (ConnectionError, asyncio.IncompleteReadError, HttpError) as e:
+                self.pool.release(key, reader, writer, False)
+                retryable = reused and attempt == 0 and (body is None or isinstance(body, (bytes, bytearray)))
+                if not retryable:
+                    raise HttpError(f"{method} {url}: {e}") from e
+            except BaseException:
+                self.pool.release(key, reader, writer, False)
+                raise
+
+    async def close(self):
+        await self.pool.close()
+
+
+async def _read_head(reader):
+    line = await reader.readline()
+    if not line:
+        raise HttpError("Connection closed before the response")
+    try:
+        version, status, *reason = line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        status = int(status)
+    except ValueError:
+        raise HttpError(f"Bad status line: {line!r}") from None
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            return status, reason[0] if reason else "", headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    raise HttpError("Too many response headers")
@@ -0,0 +1,493 @@
+"""
+Headless batch obfuscation.
+
+Runs the same randomize + save logic as the GUI over whole directories,
+spread across a process pool.
+
+Usage:
+    python main.py batch PHOTOS/ "more/*.jpg" -o scrubbed/
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+import instrumentation
+from exif_blocks import MAKERNOTE_MODES, THUMBNAIL_MODES, BlockSettings
+from gps_obfuscation import MODES as GPS_MODES, GpsSettings
+from obfuscate import DB_PATH, scrub_files
+from scrub_index import ScrubIndex, fingerprint, policy_key
+from scrub_policy import PolicyError, load_policy
+from time_shift import SCOPES as TIME_SCOPES, TimeSettings
+from verify import VerifyRules, check_output, snapshot
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".tiff", ".tif", ".webp", ".heic", ".heif", ".bmp", ".gif"}
+
+
+def _is_within(path, directory):
+    """True if path is directory or inside it (not just sharing a name prefix, like out_raw/ and out/)."""
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+def iter_input_files(patterns, recursive=True, exclude_dir=None, skip_suffix=None):
+    """
+    Expand directories and glob patterns into (path, base_dir) pairs.
+
+    base_dir is the directory the relative output path is computed from,
+    so a scrubbed tree keeps the same layout as the input tree. Anything
+    under exclude_dir (normally the output directory) is skipped, and so
+    are files whose name ends in skip_suffix (outputs an earlier run wrote
+    next to the originals). Files named explicitly are always kept.
+    """
+    exclude_dir = os.path.abspath(exclude_dir) if exclude_dir else None
+
+    def is_output(path):
+        if exclude_dir and _is_within(os.path.abspath(path), exclude_dir):
+            return True
+        return bool(skip_suffix) and os.path.splitext(os.path.basename(path))[0].endswith(skip_suffix)
+
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            walker = os.walk(pattern) if recursive else [(pattern, [], os.listdir(pattern))]
+            for root, _, names in walker:
+                if exclude_dir and _is_within(os.path.abspath(root), exclude_dir):
+                    continue
+                for name in sorted(names):
+                    path = os.path.join(root, name)
+                    if os.path.splitext(name)[1].lower() not in IMAGE_EXTENSIONS or is_output(path):
+                        continue
+                    if path not in seen:
+                        seen.add(path)
+                        yield path, pattern
+        else:
+            explicit = glob.escape(pattern) == pattern
+            for path in sorted(glob.glob(pattern, recursive=recursive)):
+                if os.path.isfile(path) and path not in seen and (explicit or not is_output(path)):
+                    seen.add(path)
+                    yield path, os.path.dirname(path)
+
+
+def _glob_base(pattern):
+    """The directory part of a glob pattern before its first wildcard."""
+    base = os.path.dirname(pattern)
+    while glob.escape(base) != base:
+        base = os.path.dirname(base)
+    return base or os.curdir
+
+
+def input_root(patterns):
+    """
+    Deepest directory holding every input, which seed keys are relative to.
+
+    Returns:
+        absolute path, or None if the inputs share no directory (e.g. on
+        different drives)
+    """
+    roots = [os.path.abspath(p if os.path.isdir(p) else _glob_base(p)) for p in patterns]
+    try:
+        return os.path.commonpath(roots)
+    except ValueError:
+        return None
+
+
+def output_path_for(path, base_dir, output_dir, suffix="_modified"):
+    """Where the scrubbed copy of path goes (same naming as the GUI's save dialog)."""
+    name, ext = os.path.splitext(os.path.basename(path))
+    if output_dir is None:
+        return os.path.join(os.path.dirname(path), f"{name}{suffix}{ext}")
+    rel_dir = os.path.relpath(os.path.dirname(path), base_dir)
+    return os.path.normpath(os.path.join(output_dir, rel_dir, f"{name}{suffix}{ext}"))
+
+
+def init_worker(trace_path):
+    """Pool initializer when --trace/--metrics is on; forked workers start from clean counters."""
+    instrumentation.disable()
+    instrumentation.reset()
+    instrumentation.enable(trace_path)
+
+
+def _scrub_task(chunk, db_path, seed, gps, policy, in_place=False, backup=False, blocks=None,
+                dates=None, want_fingerprint=False, verify=False, reencode=False, root=None):
+    """
+    Worker entry point: scrub a chunk of (src, dst) jobs.
+
+    Returns:
+        (results, timings): results is a list of (src_path, error_message,
+        bytes_in, bytes_out, lossless, fingerprint, check); error_message
+        is None on success, fingerprint is the source's (size, mtime_ns)
+        after the run when asked for, and check is (problems, bytes_hashed,
+        payload_compared, seconds) with verify on, else None. timings is
+        instrumentation.drain()
+    """
+    for _, dst_path in chunk:
+        os.makedirs(os.path.dirname(os.path.abspath(dst_path)), exist_ok=True)
+    before = {}
+    verify_seconds = 0.0
+    if verify:
+        # Taken first: in-place runs overwrite the originals
+        started = time.perf_counter()
+        for src_path, _ in chunk:
+            try:
+                before[src_path] = snapshot(src_path)
+            except Exception:
+                pass  # unreadable; scrubbing it fails too
+        verify_seconds = time.perf_counter() - started
+        rules = VerifyRules(load_policy(policy), gps, dates, blocks)
+    out = []
+    results = scrub_files(chunk, db_path, seed, gps, policy, in_place, backup, blocks, dates, reencode, root)
+    for (src_path, dst_path), (_, error, lossless) in zip(chunk, results):
+        if error is not None:
+            out.append((src_path, str(error), 0, 0, False, None, None))
+            continue
+        try:
+            stamp = fingerprint(src_path) if want_fingerprint else None
+        except OSError:
+            stamp = None
+        check = None
+        if src_path in before:
+            started = time.perf_counter()
+            problems, hashed, compared = check_output(before[src_path], dst_path, rules, lossless)
+            # The snapshots' time is spread over the chunk
+            seconds = time.perf_counter() - started + verify_seconds / len(before)
+            check = (problems, hashed, compared, seconds)
+        out.append((src_path, None, os.path.getsize(src_path), os.path.getsize(dst_path), lossless, stamp, check))
+    return out, instrumentation.drain()
+
+
+class BatchStats:
+    """Counters for the end-of-run throughput summary."""
+
+    def __init__(self):
+        self.ok = 0
+        self.failed = 0
+        self.reencoded = 0
+        self.skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.verified = 0
+        self.verify_failed = 0
+        self.payload_unchecked = 0
+        self.verify_bytes = 0
+        self.verify_seconds = 0.0  # summed over the workers
+        self.stages = []  # (name, workers, unit, busy seconds) from a pipelined run
+        self.started = time.perf_counter()
+
+    def add_check(self, check):
+        """Count one file's verification result (see _scrub_task)."""
+        problems, hashed, compared, seconds = check
+        self.verified += 1
+        self.verify_failed += bool(problems)
+        self.payload_unchecked += not compared
+        self.verify_bytes += hashed
+        self.verify_seconds += seconds
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        mb = self.bytes_in / (1024 * 1024)
+        line = (
+            f"{self.ok} scrubbed, {self.failed} failed, {self.reencoded} re-encoded, {self.skipped} unchanged "
+            f"in {elapsed:.2f}s ({self.ok / elapsed:.1f} files/s, {mb / elapsed:.1f} MB/s)"
+        )
+        if self.verified:
+            verify_mb = self.verify_bytes / (1024 * 1024)
+            line += (
+                f"\nverified {self.verified}: {self.verified - self.verify_failed} passed, "
+                f"{self.verify_failed} failed, {self.payload_unchecked} without an image data check; "
+                f"hashed {verify_mb:.1f} MB at {verify_mb / max(self.verify_seconds, 1e-9):.1f} MB/s per worker"
+            )
+        if self.stages:
+            # Busy share of each stage's workers; the busiest one sets the pace
+            usage = [(busy / (elapsed * workers), name, workers, unit) for name, workers, unit, busy in self.stages]
+            line += "\nstages: " + ", ".join(
+                f"{name} {share:.0%} of {workers} {unit}" for share, name, workers, unit in usage
+            )
+            if max(usage)[0] > 0:
+                line += f" (bottleneck: {max(usage)[1]})"
+        return line
+
+
+def skip_current(jobs, index, key, stats):
+    """The (src, dst) jobs index doesn't list as scrubbed with key; skipped ones are counted."""
+    for src, dst in jobs:
+        if index.is_current(src, dst, key):
+            stats.skipped += 1
+        else:
+            yield src, dst
+
+
+def record_results(stats, finished, index=None, key=None, log=print):
+    """
+    Count finished files and add the scrubbed ones to the index.
+
+    Args:
+        finished: (dst_path, result) pairs; result as returned per file by _scrub_task
+    """
+    indexed = []
+    for dst, (src, error, size_in, size_out, lossless, stamp, check) in finished:
+        if error is not None:
+            stats.failed += 1
+            log(f"FAILED {src}: {error}")
+            continue
+        stats.ok += 1
+        stats.bytes_in += size_in
+        stats.bytes_out += size_out
+        if not lossless:
+            stats.reencoded += 1
+        if check is not None:
+            stats.add_check(check)
+            if check[0]:
+                log(f"VERIFY FAILED {dst}: {'; '.join(check[0])}")
+                continue  # not indexed, so the next run tries again
+        if stamp is not None:
+            indexed.append((src, dst, stamp))
+    if index is not None and indexed:
+        index.record_many(indexed, key)
+
+
+def run_batch(jobs, workers=None, max_in_flight=None, db_path=DB_PATH, seed=None,
+              gps=None, policy=None, chunk_size=16, in_place=False, backup=False,
+              blocks=None, dates=None, index=None, trace=None, verify=False, reencode=False, root=None,
+              log=print):
+    """
+    Scrub (src, dst) jobs on a process pool.
+
+    Args:
+        jobs: iterable of (src_path, dst_path); consumed lazily
+        workers: pool size, defaults to the core count
+        max_in_flight: cap on submitted-but-unfinished tasks, so huge
+            directory listings don't pile up futures in memory
+        seed: seed for reproducible values (each file is seeded from it
+            and its path relative to root, so worker scheduling doesn't matter)
+        gps: GpsSettings for location obfuscation (None: the policy's)
+        policy: path of a JSON scrub policy; workers compile it once
+        chunk_size: files per task; each chunk's GPS positions are
+            obfuscated in one vectorized pass
+        in_place: patch files whose dst is the source itself without
+            rewriting them, when the edits fit
+        backup: write an undo file next to every file patched in place
+        blocks: BlockSettings for thumbnails and MakerNotes (None: the policy's)
+        dates: TimeSettings, resolved here so every worker uses the same
+            offsets (None: the policy's)
+        index: ScrubIndex; files it lists as already scrubbed with this
+            policy are skipped, and scrubbed files are added to it
+        trace: time every step in the workers and merge the timings into
+            this process's instrumentation counters. True, or a path the
+            workers also append JSON-lines spans to
+        verify: check every output against its original (see verify.py);
+            files that fail are logged and counted in stats.verify_failed
+        reencode: re-encode files that can't be saved losslessly (format
+            changes, damaged containers) instead of failing them
+        root: input root for the seed keys (see input_root)
+        log: callable used for per-file error lines
+
+    Returns:
+        BatchStats
+    """
+    workers = workers or os.cpu_count() or 1
+    dates = dates or load_policy(policy).time
+    max_in_flight = max_in_flight or workers * 4
+    stats = BatchStats()
+    jobs = iter(jobs)
+    key = None
+    if index is not None:
+        key = policy_key(load_policy(policy), gps, dates, blocks)
+        jobs = skip_current(jobs, index, key, stats)
+
+    initializer, initargs = None, ()
+    if trace:
+        initializer, initargs = init_worker, (trace if isinstance(trace, str) else None,)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+        pending = {}
+
+        def fill():
+            while len(pending) < max_in_flight:
+                chunk = list(islice(jobs, chunk_size))
+                if not chunk:
+                    return
+                try:
+                    future = pool.submit(_scrub_task, chunk, db_path, seed, gps, policy, in_place, backup,
+                                         blocks, dates, index is not None, verify, reencode, root)
+                except BrokenProcessPool as e:
+                    # A worker died and took the pool down; the remaining chunks fail the same way
+                    future = Future()
+                    future.set_exception(e)
+                pending[future] = chunk
+
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = pending.pop(future)
+                try:
+                    results, timings = future.result()
+                    instrumentation.merge(timings)
+                except Exception as e:
+                    # The worker itself died; every file in the chunk failed
+                    results = [(src, str(e), 0, 0, False, None, None) for src, _ in chunk]
+                record_results(stats, [(dst, result) for (_, dst), result in zip(chunk, results)], index, key, log)
+            fill()
+
+    return stats
+
+
+def add_gps_arguments(parser):
+    """Policy, location and thumbnail/MakerNote options, shared by the headless commands."""
+    parser.add_argument("--policy", help="JSON scrub policy (default: randomize the common tags)")
+    parser.add_argument("--gps", choices=GPS_MODES, help="location handling (default: the policy's, else snap)")
+    parser.add_argument("--gps-cell", type=float, default=0.01, help="grid cell in degrees for --gps snap (default: %(default)s)")
+    parser.add_argument("--gps-jitter", type=float, default=500.0, help="max offset in meters for --gps jitter (default: %(default)s)")
+    parser.add_argument("--time-shift", type=float, metavar="DAYS", help="shift every date by one random offset of up to DAYS (0 = off; default: the policy's)")
+    parser.add_argument("--time-scope", choices=TIME_SCOPES, help="one offset per batch or per album/directory (default: the policy's, else batch)")
+    parser.add_argument("--thumbnail", choices=THUMBNAIL_MODES, help="embedded thumbnail handling (default: the policy's, else strip)")
+    parser.add_argument("--makernote", choices=MAKERNOTE_MODES, help="MakerNote handling (default: the policy's, else keep)")
+    parser.add_argument("--allow-reencode", action="store_true", help="re-encode images that can't be saved losslessly instead of failing them")
+
+
+def add_trace_arguments(parser):
+    """Timing options, shared by the headless commands."""
+    parser.add_argument("--trace", metavar="FILE", help="append a JSON line per timed step (file open, EXIF parse, save, ...) to FILE")
+    parser.add_argument("--metrics", metavar="FILE", help="write per-step timings to FILE in the Prometheus text format")
+
+
+def trace_from_args(args):
+    """
+    Turn instrumentation on for --trace / --metrics.
+
+    Returns:
+        the --trace path, True for --metrics alone, or None when both are off
+    """
+    if not args.trace and not args.metrics:
+        return None
+    instrumentation.enable(args.trace)
+    return args.trace or True
+
+
+def write_metrics(args):
+    """Write the --metrics file, if one was asked for."""
+    if args.metrics:
+        instrumentation.write_prometheus(args.metrics)
+
+
+def gps_settings_from_args(args):
+    """GpsSettings from --gps, or None to use the policy's."""
+    if args.gps is None:
+        return None
+    return GpsSettings(args.gps, args.gps_cell, args.gps_jitter)
+
+
+def time_settings_from_args(args):
+    """TimeSettings from --time-shift / --time-scope / --seed, falling back to the policy's."""
+    settings = load_policy(args.policy).time
+    if args.time_shift is not None or args.time_scope is not None:
+        settings = TimeSettings(
+            max(0.0, args.time_shift) if args.time_shift is not None else (settings.max_days if settings else 365),
+            args.time_scope or (settings.scope if settings else "batch"),
+        )
+    if settings is not None and args.seed is not None:
+        settings = TimeSettings(settings.max_days, settings.scope, args.seed)
+    return settings
+
+
+def block_settings_from_args(args):
+    """BlockSettings from --thumbnail / --makernote, or None to use the policy's."""
+    if args.thumbnail is None and args.makernote is None:
+        return None
+    policy_blocks = load_policy(args.policy).blocks or BlockSettings()
+    return BlockSettings(args.thumbnail or policy_blocks.thumbnail, args.makernote or policy_blocks.makernote)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="exifuscator batch",
+        description="Randomize EXIF metadata of many images without the GUI.",
+    )
+    parser.add_argument("inputs", nargs="+", help="image files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", help="write scrubbed copies here (default: next to the originals)")
+    parser.add_argument("--suffix", default="_modified", help="added to output file names (default: %(default)s)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: core count)")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="max queued tasks (default: 4 x workers)")
+    parser.add_argument("--no-recursive", action="store_true", help="don't descend into subdirectories")
+    parser.add_argument("--db", default=DB_PATH, help="metadata database (default: %(default)s)")
+    parser.add_argument("--seed", help="seed for reproducible runs (same seed, same values)")
+    parser.add_argument("--in-place", action="store_true", help="modify the originals; same-length edits only touch the changed bytes")
+    parser.add_argument("--backup", action="store_true", help="with --in-place, keep a small .exif-undo file per patched image")
+    parser.add_argument("--index", metavar="FILE", help="SQLite file remembering scrubbed files; unchanged ones are skipped on later runs")
+    parser.add_argument("--chunk-size", type=int, default=16, help="files per worker task (default: %(default)s)")
+    parser.add_argument("--verify", action="store_true", help="check that every output kept its image data and follows the policy")
+    parser.add_argument("--pipeline", action="store_true", help="overlap reading, scrubbing and writing in separate stages (see pipeline.py)")
+    parser.add_argument("--readers", type=int, default=4, help="with --pipeline, threads reading the sources (default: %(default)s)")
+    parser.add_argument("--writers", type=int, default=4, help="with --pipeline, threads writing the outputs (default: %(default)s)")
+    parser.add_argument("--queue-size", type=int, default=None, help="with --pipeline, files queued between stages (default: chunk size x workers)")
+    parser.add_argument("--max-buffer", type=int, default=512, metavar="MB", help="with --pipeline, max file contents held in memory (default: %(default)s)")
+    add_gps_arguments(parser)
+    add_trace_arguments(parser)
+    return parser
+
+
+def main(argv=None):
+    """Command line entry point. Returns a process exit code."""
+    args = build_parser().parse_args(argv)
+    try:
+        load_policy(args.policy)  # fail before starting workers
+    except (OSError, PolicyError) as e:
+        print(f"Bad policy: {e}", file=sys.stderr)
+        return 2
+
+    if args.in_place and args.output_dir:
+        print("--in-place and --output-dir can't be combined", file=sys.stderr)
+        return 2
+    if args.pipeline and args.in_place:
+        print("--pipeline writes whole new files; it can't be combined with --in-place", file=sys.stderr)
+        return 2
+
+    jobs = (
+        (path, path if args.in_place else output_path_for(path, base, args.output_dir, args.suffix))
+        for path, base in iter_input_files(args.inputs, not args.no_recursive, args.output_dir,
+                                           None if args.in_place or args.output_dir else args.suffix)
+    )
+    index = ScrubIndex(args.index) if args.index else None
+    trace = trace_from_args(args)
+    settings = dict(
+        workers=args.workers,
+        db_path=os.path.abspath(args.db),
+        seed=args.seed,
+        gps=gps_settings_from_args(args),
+        policy=args.policy,
+        chunk_size=max(1, args.chunk_size),
+        blocks=block_settings_from_args(args),
+        dates=time_settings_from_args(args),
+        index=index,
+        trace=trace,
+        verify=args.verify,
+        reencode=args.allow_reencode,
+        root=input_root(args.inputs),
+        log=lambda line: print(line, file=sys.stderr),
+    )
+    if args.pipeline:
+        from pipeline import run_pipeline  # it builds on this module
+        stats = run_pipeline(
+            jobs,
+            readers=max(1, args.readers),
+            writers=max(1, args.writers),
+            queue_size=args.queue_size,
+            max_buffered=args.max_buffer * 1024 * 1024,
+            **settings,
+        )
+    else:
+        stats = run_batch(jobs, max_in_flight=args.max_in_flight, in_place=args.in_place,
+                          backup=args.backup, **settings)
+    if index is not None:
+        index.close()
+    write_metrics(args)
+    print(stats.summary())
+    return 1 if stats.failed or stats.verify_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+Benchmark harness for the metadata pipeline.
+
+Times the four steps the GUI runs for every image - read (what
+extract_and_display_metadata does), randomize, edit and save (what
+save_image does) - over the bundled sample images plus synthetic
+variants: a large re-encoded photo and one with hundreds of extra tags.
+
+Results are written as JSON so runs from two commits can be compared:
+
+    python main.py bench -o before.json
+    (change something)
+    python main.py bench -o after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from PIL import Image
+
+from exif_writer import save_with_exif
+from instrumentation import percentile
+from metadata_session import ImageDocument
+from obfuscate import randomize_document
+from value_provider import DB_PATH, ValueProvider
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CORPUS_DIRS = ("Image Tests (MetaData)", "Image tests (No metadata)")
+STAGES = ("read", "randomize", "edit", "save")
+SCHEMA_VERSION = 1
+
+LARGE_SIZE = (6000, 4000)
+EXTRA_TAGS = 400
+EXTRA_TAG_BASE = 0xC000  # private tag range, ignored by readers that don't know it
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes
+
+
+def io_counters():
+    """(bytes read, bytes written) by this process so far, from /proc (Linux only)."""
+    try:
+        with open("/proc/self/io") as fp:
+            fields = dict(line.split(":") for line in fp)
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def corpus_files(dirs=CORPUS_DIRS):
+    files = []
+    for directory in dirs:
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if os.path.splitext(name)[1].lower() in (".jpg", ".jpeg", ".png", ".tif", ".tiff"):
+                files.append(os.path.join(directory, name))
+    return files
+
+
+def make_synthetic(source, work_dir):
+    """
+    Build the synthetic variants from one sample image.
+
+    Returns:
+        list of paths: a LARGE_SIZE re-encode and a copy with EXTRA_TAGS
+        additional ASCII tags, both carrying the source's EXIF
+    """
+    name = os.path.splitext(os.path.basename(source))[0]
+    with Image.open(source) as img:
+        exif = img.getexif()
+        large_path = os.path.join(work_dir, f"{name}_large.jpg")
+        img.convert("RGB").resize(LARGE_SIZE).save(large_path, "JPEG", quality=90, exif=exif)
+
+        many_tags = Image.Exif()
+        many_tags.load(exif.tobytes())  # a real copy, sub-IFDs included
+        for i in range(EXTRA_TAGS):
+            many_tags[EXTRA_TAG_BASE + i] = f"benchmark tag {i:04d}"
+        tags_path = os.path.join(work_dir, f"{name}_many_tags.jpg")
+        img.convert("RGB").save(tags_path, "JPEG", quality=90, exif=many_tags)
+    return [large_path, tags_path]
+
+
+class StageTimer:
+    """Collects latencies and I/O per stage for one file."""
+
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+        self.io = {stage: [0, 0] for stage in STAGES}
+
+    def run(self, stage, func):
+        io_before = io_counters()
+        start = time.perf_counter()
+        result = func()
+        self.samples[stage].append(time.perf_counter() - start)
+        io_after = io_counters()
+        if io_before and io_after:
+            self.io[stage][0] += io_after[0] - io_before[0]
+            self.io[stage][1] += io_after[1] - io_before[1]
+        return result
+
+    def summary(self):
+        out = {}
+        for stage in STAGES:
+            samples = self.samples[stage]
+            out[stage] = {
+                "n": len(samples),
+                "p50_ms": round(percentile(samples, 50) * 1000, 4),
+                "p99_ms": round(percentile(samples, 99) * 1000, 4),
+                "mean_ms": round(sum(samples) / len(samples) * 1000, 4) if samples else 0.0,
+                "bytes_read": self.io[stage][0],
+                "bytes_written": self.io[stage][1],
+            }
+        return out
+
+
+def bench_file(path, out_dir, provider, iterations):
+    """Time read -> randomize -> edit -> save for one file, `iterations` times."""
+    timer = StageTimer()
+    dst = os.path.join(out_dir, "out" + os.path.splitext(path)[1])
+    for i in range(iterations):
+        provider.reseed(f"{os.path.basename(path)}:{i}")
+        document = timer.run("read", lambda: ImageDocument(path))
+        timer.run("randomize", lambda: randomize_document(document, provider))
+
+        def edit():
+            document.set(270, "benchmark edit")  # ImageDescription
+            return document.build_exif()
+        exif = timer.run("edit", edit)
+        timer.run("save", lambda: save_with_exif(path, dst, exif, reencode=True))
+    return timer.summary()
+
+
+def run_benchmark(files, iterations=20, db_path=DB_PATH, synthetic=True, log=print):
+    """
+    Benchmark every file (plus synthetic variants) and return the results dict.
+    """
+    provider = ValueProvider(db_path, seed="benchmark")
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="exif-bench-") as work_dir:
+        targets = [(path, os.path.basename(path)) for path in files]
+        if synthetic and files:
+            jpegs = [path for path in files if path.lower().endswith((".jpg", ".jpeg"))]
+            for path in make_synthetic((jpegs or files)[0], work_dir):
+                targets.append((path, "synthetic/" + os.path.basename(path)))
+
+        for path, label in targets:
+            log(f"{label} ...")
+            stages = bench_file(path, work_dir, provider, iterations)
+            results[label] = {"size": os.path.getsize(path), "stages": stages}
+    provider.close()
+
+    return {
+        "schema": SCHEMA_VERSION,
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pillow": Image.__version__,
+        "iterations": iterations,
+        "peak_rss_kb": peak_rss_kb(),
+        "files": results,
+    }
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Compare p50 latencies of two result dicts.
+
+    Returns:
+        (lines, regressions): human-readable rows and how many stages got
+        slower by more than threshold (a fraction, 0.10 = 10%)
+    """
+    lines = [f"{'file':<44} {'stage':<10} {'before':>10} {'after':>10} {'change':>8}"]
+    regressions = 0
+    for label, entry in current["files"].items():
+        old = baseline.get("files", {}).get(label)
+        if old is None:
+            continue
+        for stage in STAGES:
+            before = old["stages"].get(stage, {}).get("p50_ms")
+            after = entry["stages"][stage]["p50_ms"]
+            if not before:
+                continue
+            change = (after - before) / before
+            flag = ""
+            if change > threshold:
+                regressions += 1
+                flag = "  SLOWER"
+            lines.append(f"{label[:44]:<44} {stage:<10} {before:>9.3f}ms {after:>9.3f}ms {change:>+7.1%}{flag}")
+    return lines, regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="exifuscator bench",
+        description="Time metadata read, randomize, edit and save over the sample images.",
+    )
+    parser.add_argument("inputs", nargs="*", help="images to benchmark (default: the bundled samples)")
+    parser.add_argument("-n", "--iterations", type=int, default=20, help="runs per file (default: %(default)s)")
+    parser.add_argument("-o", "--output", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against an earlier results file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="p50 slowdown counted as a regression (default: %(default)s)")
+    parser.add_argument("--no-synthetic", action="store_true", help="skip the large and many-tag variants")
+    parser.add_argument("--db", default=DB_PATH, help="metadata database (default: %(default)s)")
+    return parser
+
+
+def main(argv=None):
+    """Command line entry point. Returns 1 if --compare found regressions."""
+    args = build_parser().parse_args(argv)
+    files = args.inputs or corpus_files()
+    log = lambda line: print(line, file=sys.stderr)
+    results = run_benchmark(files, max(1, args.iterations), os.path.abspath(args.db),
+                            not args.no_synthetic, log)
+
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(results, fp, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)
+        lines, regressions = compare(baseline, results, args.threshold)
+        for line in lines:
+            log(line)
+        log(f"{regressions} regression(s) above {args.threshold:.0%} "
+            f"(baseline {baseline.get('commit')}, current {results['commit']})")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
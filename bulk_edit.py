@@ -0,0 +1,91 @@
+"""
+Apply one set of tag edits to many images.
+
+The editor dialog's bulk mode produces a diff ({(ifd, tag_id): value}),
+and every file gets exactly that diff on top of its own EXIF. Files are
+saved through the same lossless path as the GUI's Save Image (patched
+in place when the edits fit) on a process pool.
+"""
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from exif_blocks import BlockSettings, build_payload, patch_blocks_in_place
+from exif_patch import PatchError
+from exif_writer import save_with_exif
+from metadata_session import ImageDocument, apply_edits
+from scrub_policy import load_policy
+
+
+def edit_files(jobs, edits, blocks=None):
+    """
+    Apply edits to (src, dst) jobs one after the other.
+
+    Args:
+        edits: {(ifd, tag_id): value}
+        blocks: BlockSettings (default: the built-in policy's, like Save Image)
+
+    Returns:
+        list of (src_path, error, mode); error is None on success and mode
+        is "patched in place", "lossless" or "re-encoded"
+    """
+    blocks = blocks or load_policy().blocks or BlockSettings()
+    results = []
+    for src_path, dst_path in jobs:
+        try:
+            document = ImageDocument(src_path)
+            apply_edits(document, edits)
+            mode = None
+            if os.path.abspath(dst_path) == document.path:
+                try:
+                    patch_blocks_in_place(document, blocks)
+                    mode = "patched in place"
+                except PatchError:
+                    pass  # doesn't fit, rewrite the file
+            if mode is None:
+                lossless = save_with_exif(src_path, dst_path, build_payload(document, blocks), reencode=True)
+                mode = "lossless" if lossless else "re-encoded"
+            results.append((src_path, None, mode))
+        except Exception as e:
+            results.append((src_path, str(e), None))
+    return results
+
+
+def run_bulk_edit(jobs, edits, workers=None, chunk_size=8, blocks=None, progress=None):
+    """
+    Apply edits to (src, dst) jobs on a process pool.
+
+    Args:
+        progress: called with (done, total) after every finished chunk
+
+    Returns:
+        list of (src_path, error, mode) in no particular order
+    """
+    jobs = list(jobs)
+    workers = min(workers or os.cpu_count() or 1, max(1, len(jobs) // chunk_size))
+    results = []
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+    if workers == 1:
+        # Not worth starting processes for a handful of files
+        for chunk in chunks:
+            results.extend(edit_files(chunk, edits, blocks))
+            if progress:
+                progress(len(results), len(jobs))
+        return results
+
+    # Called from the GUI: forking a process that runs Qt threads isn't safe
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        pending = {pool.submit(edit_files, chunk, edits, blocks): chunk for chunk in chunks}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = pending.pop(future)
+                try:
+                    results.extend(future.result())
+                except Exception as e:
+                    # The worker itself died; every file in the chunk failed
+                    results.extend((src, str(e), None) for src, _ in chunk)
+            if progress:
+                progress(len(results), len(jobs))
+    return results
@@ -1,76 +1,491 @@
+"""
+Builds and migrates metadata.db, the source of Randomize's camera values.
+
+The database holds camera profiles: a body (make, model, sensor size in
+pixels and millimetres), a lens that fits it, a firmware version and the
+Software string such a file would carry (the camera's own firmware string,
+or an editor it went through), each with a popularity weight.
+value_provider samples them in proportion to the weight.
+
+The schema version is kept in PRAGMA user_version and every migration runs
+once, in its own transaction, so running this file again (or on an older
+database) only does what's missing:
+
+    python database.py                 (the bundled metadata.db)
+    python database.py other.db        (migrate / fill another database)
+    python database.py --reseed        (re-apply the catalog below, e.g. after editing it)
+"""
+import argparse
 import sqlite3
-import os
+import sys
 
+from assets import resource_path
 
-#Make sure to delete the database and run this file again if you want to add more tables
-#If your getting a problem that is a good debug choice (IT SUCKS AHHHHHHH)
-print(f"Current working directory: {os.getcwd()}")
-def create_metadata_db():
-    conn = sqlite3.connect('metadata.db')
-    cursor = conn.cursor()
+DB_PATH = resource_path('metadata.db')
 
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS makes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL
-        )
-    """)
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS models (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            make_id INTEGER,
-            name TEXT NOT NULL,
-            FOREIGN KEY (make_id) REFERENCES makes(id)
+# The makes / models / software tables of the first version (which added
+# duplicate rows on every run) are kept so old databases can be migrated
+MIGRATIONS = [
+    # 1: the original tables
+    """
+    CREATE TABLE IF NOT EXISTS makes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS models (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        make_id INTEGER,
+        name TEXT NOT NULL,
+        FOREIGN KEY (make_id) REFERENCES makes(id)
+    );
+    CREATE TABLE IF NOT EXISTS software (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL
+    );
+    """,
+    # 2: drop the duplicated rows and keep them from coming back
+    """
+    UPDATE models SET make_id = (
+        SELECT MIN(m2.id) FROM makes m1 JOIN makes m2 ON m1.name = m2.name WHERE m1.id = models.make_id
+    );
+    DELETE FROM makes WHERE id NOT IN (SELECT MIN(id) FROM makes GROUP BY name);
+    DELETE FROM models WHERE id NOT IN (SELECT MIN(id) FROM models GROUP BY make_id, name);
+    DELETE FROM software WHERE id NOT IN (SELECT MIN(id) FROM software GROUP BY name);
+    CREATE UNIQUE INDEX IF NOT EXISTS makes_name ON makes(name);
+    CREATE UNIQUE INDEX IF NOT EXISTS models_make_name ON models(make_id, name);
+    CREATE UNIQUE INDEX IF NOT EXISTS software_name ON software(name);
+    """,
+    # 3: camera profiles; a profile is a body + lens + firmware + Software string
+    """
+    CREATE TABLE IF NOT EXISTS bodies (
+        id INTEGER PRIMARY KEY,
+        make TEXT NOT NULL,
+        model TEXT NOT NULL,
+        width INTEGER,
+        height INTEGER,
+        sensor_width_mm REAL,
+        sensor_height_mm REAL,
+        UNIQUE (make, model)
+    );
+    CREATE TABLE IF NOT EXISTS lenses (
+        id INTEGER PRIMARY KEY,
+        make TEXT,
+        model TEXT NOT NULL,
+        UNIQUE (make, model)
+    );
+    CREATE TABLE IF NOT EXISTS profiles (
+        id INTEGER PRIMARY KEY,
+        body_id INTEGER NOT NULL REFERENCES bodies(id),
+        lens_id INTEGER REFERENCES lenses(id),
+        firmware TEXT,
+        software_id INTEGER REFERENCES software(id),
+        weight REAL NOT NULL CHECK (weight > 0),
+        UNIQUE (body_id, lens_id, firmware, software_id)
+    );
+    """,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+# -- catalog ---------------------------------------------------------------
+# Bodies: (model, width, height, sensor width mm, sensor height mm, mount,
+# firmware versions oldest first, popularity). Popularity is relative and
+# only matters within the whole catalog.
+
+FULL_FRAME = (36.0, 24.0)
+APS_C_CANON = (22.3, 14.9)
+APS_C = (23.5, 15.6)
+MFT = (17.3, 13.0)
+
+CAMERAS = {
+    "Canon": {
+        "software": "Firmware Version {fw}",
+        "bodies": [
+            ("Canon EOS 5D Mark IV", 6720, 4480, *FULL_FRAME, "EF", ["1.0.4", "1.1.2", "1.3.3"], 30),
+            ("Canon EOS 6D Mark II", 6240, 4160, *FULL_FRAME, "EF", ["1.0.4", "1.1.1"], 22),
+            ("Canon EOS 5DS R", 8688, 5792, *FULL_FRAME, "EF", ["1.1.0"], 4),
+            ("Canon EOS 90D", 6960, 4640, *APS_C_CANON, "EF", ["1.0.0", "1.1.1"], 14),
+            ("Canon EOS 80D", 6000, 4000, *APS_C_CANON, "EF", ["1.0.2", "1.0.3"], 16),
+            ("Canon EOS Rebel T7i", 6000, 4000, *APS_C_CANON, "EF", ["1.0.1", "1.0.2"], 18),
+            ("Canon EOS 2000D", 6000, 4000, *APS_C_CANON, "EF", ["1.0.0", "1.1.0"], 15),
+            ("Canon EOS R5", 8192, 5464, *FULL_FRAME, "RF", ["1.5.0", "1.8.1", "1.9.0"], 24),
+            ("Canon EOS R6", 5472, 3648, *FULL_FRAME, "RF", ["1.5.0", "1.8.2"], 26),
+            ("Canon EOS R6m2", 6000, 4000, *FULL_FRAME, "RF", ["1.1.0", "1.2.0"], 14),
+            ("Canon EOS R", 6720, 4480, *FULL_FRAME, "RF", ["1.8.0"], 10),
+            ("Canon EOS RP", 6240, 4160, *FULL_FRAME, "RF", ["1.6.0"], 9),
+            ("Canon EOS R7", 6960, 4640, *APS_C_CANON, "RF", ["1.2.0", "1.3.1"], 11),
+            ("Canon EOS R10", 6000, 4000, *APS_C_CANON, "RF", ["1.2.0"], 9),
+        ],
+    },
+    "NIKON CORPORATION": {
+        "software": "Ver.{fw}",
+        "bodies": [
+            ("NIKON D850", 8256, 5504, *FULL_FRAME, "F", ["1.10", "1.20", "1.30"], 26),
+            ("NIKON D810", 7360, 4912, *FULL_FRAME, "F", ["1.12", "1.16"], 12),
+            ("NIKON D750", 6016, 4016, *FULL_FRAME, "F", ["1.13", "1.16"], 20),
+            ("NIKON D7500", 5568, 3712, *APS_C, "F", ["1.10", "1.20"], 14),
+            ("NIKON D5600", 6000, 4000, *APS_C, "F", ["1.10", "1.22"], 16),
+            ("NIKON D3500", 6000, 4000, *APS_C, "F", ["1.01", "1.11"], 18),
+            ("NIKON Z 6_2", 6048, 4024, *FULL_FRAME, "Z", ["1.30", "1.50"], 14),
+            ("NIKON Z 7_2", 8256, 5504, *FULL_FRAME, "Z", ["1.30", "1.50"], 10),
+            ("NIKON Z 8", 8256, 5504, *FULL_FRAME, "Z", ["1.00", "2.00"], 9),
+            ("NIKON Z 9", 8256, 5504, *FULL_FRAME, "Z", ["3.00", "4.00"], 9),
+            ("NIKON Z 5", 6016, 4016, *FULL_FRAME, "Z", ["1.40"], 8),
+            ("NIKON Z 50", 5568, 3712, *APS_C, "Z", ["2.40", "2.50"], 10),
+            ("NIKON Z fc", 5568, 3712, *APS_C, "Z", ["1.30"], 7),
+        ],
+    },
+    "SONY": {
+        "software": "{model} v{fw}",
+        "bodies": [
+            ("ILCE-7M3", 6000, 4000, *FULL_FRAME, "E", ["3.01", "4.01"], 34),
+            ("ILCE-7M4", 7008, 4672, *FULL_FRAME, "E", ["1.01", "2.00", "3.01"], 22),
+            ("ILCE-7RM4", 9504, 6336, *FULL_FRAME, "E", ["1.00", "2.00"], 14),
+            ("ILCE-7RM5", 9504, 6336, *FULL_FRAME, "E", ["1.01", "2.00"], 10),
+            ("ILCE-7SM3", 4240, 2832, *FULL_FRAME, "E", ["2.00", "3.01"], 6),
+            ("ILCE-1", 8640, 5760, *FULL_FRAME, "E", ["1.31", "2.00"], 6),
+            ("ILCE-9M2", 6000, 4000, *FULL_FRAME, "E", ["2.00"], 4),
+            ("ILCE-6400", 6000, 4000, *APS_C, "E", ["1.00", "2.00"], 20),
+            ("ILCE-6600", 6000, 4000, *APS_C, "E", ["1.00", "2.00"], 14),
+            ("ILCE-6000", 6000, 4000, *APS_C, "E", ["3.21"], 18),
+            ("ZV-E10", 6000, 4000, *APS_C, "E", ["1.00", "2.00"], 12),
+        ],
+    },
+    "FUJIFILM": {
+        "software": "Digital Camera {model} Ver{fw}",
+        "bodies": [
+            ("X-T4", 6240, 4160, *APS_C, "X", ["1.00", "1.20", "1.31"], 18),
+            ("X-T5", 7728, 5152, *APS_C, "X", ["1.00", "2.01"], 14),
+            ("X-T3", 6240, 4160, *APS_C, "X", ["3.00", "4.10"], 14),
+            ("X-T30", 6240, 4160, *APS_C, "X", ["1.40"], 12),
+            ("X-S10", 6240, 4160, *APS_C, "X", ["1.20", "2.10"], 12),
+            ("X-H2S", 6240, 4160, *APS_C, "X", ["2.00", "4.00"], 6),
+            ("X-Pro3", 6240, 4160, *APS_C, "X", ["1.20", "2.00"], 6),
+            ("X-E4", 6240, 4160, *APS_C, "X", ["1.10", "2.00"], 7),
+        ],
+    },
+    "Panasonic": {
+        "software": "Ver.{fw}",
+        "bodies": [
+            ("DC-GH5", 5184, 3888, *MFT, "MFT", ["2.5", "2.7"], 12),
+            ("DC-GH6", 5776, 4336, *MFT, "MFT", ["2.0", "2.4"], 6),
+            ("DC-G9", 5184, 3888, *MFT, "MFT", ["2.0", "2.3"], 8),
+            ("DC-G85", 4592, 3448, *MFT, "MFT", ["1.1"], 7),
+            ("DC-S5", 6000, 4000, *FULL_FRAME, "L", ["2.3", "3.1"], 6),
+            ("DC-S5M2", 6000, 4000, *FULL_FRAME, "L", ["1.0", "2.0"], 5),
+        ],
+    },
+    "OLYMPUS CORPORATION": {
+        "software": "Version {fw}",
+        "bodies": [
+            ("E-M1MarkIII", 5184, 3888, *MFT, "MFT", ["1.0", "1.4"], 8),
+            ("E-M5MarkIII", 5184, 3888, *MFT, "MFT", ["1.2"], 7),
+            ("E-M10MarkIV", 5184, 3888, *MFT, "MFT", ["1.1", "1.3"], 8),
+        ],
+    },
+    "OM Digital Solutions": {
+        "software": "Version {fw}",
+        "bodies": [
+            ("OM-1", 5184, 3888, *MFT, "MFT", ["1.3", "1.6"], 7),
+            ("OM-5", 5184, 3888, *MFT, "MFT", ["1.0", "1.2"], 4),
+        ],
+    },
+    "LEICA CAMERA AG": {
+        "software": "{fw}",
+        "bodies": [
+            ("LEICA M10-R", 7864, 5200, *FULL_FRAME, "M", ["3.0.3.0", "5.0.3.0"], 4),
+            ("LEICA M11", 10000, 6656, *FULL_FRAME, "M", ["1.2.1.0", "2.0.1.0"], 4),
+            ("LEICA Q2", 8368, 5584, *FULL_FRAME, "Q2", ["4.0.0", "5.0.0"], 5),
+            ("LEICA SL2", 8368, 5584, *FULL_FRAME, "L", ["3.0.0", "5.0.0"], 3),
+        ],
+    },
+    "RICOH IMAGING COMPANY, LTD.": {
+        "software": "{model} Ver {fw}",
+        "bodies": [
+            ("PENTAX K-1 Mark II", 7360, 4912, *FULL_FRAME, "K", ["1.20", "1.31"], 4),
+            ("PENTAX K-3 Mark III", 6192, 4128, *APS_C, "K", ["1.20", "1.40"], 4),
+            ("GR III", 6000, 4000, *APS_C, "GR3", ["1.60", "2.00"], 6),
+        ],
+    },
+    "SIGMA": {
+        "software": "SIGMA {model} Ver.{fw}",
+        "bodies": [
+            ("SIGMA fp", 6000, 4000, *FULL_FRAME, "L", ["4.00", "5.01"], 3),
+            ("SIGMA fp L", 9520, 6328, *FULL_FRAME, "L", ["2.00", "3.01"], 2),
+        ],
+    },
+    "Apple": {
+        "software": "{fw}",
+        "bodies": [
+            ("iPhone 11", 4032, 3024, 5.6, 4.2, "iPhone 11", ["15.7", "16.6.1", "17.1.2"], 40),
+            ("iPhone 12", 4032, 3024, 5.6, 4.2, "iPhone 12", ["16.6.1", "17.1.2", "17.5.1"], 40),
+            ("iPhone 13", 4032, 3024, 5.9, 4.4, "iPhone 13", ["16.6.1", "17.1.2", "17.5.1"], 46),
+            ("iPhone 13 Pro", 4032, 3024, 7.0, 5.3, "iPhone 13 Pro", ["16.6.1", "17.1.2", "17.5.1"], 30),
+            ("iPhone 14", 4032, 3024, 7.0, 5.3, "iPhone 14", ["16.6.1", "17.1.2", "17.5.1"], 38),
+            ("iPhone 14 Pro", 4032, 3024, 9.8, 7.3, "iPhone 14 Pro", ["16.6.1", "17.1.2", "17.5.1"], 30),
+            ("iPhone 15", 4032, 3024, 7.0, 5.3, "iPhone 15", ["17.1.2", "17.5.1", "18.0.1"], 34),
+            ("iPhone 15 Pro", 4032, 3024, 9.8, 7.3, "iPhone 15 Pro", ["17.1.2", "17.5.1", "18.0.1"], 28),
+        ],
+    },
+    "samsung": {
+        "software": "{model}XXU{fw}",
+        "bodies": [
+            ("SM-S918B", 4000, 3000, 9.8, 7.3, "Galaxy S23 Ultra", ["1AWBD", "2BWF4", "3CWL1"], 18),
+            ("SM-S911B", 4000, 3000, 7.1, 5.3, "Galaxy S23", ["1AWBD", "2BWF4", "3CWL1"], 16),
+            ("SM-A536B", 4080, 3060, 6.4, 4.8, "Galaxy A53", ["4CWA1", "5DWK2"], 14),
+        ],
+    },
+    "Google": {
+        "software": "HDR+ 1.0.{fw}",
+        "bodies": [
+            ("Pixel 7", 4080, 3072, 9.6, 7.2, "Pixel 7", ["520985202zd", "572791395zd"], 12),
+            ("Pixel 7 Pro", 4080, 3072, 9.6, 7.2, "Pixel 7 Pro", ["520985202zd", "572791395zd"], 9),
+            ("Pixel 8", 4080, 3072, 9.8, 7.3, "Pixel 8", ["572791395zd", "641377693zd"], 10),
+        ],
+    },
+}
+
+# (lens make, lens model, popularity) per mount; None for the lens make
+# means the camera's own make
+LENSES = {
+    "EF": [
+        (None, "EF24-105mm f/4L IS USM", 20), (None, "EF24-70mm f/2.8L II USM", 14),
+        (None, "EF50mm f/1.8 STM", 18), (None, "EF70-200mm f/2.8L IS III USM", 10),
+        (None, "EF-S18-55mm f/3.5-5.6 IS STM", 22), (None, "EF-S18-135mm f/3.5-5.6 IS USM", 14),
+        (None, "EF100mm f/2.8L Macro IS USM", 5), (None, "EF16-35mm f/4L IS USM", 8),
+        ("SIGMA", "35mm F1.4 DG HSM | Art 012", 5), ("TAMRON", "SP 24-70mm F/2.8 Di VC USD G2", 4),
+    ],
+    "RF": [
+        (None, "RF24-105mm F4 L IS USM", 20), (None, "RF24-70mm F2.8 L IS USM", 12),
+        (None, "RF50mm F1.8 STM", 16), (None, "RF70-200mm F2.8 L IS USM", 8),
+        (None, "RF-S18-150mm F3.5-6.3 IS STM", 12), (None, "RF35mm F1.8 MACRO IS STM", 9),
+        (None, "RF15-35mm F2.8 L IS USM", 6), (None, "RF100-500mm F4.5-7.1 L IS USM", 5),
+    ],
+    "F": [
+        ("Nikon", "AF-S NIKKOR 24-70mm f/2.8E ED VR", 12), ("Nikon", "AF-S NIKKOR 24-120mm f/4G ED VR", 16),
+        ("Nikon", "AF-S NIKKOR 50mm f/1.8G", 16), ("Nikon", "AF-S NIKKOR 70-200mm f/2.8E FL ED VR", 8),
+        ("Nikon", "AF-P DX NIKKOR 18-55mm f/3.5-5.6G VR", 22), ("Nikon", "AF-S DX NIKKOR 18-140mm f/3.5-5.6G ED VR", 14),
+        ("Nikon", "AF-S NIKKOR 85mm f/1.8G", 8), ("SIGMA", "24-70mm F2.8 DG OS HSM | Art 017", 4),
+        ("TAMRON", "SP 70-200mm F/2.8 Di VC USD G2 A025N", 4),
+    ],
+    "Z": [
+        ("Nikon", "NIKKOR Z 24-70mm f/4 S", 20), ("Nikon", "NIKKOR Z 24-120mm f/4 S", 14),
+        ("Nikon", "NIKKOR Z 24-70mm f/2.8 S", 10), ("Nikon", "NIKKOR Z 50mm f/1.8 S", 12),
+        ("Nikon", "NIKKOR Z 70-200mm f/2.8 VR S", 7), ("Nikon", "NIKKOR Z DX 16-50mm f/3.5-6.3 VR", 14),
+        ("Nikon", "NIKKOR Z 40mm f/2", 8), ("Nikon", "NIKKOR Z 100-400mm f/4.5-5.6 VR S", 5),
+    ],
+    "E": [
+        (None, "FE 28-70mm F3.5-5.6 OSS", 18), (None, "FE 24-70mm F2.8 GM II", 10),
+        (None, "FE 24-105mm F4 G OSS", 12), (None, "FE 50mm F1.8", 12), (None, "FE 85mm F1.8", 9),
+        (None, "FE 70-200mm F2.8 GM OSS II", 6), (None, "E PZ 16-50mm F3.5-5.6 OSS", 20),
+        (None, "E 18-135mm F3.5-5.6 OSS", 10), ("SIGMA", "35mm F1.4 DG DN | Art 021", 5),
+        ("TAMRON", "28-75mm F/2.8 Di III VXD G2 A063", 8), ("SIGMA", "18-50mm F2.8 DC DN | C 021", 6),
+    ],
+    "X": [
+        (None, "XF18-55mmF2.8-4 R LM OIS", 20), (None, "XF16-80mmF4 R OIS WR", 14),
+        (None, "XF35mmF1.4 R", 12), (None, "XF23mmF2 R WR", 12), (None, "XF56mmF1.2 R WR", 6),
+        (None, "XF10-24mmF4 R OIS WR", 6), (None, "XF70-300mmF4-5.6 R LM OIS WR", 6),
+        (None, "XC15-45mmF3.5-5.6 OIS PZ", 12), ("SIGMA", "18-50mm F2.8 DC DN | C 021", 4),
+    ],
+    "MFT": [
+        ("OLYMPUS", "OLYMPUS M.12-40mm F2.8", 14), ("OLYMPUS", "OLYMPUS M.14-42mm F3.5-5.6 EZ", 18),
+        ("OLYMPUS", "OLYMPUS M.25mm F1.8", 8), ("OLYMPUS", "OLYMPUS M.40-150mm F4.0-5.6 R", 8),
+        ("Panasonic", "LUMIX G VARIO 12-60/F3.5-5.6", 14), ("Panasonic", "LEICA DG 12-60/F2.8-4.0", 10),
+        ("Panasonic", "LUMIX G 25/F1.7", 8), ("Panasonic", "LUMIX G VARIO 100-300/F4.0-5.6II", 5),
+    ],
+    "L": [
+        ("Panasonic", "LUMIX S 20-60/F3.5-5.6", 16), ("Panasonic", "LUMIX S 24-105/F4 MACRO O.I.S.", 12),
+        ("Panasonic", "LUMIX S 50/F1.8", 10), ("SIGMA", "28-70mm F2.8 DG DN | C 021", 8),
+        ("SIGMA", "45mm F2.8 DG DN | C 019", 8), ("LEICA CAMERA AG", "VARIO-ELMARIT-SL 1:2.8-4/24-90 ASPH.", 4),
+    ],
+    "M": [
+        ("LEICA CAMERA AG", "Summilux-M 1:1.4/35 ASPH.", 8), ("LEICA CAMERA AG", "Summicron-M 1:2/50", 10),
+        ("LEICA CAMERA AG", "Elmarit-M 1:2.8/28 ASPH.", 6), ("LEICA CAMERA AG", "APO-Summicron-M 1:2/90 ASPH.", 3),
+    ],
+    "Q2": [("LEICA CAMERA AG", "Summilux 1:1.7/28 ASPH.", 1)],
+    "K": [
+        (None, "smc PENTAX-DA 18-55mm F3.5-5.6 AL WR", 10), (None, "HD PENTAX-D FA 24-70mm F2.8ED SDM WR", 8),
+        (None, "HD PENTAX-D FA 28-105mm F3.5-5.6ED DC WR", 8), (None, "smc PENTAX-FA 50mm F1.4", 6),
+    ],
+    "GR3": [(None, "GR LENS 18.3mm F2.8", 1)],
+    "iPhone 11": [("Apple", "iPhone 11 back dual wide camera 4.25mm f/1.8", 4), ("Apple", "iPhone 11 back dual wide camera 1.54mm f/2.4", 1), ("Apple", "iPhone 11 front camera 2.71mm f/2.2", 1)],
+    "iPhone 12": [("Apple", "iPhone 12 back dual wide camera 4.2mm f/1.6", 4), ("Apple", "iPhone 12 back dual wide camera 1.55mm f/2.4", 1), ("Apple", "iPhone 12 front camera 2.71mm f/2.2", 1)],
+    "iPhone 13": [("Apple", "iPhone 13 back dual wide camera 5.1mm f/1.6", 4), ("Apple", "iPhone 13 back dual wide camera 1.54mm f/2.4", 1), ("Apple", "iPhone 13 front camera 2.71mm f/2.2", 1)],
+    "iPhone 13 Pro": [("Apple", "iPhone 13 Pro back triple camera 5.7mm f/1.5", 5), ("Apple", "iPhone 13 Pro back triple camera 9mm f/2.8", 2), ("Apple", "iPhone 13 Pro back triple camera 1.57mm f/1.8", 1), ("Apple", "iPhone 13 Pro front TrueDepth camera 2.71mm f/2.2", 1)],
+    "iPhone 14": [("Apple", "iPhone 14 back dual wide camera 5.7mm f/1.5", 4), ("Apple", "iPhone 14 back dual wide camera 1.54mm f/2.4", 1), ("Apple", "iPhone 14 front camera 2.69mm f/1.9", 1)],
+    "iPhone 14 Pro": [("Apple", "iPhone 14 Pro back triple camera 6.86mm f/1.78", 5), ("Apple", "iPhone 14 Pro back triple camera 9mm f/2.8", 2), ("Apple", "iPhone 14 Pro back triple camera 2.22mm f/2.2", 1), ("Apple", "iPhone 14 Pro front camera 2.69mm f/1.9", 1)],
+    "iPhone 15": [("Apple", "iPhone 15 back dual wide camera 6.24mm f/1.6", 4), ("Apple", "iPhone 15 back dual wide camera 1.54mm f/2.4", 1), ("Apple", "iPhone 15 front camera 2.69mm f/1.9", 1)],
+    "iPhone 15 Pro": [("Apple", "iPhone 15 Pro back triple camera 6.765mm f/1.78", 5), ("Apple", "iPhone 15 Pro back triple camera 9mm f/2.8", 2), ("Apple", "iPhone 15 Pro back triple camera 2.22mm f/2.2", 1), ("Apple", "iPhone 15 Pro front camera 2.69mm f/1.9", 1)],
+    "Galaxy S23 Ultra": [("samsung", "Samsung Galaxy S23 Ultra Rear Main Camera", 5), ("samsung", "Samsung Galaxy S23 Ultra Rear Telephoto Camera", 1), ("samsung", "Samsung Galaxy S23 Ultra Front Camera", 1)],
+    "Galaxy S23": [("samsung", "Samsung Galaxy S23 Rear Main Camera", 5), ("samsung", "Samsung Galaxy S23 Rear Ultra Wide Camera", 1), ("samsung", "Samsung Galaxy S23 Front Camera", 1)],
+    "Galaxy A53": [("samsung", "Samsung Galaxy A53 Rear Main Camera", 5), ("samsung", "Samsung Galaxy A53 Front Camera", 1)],
+    "Pixel 7": [("Google", "Pixel 7 back camera 6.81mm f/1.85", 5), ("Google", "Pixel 7 front camera 2.74mm f/2.2", 1)],
+    "Pixel 7 Pro": [("Google", "Pixel 7 Pro back camera 6.81mm f/1.85", 5), ("Google", "Pixel 7 Pro back camera 18.0mm f/3.5", 1), ("Google", "Pixel 7 Pro front camera 2.74mm f/2.2", 1)],
+    "Pixel 8": [("Google", "Pixel 8 back camera 6.9mm f/1.68", 5), ("Google", "Pixel 8 front camera 2.74mm f/2.2", 1)],
+}
+
+# Editors a camera's file may have gone through: (Software string, popularity).
+# Phones are rarely edited on a desktop, so they only get the first few.
+EDITORS = [
+    ("Adobe Photoshop Lightroom Classic 13.0 (Windows)", 10),
+    ("Adobe Photoshop Lightroom Classic 12.4 (Macintosh)", 8),
+    ("Adobe Photoshop 25.0 (Windows)", 6),
+    ("Adobe Photoshop 24.7 (Macintosh)", 5),
+    ("Capture One 16 Macintosh", 3),
+    ("darktable 4.4.2", 2),
+    ("GIMP 2.10.34", 2),
+    ("DxO PhotoLab 6", 1),
+    ("Luminar Neo - 1.14.0", 1),
+    ("Affinity Photo 2.2.0", 1),
+]
+PHONE_EDITORS = ["Adobe Photoshop Lightroom Classic 13.0 (Windows)", "Adobe Photoshop Lightroom Classic 12.4 (Macintosh)"]
+PHONE_MAKES = {"Apple", "samsung", "Google"}
+EDITED_SHARE = 0.25  # of a body's files carry an editor's name instead of the firmware's
+
+
+def catalog_profiles():
+    """
+    Every profile of the catalog above.
+
+    Firmware versions get more likely the newer they are, and a quarter of
+    the weight goes to files saved by an editor.
+
+    Returns:
+        list of (make, model, lens_make, lens_model, firmware, software,
+        width, height, sensor_width_mm, sensor_height_mm, weight)
+    """
+    profiles = []
+    for make, camera in CAMERAS.items():
+        editors = EDITORS
+        if make in PHONE_MAKES:
+            editors = [(name, share) for name, share in EDITORS if name in PHONE_EDITORS]
+        editor_total = sum(share for _, share in editors)
+        for model, width, height, sensor_w, sensor_h, mount, firmwares, popularity in camera["bodies"]:
+            lenses = LENSES[mount]
+            lens_total = sum(share for _, _, share in lenses)
+            fw_total = sum(range(1, len(firmwares) + 1))
+            for fw_rank, firmware in enumerate(firmwares, 1):
+                own_software = camera["software"].format(model=model, fw=firmware)
+                softwares = [(own_software, 1 - EDITED_SHARE)]
+                softwares += [(name, EDITED_SHARE * share / editor_total) for name, share in editors]
+                for lens_make, lens_model, lens_share in lenses:
+                    for software, software_share in softwares:
+                        weight = popularity * fw_rank / fw_total * lens_share / lens_total * software_share
+                        profiles.append((make, model, lens_make or make, lens_model, firmware, software,
+                                         width, height, sensor_w, sensor_h, weight))
+    return profiles
+
+
+# -- building --------------------------------------------------------------
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Bring the schema up to SCHEMA_VERSION. Each migration and its version
+    bump are committed together, so an interrupted run picks up where it stopped.
+
+    Returns:
+        the version the database was at before
+    """
+    start = schema_version(conn)
+    if start > SCHEMA_VERSION:
+        raise sqlite3.DatabaseError(
+            f"database schema version {start} is newer than this program's ({SCHEMA_VERSION})"
         )
-    """)
+    for version in range(start + 1, SCHEMA_VERSION + 1):
+        # executescript() commits first, so the BEGIN is ours
+        conn.executescript(f"BEGIN; {MIGRATIONS[version - 1]} PRAGMA user_version = {version}; COMMIT;")
+    return start
+
+
+def _ids(conn, table, columns, rows):
+    """Insert the rows that are missing from table; returns {row: id}."""
+    names = ", ".join(columns)
+    marks = ", ".join("?" * len(columns))
+    conn.executemany(f"INSERT OR IGNORE INTO {table} ({names}) VALUES ({marks})", rows)
+    where = " AND ".join(f"{column} IS ?" for column in columns)
+    return {row: conn.execute(f"SELECT id FROM {table} WHERE {where}", row).fetchone()[0] for row in rows}
+
 
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS software (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL
+def seed_profiles(conn, reseed=False):
+    """
+    Insert the catalog's profiles, unless there already are some.
+
+    Args:
+        reseed: insert missing profiles and update the weights and sensor
+            sizes of existing ones even if the table isn't empty (rows
+            that aren't in the catalog are left alone)
+
+    Returns:
+        number of profiles written
+    """
+    if not reseed and conn.execute("SELECT EXISTS (SELECT 1 FROM profiles)").fetchone()[0]:
+        return 0
+    profiles = catalog_profiles()
+    with conn:
+        bodies = {}
+        for make, model, _, _, _, _, width, height, sensor_w, sensor_h, _ in profiles:
+            bodies[make, model] = (width, height, sensor_w, sensor_h)
+        body_ids = _ids(conn, "bodies", ("make", "model"), list(bodies))
+        conn.executemany(
+            "UPDATE bodies SET width = ?, height = ?, sensor_width_mm = ?, sensor_height_mm = ? "
+            "WHERE make = ? AND model = ?",
+            [(*size, make, model) for (make, model), size in bodies.items()],
         )
-    """)
-
-    # Add sample data for makes
-    makes = ["Canon", "Nikon", "Sony", "Panasonic", "Fujifilm", "Olympus", "Leica", "Sigma", "Pentax", "Blackmagic"]
-    cursor.executemany("INSERT INTO makes (name) VALUES (?)", [(make,) for make in makes])
-
-    # Get all make IDs
-    cursor.execute("SELECT id FROM makes")
-    make_ids = [row[0] for row in cursor.fetchall()]
-
-    # Starting at [0] at Canon and [10] at Blackmagic more models can be added here to increase randomness
-    models = [
-        (make_ids[0], "EOS 5D Mark IV"),
-        (make_ids[1], "D810"),
-        (make_ids[2], "A7R IV"),
-        (make_ids[3], "Lumix GH5"),
-        (make_ids[4], "X-T4"),
-        (make_ids[5], "OM-1"),
-        (make_ids[6], "M10-R"),
-        (make_ids[7], "35mm f/1.4 DG DN"),
-        (make_ids[8], "K-1"),
-        (make_ids[9], "Cinema Camera")
-    ]
-    
-    cursor.executemany("INSERT INTO models (make_id, name) VALUES (?, ?)", models)
-    
-    softwares = [
-    "Adobe Photoshop", "Adobe Lightroom", "GIMP", "Paint.NET",
-    "Capture One", "Affinity Photo", "Darktable", "DxO PhotoLab",
-    "Corel PaintShop Pro", "Snapseed", "Pixelmator", "Luminar",
-    "Microsoft Paint", "Apple Photos", "Google Photos", "VSCO",
-    "Fotor", "ON1 Photo RAW", "PhotoScape", "AfterShot Pro"
-]
+        lens_ids = _ids(conn, "lenses", ("make", "model"), list({p[2:4]: None for p in profiles}))
+        software_ids = _ids(conn, "software", ("name",), list({(p[5],): None for p in profiles}))
+        conn.executemany(
+            """
+            INSERT INTO profiles (body_id, lens_id, firmware, software_id, weight) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (body_id, lens_id, firmware, software_id) DO UPDATE SET weight = excluded.weight
+            """,
+            [
+                (body_ids[make, model], lens_ids[lens_make, lens_model], firmware, software_ids[software,], weight)
+                for make, model, lens_make, lens_model, firmware, software, *_, weight in profiles
+            ],
+        )
+    return len(profiles)
+
+
+def create_metadata_db(db_path=DB_PATH, reseed=False):
+    """
+    Create or migrate the database at db_path and fill in the profiles.
+
+    Safe to run any number of times.
+
+    Returns:
+        (schema version before, profiles written)
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        # WAL lets the batch workers read while the database is being updated
+        conn.execute("PRAGMA journal_mode=WAL")
+        before = migrate(conn)
+        written = seed_profiles(conn, reseed)
+        # Back to a single file, so metadata.db can be copied / bundled as is
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return before, written
 
-    cursor.executemany("INSERT INTO software (name) VALUES (?)", [(s,) for s in softwares])
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="database.py", description="Create or migrate metadata.db.")
+    parser.add_argument("db", nargs="?", default=DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument("--reseed", action="store_true", help="re-apply the built-in profiles")
+    args = parser.parse_args(argv)
+    try:
+        before, written = create_metadata_db(args.db, args.reseed)
+    except sqlite3.Error as e:
+        print(f"Can't update {args.db}: {e}", file=sys.stderr)
+        return 1
+    print(f"{args.db}: schema version {before} -> {SCHEMA_VERSION}, {written} profiles written")
+    return 0
 
-    conn.commit()
-    conn.close()
 
 if __name__ == "__main__":
-    print("Creating metadata database...")
-    create_metadata_db()
-    print("Metadata database created successfully.")
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Debug dock with live timings of the load / randomize / save path.
+
+Help > Debug Timings shows it. Instrumentation (see instrumentation.py) is
+only switched on while the panel is visible, unless it was already on from
+the environment.
+"""
+from PyQt5.QtWidgets import (QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QLabel)
+from PyQt5.QtCore import Qt, QTimer
+
+import instrumentation
+
+COLUMNS = [
+    ("Span", "span"),
+    ("Count", "count"),
+    ("Mean ms", "mean_ms"),
+    ("p50 ms", "p50_ms"),
+    ("p99 ms", "p99_ms"),
+    ("Max ms", "max_ms"),
+]
+
+
+class DebugPanel(QDockWidget):
+    """Table of instrumentation.snapshot(), refreshed every second while shown."""
+
+    def __init__(self, parent=None):
+        super().__init__("Debug Timings", parent)
+        self.setObjectName("debugTimings")
+        self._enabled_by_us = False
+
+        body = QWidget()
+        layout = QVBoxLayout(body)
+        layout.setContentsMargins(4, 4, 4, 4)
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels([title for title, _ in COLUMNS])
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        self.status = QLabel()
+        buttons.addWidget(self.status)
+        buttons.addStretch()
+        reset_button = QPushButton("Reset")
+        reset_button.clicked.connect(self.reset)
+        buttons.addWidget(reset_button)
+        layout.addLayout(buttons)
+        self.setWidget(body)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(1000)
+        self._timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not instrumentation.is_enabled():
+            instrumentation.enable()
+            self._enabled_by_us = True
+        self.refresh()
+        self._timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._timer.stop()
+        # Back to the no-op spans, so the panel costs nothing once closed
+        if self._enabled_by_us:
+            instrumentation.disable()
+            self._enabled_by_us = False
+
+    def reset(self):
+        instrumentation.reset()
+        self.refresh()
+
+    def refresh(self):
+        rows = instrumentation.snapshot()
+        self.table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, (_, key) in enumerate(COLUMNS):
+                value = row[key]
+                text = value if isinstance(value, str) else (str(value) if isinstance(value, int) else f"{value:.2f}")
+                item = QTableWidgetItem(text)
+                if c:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(r, c, item)
+        total = sum(row["total_ms"] for row in rows)
+        self.status.setText(f"{total:.1f} ms recorded")
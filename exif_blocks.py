@@ -0,0 +1,254 @@
+"""
+Embedded thumbnail (IFD1) and MakerNote handling.
+
+Pillow drops the IFD1 thumbnail when it serializes EXIF, and it moves the
+MakerNote to a new offset, which breaks the vendor offsets inside it. This
+module works on the raw TIFF payload instead:
+
+    thumbnail   keep (carry the original over), strip (unlink and zero it)
+                or regenerate (a fresh one from a reduced-size decode)
+    makernote   keep or strip
+
+When the tag edits fit in their old slots, they are patched into a copy of
+the original payload, so the MakerNote stays exactly where it was. Only
+edits that change the layout go through Pillow.
+"""
+import io
+import struct
+
+from PIL import Image
+
+from exif_patch import PatchError, encode_value, patch_in_place, plan_patches
+from exif_reader import EXIF_HEADER, THUMBNAIL_LENGTH, parse_tiff_payload
+from instrumentation import timed
+
+THUMBNAIL_MODES = ("keep", "strip", "regenerate")
+MAKERNOTE_MODES = ("keep", "strip")
+MAKERNOTE = 37500
+EXIF_IFD_POINTER = 34665
+
+THUMBNAIL_SIZE = (160, 120)
+THUMBNAIL_QUALITY = 75
+FALLBACK_QUALITIES = (THUMBNAIL_QUALITY, 60, 45, 30)  # for squeezing into an old thumbnail's slot
+
+
+class BlockSettings:
+    """
+    What happens to the IFD1 thumbnail and the MakerNote.
+
+    Args:
+        thumbnail: one of THUMBNAIL_MODES
+        makernote: one of MAKERNOTE_MODES
+    """
+
+    def __init__(self, thumbnail="strip", makernote="keep"):
+        if thumbnail not in THUMBNAIL_MODES:
+            raise ValueError(f"Unknown thumbnail mode {thumbnail!r}, expected one of {', '.join(THUMBNAIL_MODES)}")
+        if makernote not in MAKERNOTE_MODES:
+            raise ValueError(f"Unknown MakerNote mode {makernote!r}, expected one of {', '.join(MAKERNOTE_MODES)}")
+        self.thumbnail = thumbnail
+        self.makernote = makernote
+
+
+def extract_thumbnail(tree):
+    """The IFD1 JPEG thumbnail bytes of a JPEG/PNG EXIF tree, or None."""
+    if tree is None or tree.payload is None or tree.thumbnail_range is None:
+        return None
+    start, end = tree.thumbnail_range
+    if not 0 < start < end <= len(tree.payload):
+        return None
+    return tree.payload[start:end]
+
+
+def make_thumbnail(path, size=THUMBNAIL_SIZE, quality=THUMBNAIL_QUALITY):
+    """
+    Encode a small JPEG thumbnail of an image.
+
+    JPEGs are decoded at 1/2 to 1/8 scale by the decoder itself (draft),
+    so this costs a fraction of a full decode.
+    """
+    with Image.open(path) as img:
+        img.draft("RGB", (size[0] * 2, size[1] * 2))
+        thumb = img.convert("RGB")
+    thumb.thumbnail(size)
+    buf = io.BytesIO()
+    thumb.save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def _ifd_end(payload, offset, bo):
+    (count,) = struct.unpack_from(bo + "H", payload, offset)
+    return offset + 2 + count * 12 + 4
+
+
+def _main_ifds_end(tree):
+    """End of the last byte used by IFD0 and its sub-IFDs (not IFD1)."""
+    end = 8
+    for name, offset in tree.ifd_offsets.items():
+        if name == "IFD1":
+            continue
+        end = max(end, _ifd_end(tree.payload, offset, tree.byte_order))
+        for entry in tree.ifds[name].values():
+            end = max(end, entry.value_offset + entry.size)
+    return end
+
+
+def strip_thumbnail(payload):
+    """
+    Unlink IFD1 from a TIFF payload.
+
+    IFD1 and the thumbnail are cut off when they sit at the end of the
+    payload (where every writer puts them); otherwise they are zeroed so
+    the old image can't be recovered.
+    """
+    tree = parse_tiff_payload(payload)
+    if tree.next_ifd_field is None or "IFD1" not in tree.ifd_offsets:
+        return payload
+
+    out = bytearray(payload)
+    out[tree.next_ifd_field:tree.next_ifd_field + 4] = b"\x00\x00\x00\x00"
+    ranges = [(tree.ifd_offsets["IFD1"], _ifd_end(payload, tree.ifd_offsets["IFD1"], tree.byte_order))]
+    if tree.thumbnail_range:
+        ranges.append(tree.thumbnail_range)
+    tail = min(start for start, _ in ranges)
+    if _main_ifds_end(tree) <= tail:
+        del out[tail:]
+    else:
+        for start, end in ranges:
+            end = min(end, len(out))
+            out[start:end] = bytes(end - start)
+    return bytes(out)
+
+
+def attach_thumbnail(payload, jpeg):
+    """Replace (or add) IFD1 with one pointing at a JPEG thumbnail appended to the payload."""
+    payload = strip_thumbnail(payload)
+    tree = parse_tiff_payload(payload)
+    if tree.next_ifd_field is None:
+        return payload
+    bo = tree.byte_order
+
+    out = bytearray(payload)
+    if len(out) % 2:
+        out += b"\x00"  # IFDs start on a word boundary
+    ifd1 = len(out)
+    data_offset = ifd1 + 2 + 3 * 12 + 4
+    out += struct.pack(bo + "H", 3)
+    out += struct.pack(bo + "HHLH2x", 259, 3, 1, 6)  # Compression: JPEG
+    out += struct.pack(bo + "HHLL", 513, 4, 1, data_offset)
+    out += struct.pack(bo + "HHLL", 514, 4, 1, len(jpeg))
+    out += struct.pack(bo + "L", 0)
+    out += jpeg
+    out[tree.next_ifd_field:tree.next_ifd_field + 4] = struct.pack(bo + "L", ifd1)
+    return bytes(out)
+
+
+def _needs_makernote_strip(document, settings):
+    return settings.makernote == "strip" and MAKERNOTE in document.values("Exif")
+
+
+@timed("exif.build")
+def build_payload(document, settings=None):
+    """
+    TIFF payload (no "Exif\\0\\0" prefix) to save for a document.
+
+    Args:
+        document: ImageDocument with pending edits
+        settings: BlockSettings (default: strip the thumbnail, keep the MakerNote)
+
+    Returns:
+        bytes
+    """
+    settings = settings or BlockSettings()
+    tree = document.tree
+    payload = None
+
+    if tree is not None and tree.payload is not None and not _needs_makernote_strip(document, settings):
+        # Edits that fit their slots are patched into the original bytes,
+        # which keeps IFD1 and the MakerNote where they were
+        try:
+            out = bytearray(tree.payload)
+            for offset, raw in plan_patches(document):
+                offset -= tree.tiff_offset
+                out[offset:offset + len(raw)] = raw
+            payload = bytes(out)
+        except PatchError:
+            pass
+
+    if payload is None:
+        exif = document.build_exif()
+        if settings.makernote == "strip":
+            exif.get_ifd(EXIF_IFD_POINTER).pop(MAKERNOTE, None)
+        payload = exif.tobytes()
+        if payload.startswith(EXIF_HEADER):
+            payload = payload[len(EXIF_HEADER):]
+
+    if tree is None or tree.payload is None:
+        return payload  # no EXIF in the file, or a TIFF (its IFD1 is a page, not a thumbnail)
+    if settings.thumbnail == "strip":
+        return strip_thumbnail(payload)
+    if settings.thumbnail == "regenerate":
+        return attach_thumbnail(payload, make_thumbnail(document.path))
+    original = extract_thumbnail(tree)
+    if original is not None and "IFD1" not in parse_tiff_payload(payload).ifd_offsets:
+        payload = attach_thumbnail(payload, original)  # Pillow dropped it
+    return payload
+
+
+def plan_thumbnail_patches(document, settings):
+    """
+    In-place writes for the thumbnail mode, as (file_offset, bytes) pairs.
+
+    Stripping unlinks IFD1 and zeroes the old thumbnail; regenerating
+    overwrites it when a new one can be made to fit its slot. Either way only
+    thumbnail-sized ranges are touched.
+
+    Raises:
+        PatchError: if the change can't be made in place
+    """
+    tree = document.tree
+    if settings.thumbnail == "keep" or tree is None or tree.payload is None:
+        return []
+    if tree.thumbnail_range is None:
+        if settings.thumbnail == "regenerate":
+            raise PatchError("no thumbnail slot to regenerate into")
+        return []
+
+    start, end = tree.thumbnail_range
+    base = tree.tiff_offset
+    if settings.thumbnail == "strip":
+        return [
+            (base + tree.next_ifd_field, b"\x00\x00\x00\x00"),
+            (base + start, bytes(end - start)),
+        ]
+
+    # Same dimensions as the old thumbnail, lowering quality until it fits
+    try:
+        with Image.open(io.BytesIO(extract_thumbnail(tree))) as old:
+            size = old.size
+    except (OSError, TypeError):
+        size = THUMBNAIL_SIZE
+    for quality in FALLBACK_QUALITIES:
+        jpeg = make_thumbnail(document.path, size, quality)
+        if len(jpeg) <= end - start:
+            break
+    else:
+        raise PatchError(f"new thumbnail is {len(jpeg)} bytes, the slot holds {end - start}")
+    length = tree.ifds["IFD1"][THUMBNAIL_LENGTH]
+    return [
+        (base + length.value_offset, encode_value(length, len(jpeg), tree.byte_order)),
+        (base + start, jpeg.ljust(end - start, b"\x00")),
+    ]
+
+
+def patch_blocks_in_place(document, settings=None, fsync=True, backup=False):
+    """
+    patch_in_place() for the tag edits plus the thumbnail mode.
+
+    Raises:
+        PatchError: if anything can't be done in place (the file is untouched)
+    """
+    settings = settings or BlockSettings()
+    if _needs_makernote_strip(document, settings):
+        raise PatchError("the MakerNote can't be removed in place")
+    return patch_in_place(document, fsync, backup, plan_thumbnail_patches(document, settings))
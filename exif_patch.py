@@ -0,0 +1,205 @@
+"""
+In-place EXIF patching.
+
+When every edit fits in the bytes the tag already occupies (a DateTime is
+always 19 characters, a shorter Make fits in the old one's slot), the file
+is memory-mapped and only those bytes are overwritten. Nothing is moved, so
+scrubbing a multi-GB TIFF/DNG touches a few KB instead of rewriting it.
+
+Edits that don't fit (longer strings, new or removed tags) raise
+PatchError, and the caller falls back to a full save.
+"""
+import json
+import mmap
+import os
+import struct
+import zlib
+from fractions import Fraction
+
+from exif_reader import TYPES
+from instrumentation import timed
+from metadata_session import REMOVED, SUB_IFD_POINTERS
+
+BACKUP_SUFFIX = ".exif-undo"
+
+
+class PatchError(Exception):
+    """Raised when the pending edits can't be written in place."""
+
+
+def encode_value(entry, value, byte_order):
+    """
+    Encode value into exactly entry.size bytes for entry's type and count.
+
+    The value must have the same count as the entry (shorter strings are
+    handled by plan_patches, which also rewrites the count).
+
+    Raises:
+        PatchError: if the value doesn't fit
+    """
+    type_ = entry.type
+    if type_ in (1, 2, 7):
+        raw = value.encode("utf-8") if isinstance(value, str) else bytes(value)
+        if len(raw) != entry.count:
+            raise PatchError(f"tag {entry.tag}: {len(raw)} bytes, slot holds {entry.count}")
+        return raw
+
+    values = value if isinstance(value, tuple) else (value,)
+    if len(values) != entry.count:
+        raise PatchError(f"tag {entry.tag}: {len(values)} values, slot holds {entry.count}")
+    _, code = TYPES[type_]
+    try:
+        if type_ in (5, 10):
+            nums = []
+            for v in values:
+                # IFDRational keeps the exact fraction; plain numbers are approximated
+                nums += [v.numerator, v.denominator] if hasattr(v, "denominator") else _fraction(v)
+            return struct.pack(f"{byte_order}{len(nums)}{code[0]}", *nums)
+        if type_ in (11, 12):
+            return struct.pack(f"{byte_order}{len(values)}{code}", *(float(v) for v in values))
+        return struct.pack(f"{byte_order}{len(values)}{code}", *(int(v) for v in values))
+    except (struct.error, TypeError, ValueError, ZeroDivisionError) as e:
+        raise PatchError(f"tag {entry.tag}: {e}") from e
+
+
+def _fraction(value):
+    f = Fraction(value).limit_denominator(1000000)
+    return [f.numerator, f.denominator]
+
+
+def plan_patches(document):
+    """
+    Turn a document's pending edits into (file_offset, bytes) writes.
+
+    Raises:
+        PatchError: if any edit can't be done in place
+    """
+    tree = document.tree
+    if tree is None:
+        raise PatchError("file has no EXIF block to patch")
+    groups = [("IFD0", document.edits)] + list(document.ifd_edits.items())
+    patches = []
+    for ifd, edits in groups:
+        for tag_id, value in edits.items():
+            entry = tree.ifds[ifd].get(tag_id)
+            if value is REMOVED or entry is None:
+                raise PatchError(f"tag {tag_id} in {ifd} would be added or removed")
+            if tag_id in SUB_IFD_POINTERS.values():
+                raise PatchError(f"tag {tag_id} in {ifd} is an IFD pointer")
+            if entry.type == 2:
+                patches += _ascii_patches(entry, value, tree.byte_order, tree.tiff_offset)
+                continue
+            raw = encode_value(entry, value, tree.byte_order)
+            patches.append((tree.tiff_offset + entry.value_offset, raw))
+    return patches
+
+
+def _ascii_patches(entry, value, byte_order, base):
+    """
+    Writes for a string that may be shorter than its slot.
+
+    The entry's count is lowered to the new length, since readers such as
+    Pillow only trim one trailing NUL; freed bytes are zeroed. A string
+    that now fits in 4 bytes moves into the entry itself, as TIFF requires.
+    """
+    raw = (value.encode("utf-8") if isinstance(value, str) else bytes(value)) + b"\x00"
+    if len(raw) > entry.count:
+        raise PatchError(f"tag {entry.tag}: {len(raw) - 1} chars don't fit in {entry.count - 1}")
+    count_field = (base + entry.entry_offset + 4, struct.pack(byte_order + "L", len(raw)))
+    if entry.count <= 4 or len(raw) > 4:
+        return [count_field, (base + entry.value_offset, raw.ljust(entry.count, b"\x00"))]
+    return [
+        count_field,
+        (base + entry.entry_offset + 8, raw.ljust(4, b"\x00")),
+        (base + entry.value_offset, bytes(entry.count)),
+    ]
+
+
+def _png_chunk_range(mm, tiff_offset):
+    """(start of the eXIf chunk's type field, end of its data) around tiff_offset."""
+    type_start = tiff_offset - 4
+    if mm[type_start:tiff_offset] != b"eXIf":
+        type_start -= 6  # payload has an "Exif\0\0" prefix
+        if mm[type_start:type_start + 4] != b"eXIf":
+            raise PatchError("eXIf chunk not found")
+    (length,) = struct.unpack(">L", mm[type_start - 4:type_start])
+    return type_start, type_start + 4 + length
+
+
+def write_backup(path, mm, ranges):
+    """
+    Save the bytes about to be overwritten so restore_backup() can undo the patch.
+
+    Args:
+        ranges: (file_offset, length) pairs
+    """
+    undo = [[offset, mm[offset:offset + length].hex()] for offset, length in ranges]
+    tmp_path = path + BACKUP_SUFFIX + ".tmp"
+    with open(tmp_path, "w") as fp:
+        json.dump({"size": len(mm), "patches": undo}, fp)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp_path, path + BACKUP_SUFFIX)
+
+
+def restore_backup(path, fsync=True):
+    """Undo an in-place patch using the backup written next to the file."""
+    with open(path + BACKUP_SUFFIX) as fp:
+        backup = json.load(fp)
+    patches = [(offset, bytes.fromhex(raw)) for offset, raw in backup["patches"]]
+    with open(path, "r+b") as fp:
+        if os.fstat(fp.fileno()).st_size != backup["size"]:
+            raise PatchError("file size changed since it was patched")
+        _write(fp, patches, container=None, tiff_offset=None, fsync=fsync)
+    os.remove(path + BACKUP_SUFFIX)
+
+
+def _write(fp, patches, container, tiff_offset, fsync):
+    with mmap.mmap(fp.fileno(), 0) as mm:
+        for offset, raw in patches:
+            mm[offset:offset + len(raw)] = raw
+        if container == "png":
+            # The eXIf chunk's CRC covers the bytes we just changed
+            start, end = _png_chunk_range(mm, tiff_offset)
+            mm[end:end + 4] = struct.pack(">L", zlib.crc32(mm[start:end]))
+        if fsync:
+            mm.flush()
+    if fsync:
+        os.fsync(fp.fileno())
+
+
+@timed("save.patch")
+def patch_in_place(document, fsync=True, backup=False, extra_patches=()):
+    """
+    Write a document's pending edits straight into its file.
+
+    Args:
+        document: ImageDocument whose edits should be written
+        fsync: flush the mapped pages and fsync before returning
+        backup: first save the original bytes to <path>.exif-undo
+        extra_patches: more (file_offset, bytes) writes to make in the
+            same pass (see exif_blocks.plan_thumbnail_patches)
+
+    Returns:
+        number of bytes overwritten
+
+    Raises:
+        PatchError: if the edits don't fit or the file changed since it
+            was parsed; the file is untouched in that case
+    """
+    if document.is_stale():
+        raise PatchError("file changed on disk since it was read")
+    patches = plan_patches(document) + list(extra_patches)
+    if not patches:
+        return 0
+
+    tree = document.tree
+    with open(document.path, "r+b") as fp:
+        if backup:
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                ranges = [(offset, len(raw)) for offset, raw in patches]
+                if tree.container == "png":
+                    ranges.append((_png_chunk_range(mm, tree.tiff_offset)[1], 4))  # CRC
+                write_backup(document.path, mm, ranges)
+        _write(fp, patches, tree.container, tree.tiff_offset, fsync)
+    return sum(len(raw) for _, raw in patches)
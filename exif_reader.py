@@ -0,0 +1,519 @@
+"""
+Metadata-only EXIF reader.
+
+Walks the JPEG marker / PNG chunk / RIFF (WebP) chunk / ISOBMFF (HEIC)
+box / TIFF IFD structure, reads just the EXIF bytes and parses them into an IFD tree (IFD0, Exif, GPS, Interop,
+IFD1). Pixel data is never read and no Pillow image object is built, so
+a read costs a few KB of I/O no matter how big the file is.
+"""
+import os
+import struct
+
+from PIL.TiffImagePlugin import IFDRational
+
+from instrumentation import span
+
+EXIF_HEADER = b"Exif\x00\x00"
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+HEIF_BRANDS = {b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1", b"avif"}
+
+# Pointer tags that link IFD0 / Exif IFD to their sub-IFDs
+EXIF_IFD_POINTER = 34665
+GPS_IFD_POINTER = 34853
+INTEROP_IFD_POINTER = 40965
+SUB_IFDS = {
+    EXIF_IFD_POINTER: "Exif",
+    GPS_IFD_POINTER: "GPS",
+    INTEROP_IFD_POINTER: "Interop",
+}
+IFD_NAMES = ("IFD0", "Exif", "GPS", "Interop", "IFD1")
+
+# IFD1 tags pointing at the embedded JPEG thumbnail
+THUMBNAIL_OFFSET = 513
+THUMBNAIL_LENGTH = 514
+
+# TIFF field type -> (size in bytes, struct code)
+TYPES = {
+    1: (1, "B"),   # BYTE
+    2: (1, "s"),   # ASCII
+    3: (2, "H"),   # SHORT
+    4: (4, "L"),   # LONG
+    5: (8, "LL"),  # RATIONAL
+    6: (1, "b"),   # SBYTE
+    7: (1, "s"),   # UNDEFINED
+    8: (2, "h"),   # SSHORT
+    9: (4, "l"),   # SLONG
+    10: (8, "ll"), # SRATIONAL
+    11: (4, "f"),  # FLOAT
+    12: (8, "d"),  # DOUBLE
+    13: (4, "L"),  # IFD
+}
+
+MAX_ENTRIES = 4096  # sanity limit so a corrupt count can't stall the parser
+
+
+class ExifReadError(Exception):
+    """Raised when the EXIF block is present but can't be parsed."""
+
+
+class IfdEntry:
+    """One IFD entry plus where its value lives (offsets are TIFF-relative)."""
+
+    __slots__ = ("tag", "type", "count", "value", "value_offset", "entry_offset")
+
+    def __init__(self, tag, type_, count, value, value_offset, entry_offset):
+        self.tag = tag
+        self.type = type_
+        self.count = count
+        self.value = value
+        self.value_offset = value_offset
+        self.entry_offset = entry_offset
+
+    @property
+    def size(self):
+        """Size of the value in bytes."""
+        return TYPES[self.type][0] * self.count
+
+    def __repr__(self):
+        return f"IfdEntry(tag={self.tag}, type={self.type}, count={self.count}, value={self.value!r})"
+
+
+class ExifTree:
+    """
+    Parsed EXIF block.
+
+    Attributes:
+        ifds: dict of IFD name -> {tag_id: IfdEntry}
+        byte_order: "<" or ">"
+        container: "jpeg", "png", "webp", "heic" or "tiff"
+        tiff_offset: file offset of the TIFF header, so entry offsets can be
+            mapped back onto the file
+        payload: the raw TIFF bytes (None for TIFF files, which aren't
+            loaded whole)
+        next_ifd_field: TIFF offset of IFD0's "next IFD" link (what
+            points at IFD1), or None if there's no IFD0
+    """
+
+    def __init__(self, byte_order, container, tiff_offset, payload=None):
+        self.byte_order = byte_order
+        self.container = container
+        self.tiff_offset = tiff_offset
+        self.payload = payload
+        self.ifds = {name: {} for name in IFD_NAMES}
+        self.ifd_offsets = {}
+        self.next_ifd_field = None
+
+    def values(self, ifd="IFD0"):
+        """Plain {tag_id: value} dict for one IFD (same shape as Pillow's getexif())."""
+        return {tag: entry.value for tag, entry in self.ifds[ifd].items()}
+
+    def get(self, tag, ifd="IFD0", default=None):
+        entry = self.ifds[ifd].get(tag)
+        return entry.value if entry is not None else default
+
+    @property
+    def thumbnail_range(self):
+        """(start, end) of the IFD1 JPEG thumbnail in TIFF coordinates, or None."""
+        ifd1 = self.ifds["IFD1"]
+        if THUMBNAIL_OFFSET in ifd1 and THUMBNAIL_LENGTH in ifd1:
+            start = ifd1[THUMBNAIL_OFFSET].value
+            return start, start + ifd1[THUMBNAIL_LENGTH].value
+        return None
+
+    def __bool__(self):
+        return any(self.ifds.values())
+
+
+def _decode_value(type_, count, raw, bo):
+    size, code = TYPES[type_]
+    if type_ == 2:
+        return raw.split(b"\x00", 1)[0].decode("utf-8", errors="replace")
+    if type_ in (1, 7):
+        return raw
+    if type_ in (5, 10):
+        nums = struct.unpack(f"{bo}{count * 2}{code[0]}", raw)
+        values = tuple(IFDRational(nums[i], nums[i + 1]) for i in range(0, len(nums), 2))
+    else:
+        values = struct.unpack(f"{bo}{count}{code}", raw)
+    return values[0] if count == 1 else values
+
+
+class _TiffParser:
+    """Parses IFDs through a read_at(offset, size) callable."""
+
+    def __init__(self, read_at, size):
+        self.read_at = read_at
+        self.size = size
+        header = read_at(0, 8)
+        if len(header) < 8 or header[:2] not in (b"II", b"MM"):
+            raise ExifReadError("Missing TIFF header")
+        self.bo = "<" if header[:2] == b"II" else ">"
+        (self.first_ifd,) = struct.unpack(self.bo + "L", header[4:8])
+        self.seen = set()
+
+    def parse_ifd(self, offset):
+        """Returns ({tag: IfdEntry}, next_ifd_offset)."""
+        if offset in self.seen or not 8 <= offset < self.size:
+            return {}, 0
+        self.seen.add(offset)
+        bo = self.bo
+
+        (count,) = struct.unpack(bo + "H", self.read_at(offset, 2))
+        count = min(count, MAX_ENTRIES)
+        table = self.read_at(offset + 2, count * 12 + 4)
+        entries = {}
+        for i in range(count):
+            chunk = table[i * 12:i * 12 + 12]
+            if len(chunk) < 12:
+                break
+            tag, type_, n = struct.unpack(bo + "HHL", chunk[:8])
+            if type_ not in TYPES:
+                continue
+            size = TYPES[type_][0] * n
+            entry_offset = offset + 2 + i * 12
+            if size <= 4:
+                value_offset = entry_offset + 8
+                raw = chunk[8:8 + size]
+            else:
+                (value_offset,) = struct.unpack(bo + "L", chunk[8:12])
+                if value_offset + size > self.size:
+                    continue
+                raw = self.read_at(value_offset, size)
+            try:
+                value = _decode_value(type_, n, raw, bo)
+            except struct.error:
+                continue
+            entries[tag] = IfdEntry(tag, type_, n, value, value_offset, entry_offset)
+
+        next_raw = table[count * 12:count * 12 + 4]
+        next_ifd = struct.unpack(bo + "L", next_raw)[0] if len(next_raw) == 4 else 0
+        return entries, next_ifd
+
+    def parse(self, tree):
+        ifd0, next_ifd = self.parse_ifd(self.first_ifd)
+        tree.ifds["IFD0"] = ifd0
+        tree.ifd_offsets["IFD0"] = self.first_ifd
+        if 8 <= self.first_ifd < self.size:
+            (count,) = struct.unpack(self.bo + "H", self.read_at(self.first_ifd, 2))
+            tree.next_ifd_field = self.first_ifd + 2 + count * 12
+
+        # Follow the pointer tags down to the sub-IFDs
+        pending = [ifd0]
+        while pending:
+            ifd = pending.pop()
+            for pointer, name in SUB_IFDS.items():
+                entry = ifd.get(pointer)
+                if entry is None or name in tree.ifd_offsets or not isinstance(entry.value, int):
+                    continue
+                sub, _ = self.parse_ifd(entry.value)
+                tree.ifds[name] = sub
+                tree.ifd_offsets[name] = entry.value
+                pending.append(sub)
+
+        if next_ifd:
+            tree.ifds["IFD1"], _ = self.parse_ifd(next_ifd)
+            tree.ifd_offsets["IFD1"] = next_ifd
+        return tree
+
+
+def parse_tiff_payload(payload, container="raw", tiff_offset=0):
+    """Parse an in-memory TIFF-structured EXIF payload ("Exif\\0\\0" prefix optional)."""
+    if payload.startswith(EXIF_HEADER):
+        payload = payload[len(EXIF_HEADER):]
+        tiff_offset += len(EXIF_HEADER)
+    parser = _TiffParser(lambda off, n: payload[off:off + n], len(payload))
+    tree = ExifTree(parser.bo, container, tiff_offset, payload)
+    return parser.parse(tree)
+
+
+def find_jpeg_exif(fp):
+    """
+    Walk JPEG markers until the Exif APP1 segment.
+
+    Returns:
+        (file_offset_of_payload, payload) or (None, None). Other segments
+        are skipped with seeks, never read.
+    """
+    if fp.read(2) != b"\xff\xd8":
+        return None, None
+    while True:
+        prefix = fp.read(2)
+        if len(prefix) < 2 or prefix[0] != 0xFF:
+            return None, None
+        marker = prefix[1]
+        # Fill bytes (0xFF 0xFF ...) are allowed between segments
+        while marker == 0xFF:
+            fill = fp.read(1)
+            if not fill:
+                return None, None
+            marker = fill[0]
+        if marker in (0xDA, 0xD9):  # SOS / EOI - no metadata past this point
+            return None, None
+        length_bytes = fp.read(2)
+        if len(length_bytes) < 2:
+            return None, None
+        (length,) = struct.unpack(">H", length_bytes)
+        if marker == 0xE1:
+            start = fp.tell()
+            body = fp.read(length - 2)
+            if body.startswith(EXIF_HEADER):
+                return start, body
+        else:
+            fp.seek(length - 2, os.SEEK_CUR)
+
+
+def find_png_exif(fp):
+    """Walk PNG chunks for eXIf. Returns (file_offset_of_payload, payload) or (None, None)."""
+    if fp.read(8) != PNG_SIGNATURE:
+        return None, None
+    while True:
+        header = fp.read(8)
+        if len(header) < 8:
+            return None, None
+        length, chunk_type = struct.unpack(">L4s", header)
+        if chunk_type == b"eXIf":
+            start = fp.tell()
+            return start, fp.read(length)
+        if chunk_type == b"IEND":
+            return None, None
+        fp.seek(length + 4, os.SEEK_CUR)  # data + CRC
+
+
+def find_webp_exif(fp):
+    """Walk RIFF chunks for EXIF. Returns (file_offset_of_payload, payload) or (None, None)."""
+    header = fp.read(12)
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WEBP":
+        return None, None
+    end = 8 + struct.unpack("<L", header[4:8])[0]
+    while fp.tell() + 8 <= end:
+        chunk = fp.read(8)
+        if len(chunk) < 8:
+            return None, None
+        fourcc, length = chunk[:4], struct.unpack("<L", chunk[4:])[0]
+        if fourcc == b"EXIF":
+            start = fp.tell()
+            return start, fp.read(length)
+        fp.seek(length + (length & 1), os.SEEK_CUR)  # chunks are padded to even sizes
+    return None, None
+
+
+def _read_box_header(fp):
+    """(type, header_size, box_size) of the ISOBMFF box at fp, or None at the end."""
+    head = fp.read(8)
+    if len(head) < 8:
+        return None
+    size, box_type = struct.unpack(">L4s", head)
+    header_size = 8
+    if size == 1:
+        size = struct.unpack(">Q", fp.read(8))[0]
+        header_size = 16
+    elif size == 0:
+        here = fp.tell()
+        size = fp.seek(0, os.SEEK_END) - here + 8
+        fp.seek(here)
+    return box_type, header_size, size
+
+
+def _uint(data, pos, size):
+    return int.from_bytes(data[pos:pos + size], "big"), pos + size
+
+
+class HeicExifItem:
+    """
+    Where a HEIC file's Exif item lives, and the iloc fields describing it.
+
+    Attributes:
+        offset, length: file offset and size of the item's data, which
+            starts with a 4-byte offset to the TIFF header
+        offset_field, length_field: file offsets of the item's extent
+            offset/length in the iloc box (offset_size/length_size bytes)
+        base: base offset the extent offset is relative to
+    """
+
+    __slots__ = ("offset", "length", "offset_field", "offset_size", "length_field", "length_size", "base")
+
+    def __init__(self, offset, length, offset_field, offset_size, length_field, length_size, base):
+        self.offset = offset
+        self.length = length
+        self.offset_field = offset_field
+        self.offset_size = offset_size
+        self.length_field = length_field
+        self.length_size = length_size
+        self.base = base
+
+
+def read_heic_items(fp):
+    """
+    Items of a HEIF/HEIC file, from its meta box (iinf + iloc).
+
+    Returns:
+        (exif_id, items, iloc_start, (offset_size, length_size)), or None
+        without a meta/iloc box. exif_id is None when there's no Exif item.
+        items is a list of (item_id, construction_method, base_offset,
+        extents), extents being (offset_field, offset, length_field, length)
+        tuples. Item offsets are relative to where fp was when called; the
+        *_field values are positions in the iloc box body, which starts at
+        file offset iloc_start.
+    """
+    while True:
+        box = _read_box_header(fp)
+        if box is None:
+            return None
+        box_type, header_size, size = box
+        if box_type == b"meta":
+            meta_start = fp.tell() + 4  # skip FullBox version/flags
+            meta = fp.read(size - header_size)[4:]
+            break
+        fp.seek(size - header_size, os.SEEK_CUR)
+
+    exif_id = None
+    iloc = None
+    pos = 0
+    while pos + 8 <= len(meta):
+        size, box_type = struct.unpack_from(">L4s", meta, pos)
+        if size < 8:
+            return None
+        body = meta[pos + 8:pos + size]
+        if box_type == b"iinf":
+            version = body[0]
+            inner = 6 if version == 0 else 8
+            while inner + 8 <= len(body):
+                infe_size, infe_type = struct.unpack_from(">L4s", body, inner)
+                infe = body[inner + 8:inner + infe_size]
+                if infe_type == b"infe" and infe[0] >= 2:
+                    id_size = 2 if infe[0] == 2 else 4
+                    item_id, p = _uint(infe, 4, id_size)
+                    if infe[p + 2:p + 6] == b"Exif":
+                        exif_id = item_id
+                inner += max(infe_size, 8)
+        elif box_type == b"iloc":
+            iloc = body
+            iloc_start = meta_start + pos + 8
+        pos += size
+    if iloc is None:
+        return None
+
+    version = iloc[0]
+    offset_size, length_size = iloc[4] >> 4, iloc[4] & 15
+    base_offset_size = iloc[5] >> 4
+    index_size = (iloc[5] & 15) if version in (1, 2) else 0
+    count, p = _uint(iloc, 6, 4 if version == 2 else 2)
+    items = []
+    for _ in range(count):
+        item_id, p = _uint(iloc, p, 4 if version == 2 else 2)
+        method = 0
+        if version in (1, 2):
+            method, p = _uint(iloc, p, 2)
+            method &= 15
+        p += 2  # data_reference_index
+        base, p = _uint(iloc, p, base_offset_size)
+        extents, p = _uint(iloc, p, 2)
+        spans = []
+        for _ in range(extents):
+            p += index_size
+            offset_field = p
+            offset, p = _uint(iloc, p, offset_size)
+            length_field = p
+            length, p = _uint(iloc, p, length_size)
+            spans.append((offset_field, offset, length_field, length))
+        items.append((item_id, method, base, spans))
+    iloc_sizes = (offset_size, length_size)
+    return exif_id, items, iloc_start, iloc_sizes
+
+
+def locate_heic_exif(fp):
+    """
+    Find the Exif item of a HEIF/HEIC file through its meta box.
+
+    Returns:
+        HeicExifItem, or None. Only single-extent items stored in the file
+        itself (construction method 0) are supported.
+    """
+    start = fp.tell()
+    meta = read_heic_items(fp)
+    if meta is None or meta[0] is None:
+        return None
+    exif_id, items, iloc_start, (offset_size, length_size) = meta
+    for item_id, method, base, spans in items:
+        if item_id == exif_id:
+            if method != 0 or len(spans) != 1:
+                return None
+            offset_field, offset, length_field, length = spans[0]
+            return HeicExifItem(start + base + offset, length, iloc_start + offset_field, offset_size,
+                                iloc_start + length_field, length_size, base)
+    return None
+
+
+def find_heic_exif(fp):
+    """Exif item of a HEIF/HEIC file. Returns (file_offset_of_payload, payload) or (None, None)."""
+    item = locate_heic_exif(fp)
+    if item is None:
+        return None, None
+    fp.seek(item.offset)
+    data = fp.read(item.length)
+    if len(data) < 4:
+        return None, None
+    skip = 4 + struct.unpack(">L", data[:4])[0]  # usually 6, for an "Exif\0\0" prefix
+    return item.offset + skip, data[skip:]
+
+
+def sniff_container(head):
+    """Identify the container from the first few bytes (12 are enough)."""
+    if head.startswith(b"\xff\xd8"):
+        return "jpeg"
+    if head.startswith(PNG_SIGNATURE):
+        return "png"
+    if head[:4] in (b"II*\x00", b"MM\x00*"):
+        return "tiff"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[4:8] == b"ftyp" and head[8:12] in HEIF_BRANDS:
+        return "heic"
+    return None
+
+
+# Containers that keep the EXIF in one block -> its finder
+EXIF_FINDERS = {
+    "jpeg": find_jpeg_exif,
+    "png": find_png_exif,
+    "webp": find_webp_exif,
+    "heic": find_heic_exif,
+}
+
+
+def read_exif_from_file(fp):
+    """Parse the EXIF block of an open binary file. Returns ExifTree or None."""
+    start = fp.tell()
+    container = sniff_container(fp.read(12))
+    fp.seek(start)
+
+    if container == "tiff":
+        # The whole file is the TIFF structure; read entries on demand
+        size = fp.seek(0, os.SEEK_END) - start
+
+        def read_at(offset, n):
+            fp.seek(start + offset)
+            return fp.read(n)
+
+        parser = _TiffParser(read_at, size)
+        return parser.parse(ExifTree(parser.bo, "tiff", start))
+
+    if container not in EXIF_FINDERS:
+        return None
+    offset, payload = EXIF_FINDERS[container](fp)
+    if payload is None:
+        return None
+    return parse_tiff_payload(payload, container, offset)
+
+
+def read_exif(path):
+    """
+    Read the EXIF tree of an image file without decoding it.
+
+    Returns:
+        ExifTree, or None if the file has no EXIF block
+    """
+    with span("file.open"):
+        fp = open(path, "rb")
+    with fp, span("exif.parse"):
+        return read_exif_from_file(fp)
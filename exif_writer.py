@@ -0,0 +1,585 @@
+"""
+Lossless EXIF writer.
+
+Rewrites only the metadata segments of an image and copies the compressed
+image data byte for byte, so saving never decodes or re-encodes pixels.
+There is one writer per container (see WRITERS):
+
+    jpeg    APP1 segment spliced in front of the scan data
+    png     eXIf chunk replaced (CRC recomputed), legacy text-chunk EXIF dropped
+    webp    RIFF EXIF chunk replaced, VP8X flags/header updated
+    tiff    new IFD0/Exif/GPS IFDs appended and relinked; pages stay put
+    heic    Exif item overwritten, or moved to a new mdat box when it grows
+
+Writers read src_path, or data when the caller already holds the whole
+source file in memory (see pipeline.py); the output always goes to disk.
+"""
+import io
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from contextlib import contextmanager
+
+from PIL import Image, UnidentifiedImageError
+
+from exif_reader import (PNG_SIGNATURE, SUB_IFDS, TYPES, locate_heic_exif,
+                         parse_tiff_payload, read_exif_from_file, sniff_container)
+from instrumentation import span
+
+SOI = b"\xff\xd8"
+APP0 = 0xE0
+APP1 = 0xE1
+SOS = 0xDA
+EXIF_HEADER = b"Exif\x00\x00"
+MAX_SEGMENT_PAYLOAD = 0xFFFF - 2  # segment length field counts itself
+
+# Extensions that mean "keep it a JPEG" when picking the lossless path
+JPEG_EXTENSIONS = {"", ".jpg", ".jpeg", ".jpe", ".jfif"}
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# PNG text chunks that may hold EXIF the pre-eXIf way
+PNG_TEXT_CHUNKS = (b"tEXt", b"zTXt", b"iTXt")
+LEGACY_PNG_EXIF_KEYWORDS = (b"Raw profile type exif", b"Raw profile type APP1")
+
+# IFD0 tags describing where and how the pixels are stored; a relinked TIFF
+# keeps the file's own values for these
+IMAGE_LAYOUT_TAGS = (
+    254, 256, 257, 258, 259, 262, 266, 273, 277, 278, 279, 284, 317, 320,
+    322, 323, 324, 325, 330, 338, 339, 347, 513, 514, 529, 530, 531, 532,
+)
+
+# VP8X feature flags
+WEBP_EXIF_FLAG = 0x08
+WEBP_ALPHA_FLAG = 0x10
+
+
+class ExifWriteError(Exception):
+    """Raised when a file can't be rewritten without re-encoding it."""
+
+
+def sniff_file(path):
+    """Container of a file from its magic bytes, not its extension."""
+    with open(path, "rb") as fp:
+        return sniff_container(fp.read(12))
+
+
+def _open_source(src_path, data=None):
+    """The source file, or a file object over its contents when the caller already read them."""
+    return io.BytesIO(data) if data is not None else open(src_path, "rb")
+
+
+def _copy_exact(src, dst, length):
+    """Copy exactly length bytes from src to dst."""
+    while length > 0:
+        block = src.read(min(COPY_BUFFER_SIZE, length))
+        if not block:
+            raise ExifWriteError("Unexpected end of file")
+        dst.write(block)
+        length -= len(block)
+
+
+def _tiff_payload(exif_payload):
+    """The raw TIFF bytes, without the "Exif\0\0" prefix JPEG uses."""
+    if exif_payload is not None and exif_payload.startswith(EXIF_HEADER):
+        return exif_payload[len(EXIF_HEADER):]
+    return exif_payload
+
+
+def read_jpeg_header(fp):
+    """
+    Read the marker segments in front of the scan data.
+
+    Args:
+        fp: binary file object positioned at the start of a JPEG
+
+    Returns:
+        list of (marker, segment_bytes) tuples. On return fp is positioned
+        at the SOS marker, so everything after it can be copied verbatim.
+    """
+    if fp.read(2) != SOI:
+        raise ExifWriteError("Not a JPEG file (missing SOI marker)")
+
+    segments = []
+    while True:
+        start = fp.tell()
+        prefix = fp.read(2)
+        if len(prefix) < 2 or prefix[0] != 0xFF:
+            raise ExifWriteError(f"Corrupt JPEG marker at offset {start}")
+        marker = prefix[1]
+        # Fill bytes (0xFF 0xFF ...) are allowed between segments
+        while marker == 0xFF:
+            fill = fp.read(1)
+            if not fill:
+                raise ExifWriteError("Unexpected end of file in JPEG header")
+            marker = fill[0]
+        if marker == SOS:
+            fp.seek(-2, os.SEEK_CUR)
+            return segments
+        length_bytes = fp.read(2)
+        if len(length_bytes) < 2:
+            raise ExifWriteError("Unexpected end of file in JPEG header")
+        (length,) = struct.unpack(">H", length_bytes)
+        body = fp.read(length - 2)
+        if len(body) != length - 2:
+            raise ExifWriteError("Unexpected end of file in JPEG header")
+        segments.append((marker, bytes([0xFF, marker]) + length_bytes + body))
+
+
+def is_exif_segment(marker, segment):
+    return marker == APP1 and segment[4:10] == EXIF_HEADER
+
+
+def build_app1(exif_payload):
+    """Wrap an 'Exif\\0\\0' + TIFF payload in an APP1 segment."""
+    if not exif_payload.startswith(EXIF_HEADER):
+        exif_payload = EXIF_HEADER + exif_payload
+    if len(exif_payload) > MAX_SEGMENT_PAYLOAD:
+        raise ExifWriteError(
+            f"EXIF data is {len(exif_payload)} bytes, the JPEG limit is {MAX_SEGMENT_PAYLOAD}"
+        )
+    return struct.pack(">BBH", 0xFF, APP1, len(exif_payload) + 2) + exif_payload
+
+
+def splice_segments(segments, exif_payload):
+    """
+    Replace every Exif APP1 segment with a single new one.
+
+    The new segment goes right after a leading JFIF APP0 (if any), which is
+    where readers expect to find it. Passing exif_payload=None strips EXIF.
+    """
+    kept = [(m, s) for m, s in segments if not is_exif_segment(m, s)]
+    if exif_payload is None:
+        return [s for _, s in kept]
+
+    insert_at = 1 if kept and kept[0][0] == APP0 else 0
+    out = [s for _, s in kept]
+    out.insert(insert_at, build_app1(exif_payload))
+    return out
+
+
+def write_jpeg_exif(src_path, dst_path, exif_payload, data=None):
+    """
+    Copy a JPEG with a new EXIF block, leaving the scan data untouched.
+
+    Only the header segments are held in memory; the rest of the file is
+    streamed, so the cost is a plain file copy regardless of image size.
+    The output is written to a temp file and renamed into place, which also
+    makes saving over the source file safe.
+    """
+    with atomic_output(dst_path, src_path) as dst:
+        with _open_source(src_path, data) as src:
+            segments = read_jpeg_header(src)
+            dst.write(SOI)
+            for segment in splice_segments(segments, exif_payload):
+                dst.write(segment)
+            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
+
+@contextmanager
+def atomic_output(dst_path, mode_from=None):
+    """
+    Open a temp file next to dst_path and rename it over dst_path on success.
+
+    Readers (and directory watchers) never see a half-written file, and a
+    failed write leaves the old dst_path alone.
+    """
+    dst_dir = os.path.dirname(os.path.abspath(dst_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".exif-", suffix=".tmp", dir=dst_dir)
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            yield fp
+        if mode_from is not None:
+            shutil.copymode(mode_from, tmp_path)
+        os.replace(tmp_path, dst_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_png_exif(src_path, dst_path, exif_payload, data=None):
+    """
+    Copy a PNG with a new eXIf chunk, every other chunk byte for byte.
+
+    The chunk goes in front of the first IDAT. Old eXIf chunks are dropped,
+    and so are text chunks holding EXIF the pre-eXIf way (ImageMagick's
+    "Raw profile type exif"), which would otherwise leak the old values.
+    """
+    payload = _tiff_payload(exif_payload)
+    with atomic_output(dst_path, src_path) as dst:
+        with _open_source(src_path, data) as src:
+            if src.read(8) != PNG_SIGNATURE:
+                raise ExifWriteError("Not a PNG file")
+            dst.write(PNG_SIGNATURE)
+            while True:
+                header = src.read(8)
+                if len(header) < 8:
+                    raise ExifWriteError("PNG ends without an IEND chunk")
+                length, chunk_type = struct.unpack(">L4s", header)
+                if chunk_type == b"eXIf" or (chunk_type in PNG_TEXT_CHUNKS and _is_legacy_exif(src, length)):
+                    src.seek(length + 4, os.SEEK_CUR)
+                    continue
+                if chunk_type == b"IDAT" and payload is not None:
+                    dst.write(_png_chunk(b"eXIf", payload))
+                    payload = None
+                dst.write(header)
+                _copy_exact(src, dst, length + 4)  # data + original CRC
+                if chunk_type == b"IEND":
+                    break
+
+
+def _png_chunk(chunk_type, data):
+    crc = zlib.crc32(chunk_type + data)
+    return struct.pack(">L", len(data)) + chunk_type + data + struct.pack(">L", crc)
+
+
+def _is_legacy_exif(src, length):
+    """Peek at a text chunk's keyword; src is left where it was."""
+    start = src.tell()
+    keyword = src.read(min(length, 80)).split(b"\x00", 1)[0]
+    src.seek(start)
+    return keyword in LEGACY_PNG_EXIF_KEYWORDS
+
+
+def _webp_canvas(fourcc, data):
+    """(width, height, has_alpha) from a VP8 / VP8L bitstream header."""
+    if fourcc == b"VP8 " and len(data) >= 10 and data[3:6] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", data[6:10])
+        return width & 0x3FFF, height & 0x3FFF, False
+    if fourcc == b"VP8L" and len(data) >= 5 and data[0] == 0x2F:
+        bits = int.from_bytes(data[1:5], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, bool(bits >> 28 & 1)
+    raise ExifWriteError("Unrecognized WebP bitstream")
+
+
+def write_webp_exif(src_path, dst_path, exif_payload, data=None):
+    """
+    Copy a WebP with a new EXIF chunk, the image chunks byte for byte.
+
+    Simple (VP8/VP8L-only) files get the VP8X header the extended format
+    needs to carry metadata; the EXIF chunk goes after the image data and
+    before XMP, as the container spec orders them.
+    """
+    payload = _tiff_payload(exif_payload)
+    with _open_source(src_path, data) as src:
+        header = src.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WEBP":
+            raise ExifWriteError("Not a WebP file")
+        end = 8 + struct.unpack("<L", header[4:8])[0]
+        chunks = []  # (fourcc, data offset, length)
+        while src.tell() + 8 <= end:
+            chunk_header = src.read(8)
+            fourcc, length = chunk_header[:4], struct.unpack("<L", chunk_header[4:])[0]
+            chunks.append((fourcc, src.tell(), length))
+            src.seek(length + (length & 1), os.SEEK_CUR)
+
+        out = []  # (fourcc, bytes) for new chunks, (fourcc, offset, length) for copied ones
+        if chunks and chunks[0][0] == b"VP8X":
+            src.seek(chunks[0][1])
+            vp8x = bytearray(src.read(chunks[0][2]))
+            chunks = chunks[1:]
+        elif payload is not None:
+            bitstream = next((c for c in chunks if c[0] in (b"VP8 ", b"VP8L")), None)
+            if bitstream is None:
+                raise ExifWriteError("WebP has no image data")
+            src.seek(bitstream[1])
+            width, height, alpha = _webp_canvas(bitstream[0], src.read(min(bitstream[2], 30)))
+            vp8x = bytearray(struct.pack("<B3x", WEBP_ALPHA_FLAG if alpha else 0))
+            vp8x += (width - 1).to_bytes(3, "little") + (height - 1).to_bytes(3, "little")
+        else:
+            vp8x = None
+        if vp8x is not None:
+            if payload is None:
+                vp8x[0] &= ~WEBP_EXIF_FLAG & 0xFF
+            else:
+                vp8x[0] |= WEBP_EXIF_FLAG
+            out.append((b"VP8X", bytes(vp8x)))
+
+        for fourcc, offset, length in chunks:
+            if fourcc == b"EXIF":
+                continue
+            if fourcc == b"XMP " and payload is not None:
+                out.append((b"EXIF", payload))
+                payload = None
+            out.append((fourcc, offset, length))
+        if payload is not None:
+            out.append((b"EXIF", payload))
+
+        sizes = [len(c[1]) if len(c) == 2 else c[2] for c in out]
+        riff_size = 4 + sum(8 + size + (size & 1) for size in sizes)
+        with atomic_output(dst_path, src_path) as dst:
+            dst.write(b"RIFF" + struct.pack("<L", riff_size) + b"WEBP")
+            for chunk, size in zip(out, sizes):
+                dst.write(chunk[0] + struct.pack("<L", size))
+                if len(chunk) == 2:
+                    dst.write(chunk[1])
+                else:
+                    src.seek(chunk[1])
+                    _copy_exact(src, dst, size)
+                if size & 1:
+                    dst.write(b"\x00")
+
+
+def _convert_value(raw, type_, count, src_bo, dst_bo):
+    """Re-encode a TIFF value's bytes for another byte order."""
+    if src_bo == dst_bo or type_ in (1, 2, 6, 7):
+        return raw
+    code = TYPES[type_][1]
+    if type_ in (5, 10):
+        fmt = f"{count * 2}{code[0]}"
+    else:
+        fmt = f"{count}{code}"
+    return struct.pack(dst_bo + fmt, *struct.unpack(src_bo + fmt, raw))
+
+
+def _raw_entries(tree, name, bo, read_at):
+    """{tag: (type, count, value bytes in byte order bo)} for one IFD of a tree."""
+    return {
+        tag: (entry.type, entry.count,
+              _convert_value(read_at(entry.value_offset, entry.size), entry.type, entry.count, tree.byte_order, bo))
+        for tag, entry in tree.ifds[name].items()
+    }
+
+
+def _serialize_ifds(ifds, bo, base, next_ifd):
+    """
+    Lay out IFD0 and its sub-IFDs at file offset base.
+
+    Args:
+        ifds: {name: {tag: (type, count, raw)}} as made by _raw_entries()
+        next_ifd: what IFD0's next-IFD link points at (the next page)
+
+    Returns:
+        (bytes, file offset of the new IFD0). Pointer tags are rewritten to
+        the new sub-IFD offsets; pointers to empty sub-IFDs are dropped.
+    """
+    names = ["IFD0"] + [name for name in ("Exif", "GPS", "Interop") if ifds.get(name)]
+    tables = {}
+    offsets = {}
+    size = 0
+    for name in names:
+        entries = sorted(
+            (tag, value) for tag, value in ifds[name].items()
+            if tag not in SUB_IFDS or SUB_IFDS[tag] in names
+        )
+        tables[name] = entries
+        offsets[name] = size
+        size += 2 + 12 * len(entries) + 4
+        size += sum(len(raw) + (len(raw) & 1) for _, (_, _, raw) in entries if len(raw) > 4)
+        size += size & 1
+
+    out = bytearray()
+    for name in names:
+        entries = tables[name]
+        values_at = offsets[name] + 2 + 12 * len(entries) + 4
+        table = bytearray(struct.pack(bo + "H", len(entries)))
+        values = bytearray()
+        for tag, (type_, count, raw) in entries:
+            if tag in SUB_IFDS:
+                table += struct.pack(bo + "HHLL", tag, 4, 1, base + offsets[SUB_IFDS[tag]])
+            elif len(raw) <= 4:
+                table += struct.pack(bo + "HHL", tag, type_, count) + raw.ljust(4, b"\x00")
+            else:
+                table += struct.pack(bo + "HHLL", tag, type_, count, base + values_at + len(values))
+                values += raw + b"\x00" * (len(raw) & 1)
+        table += struct.pack(bo + "L", next_ifd if name == "IFD0" else 0)
+        out += table + values
+        out += b"\x00" * (len(out) & 1)
+    return bytes(out), base + offsets["IFD0"]
+
+
+def _stale_ranges(old, ifds, read_at):
+    """
+    Byte ranges of the old IFDs that the relinked file no longer uses:
+    the IFD tables and the out-of-line values that changed or were removed.
+    Values shared with IFD1 (the next page) are left alone.
+    """
+    ranges = []
+    in_use = [
+        (entry.value_offset, entry.value_offset + entry.size)
+        for entry in old.ifds["IFD1"].values() if entry.size > 4
+    ]
+    for name in ("IFD0", "Exif", "GPS", "Interop"):
+        if name not in old.ifd_offsets:
+            continue
+        entries = old.ifds[name]
+        ranges.append((old.ifd_offsets[name], 2 + 12 * len(entries) + 4))
+        for tag, entry in entries.items():
+            if entry.size <= 4:
+                continue
+            raw = read_at(entry.value_offset, entry.size)
+            if ifds.get(name, {}).get(tag) == (entry.type, entry.count, raw):
+                continue
+            start, end = entry.value_offset, entry.value_offset + entry.size
+            if not any(start < used_end and used_start < end for used_start, used_end in in_use):
+                ranges.append((start, entry.size))
+    return ranges
+
+
+def write_tiff_exif(src_path, dst_path, exif_payload, data=None):
+    """
+    Copy a TIFF with new IFD0/Exif/GPS/Interop IFDs, relinked in place of the old ones.
+
+    The file is copied as is, the new IFDs are appended and the header is
+    pointed at them. Strips, tiles and further pages stay where they were:
+    IFD0's image-layout tags are carried over from the file (not from the
+    payload, whose strip offsets Pillow rebases) and it still links to the
+    next page. The old IFD tables and the values that changed are zeroed,
+    so replaced metadata can't be read back out of the file.
+    """
+    new = parse_tiff_payload(_tiff_payload(exif_payload))
+    with _open_source(src_path, data) as src:
+        header = src.read(8)
+        if header[:2] not in (b"II", b"MM") or header[2:4] not in (b"*\x00", b"\x00*"):
+            raise ExifWriteError("Not a classic TIFF file (BigTIFF isn't supported)")
+        src.seek(0)
+        old = read_exif_from_file(src)
+        size = src.seek(0, os.SEEK_END)
+        bo = old.byte_order
+
+        def read_old(offset, length):
+            src.seek(offset)
+            return src.read(length)
+
+        def read_new(offset, length):
+            return new.payload[offset:offset + length]
+
+        ifds = {name: _raw_entries(new, name, bo, read_new) for name in ("IFD0", "Exif", "GPS", "Interop")}
+        old_ifd0 = _raw_entries(old, "IFD0", bo, read_old)
+        for tag in IMAGE_LAYOUT_TAGS:
+            ifds["IFD0"].pop(tag, None)
+            if tag in old_ifd0:
+                ifds["IFD0"][tag] = old_ifd0[tag]
+
+        next_ifd = 0
+        if old.next_ifd_field is not None:
+            (next_ifd,) = struct.unpack(bo + "L", read_old(old.next_ifd_field, 4))
+        stale = _stale_ranges(old, ifds, read_old)
+
+        base = size + (size & 1)
+        block, first_ifd = _serialize_ifds(ifds, bo, base, next_ifd)
+        if base + len(block) > 0xFFFFFFFF:
+            raise ExifWriteError("TIFF would grow past 4 GB")
+
+        with atomic_output(dst_path, src_path) as dst:
+            src.seek(0)
+            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+            dst.write(b"\x00" * (base - size))
+            dst.write(block)
+            for offset, length in stale:
+                dst.seek(offset)
+                dst.write(bytes(length))
+            dst.seek(4)
+            dst.write(struct.pack(bo + "L", first_ifd))
+
+
+def write_heic_exif(src_path, dst_path, exif_payload, data=None):
+    """
+    Copy a HEIC with a new Exif item, the image items byte for byte.
+
+    An EXIF block that fits the old item overwrites it (zero-padded), so
+    no box changes at all. A bigger one goes into a new mdat box at the end
+    of the file; the item's iloc extent is repointed at it (the fields are
+    patched, their size doesn't change) and the old data is zeroed. Adding
+    EXIF to a file without an Exif item would need the meta box rebuilt,
+    which isn't supported.
+    """
+    with _open_source(src_path, data) as src:
+        item = locate_heic_exif(src)
+        if item is None:
+            raise ExifWriteError("HEIC file has no Exif item to overwrite")
+        src.seek(item.offset)
+        prefix = src.read(4)
+        header = prefix + src.read(struct.unpack(">L", prefix)[0])  # offset field + "Exif\0\0" (if present)
+        item_data = header + _tiff_payload(exif_payload)
+        size = src.seek(0, os.SEEK_END)
+
+        with atomic_output(dst_path, src_path) as dst:
+            src.seek(0)
+            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+            if len(item_data) <= item.length:
+                dst.seek(item.offset)
+                dst.write(item_data.ljust(item.length, b"\x00"))
+                return
+
+            new_offset = size + 8 - item.base  # data starts after the mdat box header
+            if new_offset >= 1 << (8 * item.offset_size) or len(item_data) >= 1 << (8 * item.length_size):
+                raise ExifWriteError("HEIC iloc fields are too small to move the Exif item")
+            dst.write(struct.pack(">L4s", 8 + len(item_data), b"mdat") + item_data)
+            dst.seek(item.offset)
+            dst.write(bytes(item.length))
+            dst.seek(item.offset_field)
+            dst.write(new_offset.to_bytes(item.offset_size, "big"))
+            dst.seek(item.length_field)
+            dst.write(len(item_data).to_bytes(item.length_size, "big"))
+
+
+# Lossless writer per container, and the extensions that keep a file in it
+WRITERS = {
+    "jpeg": (write_jpeg_exif, JPEG_EXTENSIONS),
+    "png": (write_png_exif, {"", ".png"}),
+    "webp": (write_webp_exif, {"", ".webp"}),
+    "tiff": (write_tiff_exif, {"", ".tif", ".tiff"}),
+    "heic": (write_heic_exif, {"", ".heic", ".heif"}),
+}
+
+
+def save_with_exif(src_path, dst_path, exif, data=None, reencode=False):
+    """
+    Save src_path to dst_path with the given EXIF.
+
+    Saves that keep the container (JPEG to .jpg, PNG to .png, ...) take
+    its lossless writer from WRITERS. Anything else, like a format change
+    or a file that writer can't handle, needs a Pillow re-save, which
+    decodes and re-encodes the image; that only happens when asked for.
+
+    Args:
+        exif: Pillow Exif object, or a ready TIFF payload as bytes
+            (see exif_blocks.build_payload)
+        data: contents of src_path, if already read; the source isn't
+            opened again then
+        reencode: fall back to re-encoding instead of raising
+
+    Returns:
+        bool: True if the lossless path was used
+
+    Raises:
+        ExifWriteError: if the file can't be saved losslessly and
+            reencode is off
+    """
+    if isinstance(exif, bytes) and not exif.startswith(EXIF_HEADER):
+        exif = EXIF_HEADER + exif
+    ext = os.path.splitext(dst_path)[1].lower()
+    container = sniff_container(data[:12]) if data is not None else sniff_file(src_path)
+    writer, extensions = WRITERS.get(container, (None, ()))
+    error = None
+    if writer is not None and ext in extensions:
+        try:
+            with span("save.write", container=container, lossless=True):
+                writer(src_path, dst_path, exif if isinstance(exif, bytes) else exif.tobytes(), data)
+            return True
+        except ExifWriteError as e:
+            error = e  # re-encode instead, if allowed
+    if not reencode:
+        if error is None:
+            error = (f"no lossless writer for {container or 'this file type'}" if writer is None
+                     else f"a {container} file can't be saved as {ext} without converting it")
+        raise ExifWriteError(f"saving would re-encode the image: {error}")
+
+    try:
+        img = Image.open(io.BytesIO(data) if data is not None else src_path)
+    except UnidentifiedImageError:
+        if error is not None:
+            raise error from None  # e.g. HEIC without a Pillow plugin
+        if data is not None:
+            raise UnidentifiedImageError(f"cannot identify image file {src_path!r}") from None
+        raise
+    with img, span("save.encode", container=container, lossless=False):
+        # Same format choice Pillow makes from the extension, via a temp file
+        fmt = Image.registered_extensions().get(ext) or img.format
+        with atomic_output(dst_path, src_path) as dst:
+            img.save(dst, format=fmt, exif=exif)
+    return False
@@ -0,0 +1,334 @@
+"""
+Bulk metadata export, for auditing what a tree of images leaks before it
+is scrubbed.
+
+Every file becomes one row with a fixed set of columns: the file's path,
+size and container, audit flags (GPS position, serial numbers, owner
+names, MakerNote, embedded thumbnail), the decoded position, then one
+column per tag known to PIL.ExifTags.TAGS and GPSTAGS. Only the EXIF
+blocks are parsed, on a process pool, and rows are written as they come
+in, so memory stays flat however big the tree is.
+
+Usage:
+    python main.py export PHOTOS/ -o inventory.csv
+    python main.py export PHOTOS/ -o inventory.parquet   (needs pyarrow)
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+from PIL.ExifTags import GPSTAGS, TAGS
+from PIL.TiffImagePlugin import IFDRational
+
+from batch import iter_input_files
+from exif_reader import SUB_IFDS, read_exif
+from gps_obfuscation import read_coordinates
+
+FORMATS = ("csv", "jsonl", "parquet")
+MAX_BINARY = 64  # longer undefined/byte values are summarized as "<N bytes>"
+ROW_GROUP_SIZE = 10_000  # rows buffered per Parquet row group
+
+SERIAL_TAGS = {0xA431, 0xA435, 0xC62F}  # BodySerialNumber, LensSerialNumber, CameraSerialNumber
+OWNER_TAGS = {0x013B, 0x8298, 0xA430, 0x9C9D}  # Artist, Copyright, CameraOwnerName, XPAuthor
+XP_TAGS = {0x9C9B, 0x9C9C, 0x9C9D, 0x9C9E, 0x9C9F}  # Windows tags, UTF-16 text in BYTE values
+MAKERNOTE = 0x927C
+
+# (name, type) of the columns before the tags; the types are for Parquet
+BASE_COLUMNS = [
+    ("path", "string"),
+    ("container", "string"),
+    ("size", "int64"),
+    ("error", "string"),
+    ("gps", "bool"),
+    ("serial", "bool"),
+    ("owner", "bool"),
+    ("makernote", "bool"),
+    ("thumbnail", "bool"),
+    ("latitude", "float64"),
+    ("longitude", "float64"),
+]
+
+
+def _tag_columns(tags, skip=()):
+    """Unique tag names in tag id order (a few names are shared by two ids)."""
+    names = []
+    for tag in sorted(tags):
+        if tag not in skip and tags[tag] not in names:
+            names.append(tags[tag])
+    return names
+
+
+TAG_COLUMNS = _tag_columns(TAGS, skip=SUB_IFDS)  # the IFD pointers are just offsets
+GPS_COLUMNS = _tag_columns(GPSTAGS)
+TAG_NAMES = set(TAG_COLUMNS)
+COLUMNS = [name for name, _ in BASE_COLUMNS] + TAG_COLUMNS + GPS_COLUMNS
+
+
+class ExportError(Exception):
+    """Raised when the output can't be written (e.g. Parquet without pyarrow)."""
+
+
+def format_value(value, tag=None):
+    """One EXIF value as text: rationals as decimals, tuples space-separated."""
+    if isinstance(value, bytes):
+        if tag in XP_TAGS:
+            return value.decode("utf-16-le", errors="replace").rstrip("\x00")
+        if len(value) > MAX_BINARY:
+            return f"<{len(value)} bytes>"
+        text = value.rstrip(b"\x00")
+        if text and all(32 <= b < 127 for b in text):
+            return text.decode("ascii")
+        return value.hex()
+    if isinstance(value, tuple):
+        return " ".join(format_value(item) for item in value)
+    if isinstance(value, IFDRational):
+        return str(float(value))
+    if isinstance(value, str):
+        return value.strip()
+    return str(value)
+
+
+def inventory_row(path):
+    """
+    The export row of one file. Columns without a value are left out.
+
+    Returns:
+        dict of column name -> value
+    """
+    row = {"path": path}
+    try:
+        row["size"] = os.path.getsize(path)
+        tree = read_exif(path)
+    except Exception as e:
+        row["error"] = str(e) or type(e).__name__
+        return row
+
+    main_tags = {}
+    if tree:
+        row["container"] = tree.container
+        for ifd in ("IFD0", "Exif", "Interop"):
+            main_tags.update(tree.values(ifd))
+    gps = tree.values("GPS") if tree else {}
+
+    for tag, value in main_tags.items():
+        name = TAGS.get(tag)
+        if name in row or name not in TAG_NAMES:
+            continue
+        text = format_value(value, tag)
+        if text:
+            row[name] = text
+    for tag, value in gps.items():
+        name = GPSTAGS.get(tag)
+        if name is not None and name not in row:
+            text = format_value(value, tag)
+            if text:
+                row[name] = text
+
+    position = read_coordinates(gps)
+    if position is not None:
+        row["latitude"], row["longitude"] = position
+    row["gps"] = position is not None
+    row["serial"] = any(format_value(main_tags[tag], tag) for tag in SERIAL_TAGS if tag in main_tags)
+    row["owner"] = any(format_value(main_tags[tag], tag) for tag in OWNER_TAGS if tag in main_tags)
+    row["makernote"] = MAKERNOTE in main_tags
+    row["thumbnail"] = bool(tree and tree.thumbnail_range)
+    return row
+
+
+def _export_task(paths):
+    """Worker entry point: rows for a chunk of paths."""
+    return [inventory_row(path) for path in paths]
+
+
+class CsvSink:
+    """One CSV line per file, every column always present."""
+
+    def __init__(self, path):
+        self.fp = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.fp, COLUMNS)
+        self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.fp.close()
+
+
+class JsonlSink:
+    """One JSON object per line, with only the columns that have a value."""
+
+    def __init__(self, path):
+        self.fp = open(path, "w", encoding="utf-8")
+
+    def write(self, rows):
+        for row in rows:
+            self.fp.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.fp.close()
+
+
+class ParquetSink:
+    """Parquet file with the fixed schema, written in row groups of ROW_GROUP_SIZE."""
+
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ExportError("Parquet output needs pyarrow (pip install pyarrow)") from None
+        self.pa = pyarrow
+        types = {"string": pyarrow.string(), "int64": pyarrow.int64(),
+                 "bool": pyarrow.bool_(), "float64": pyarrow.float64()}
+        fields = [(name, types[kind]) for name, kind in BASE_COLUMNS]
+        fields += [(name, pyarrow.string()) for name in TAG_COLUMNS + GPS_COLUMNS]
+        self.schema = pyarrow.schema(fields)
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression="zstd")
+        self.buffer = []
+
+    def write(self, rows):
+        self.buffer.extend(rows)
+        if len(self.buffer) >= ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.writer.write_table(self.pa.Table.from_pylist(self.buffer, schema=self.schema))
+            self.buffer = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+SINKS = {"csv": CsvSink, "jsonl": JsonlSink, "parquet": ParquetSink}
+
+
+def open_sink(path, fmt=None):
+    """Writer for path; the format comes from the extension unless given."""
+    fmt = fmt or os.path.splitext(path)[1].lower().lstrip(".")
+    if fmt not in SINKS:
+        raise ExportError(f"Unknown output format {fmt!r} (use one of {', '.join(FORMATS)})")
+    return SINKS[fmt](path)
+
+
+class ExportStats:
+    """Counters for the end-of-run summary."""
+
+    def __init__(self):
+        self.files = 0
+        self.failed = 0
+        self.gps = 0
+        self.serial = 0
+        self.owner = 0
+        self.started = time.perf_counter()
+
+    def add(self, row):
+        self.files += 1
+        self.failed += "error" in row
+        self.gps += bool(row.get("gps"))
+        self.serial += bool(row.get("serial"))
+        self.owner += bool(row.get("owner"))
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (
+            f"{self.files} files: {self.gps} with GPS, {self.serial} with serial numbers, "
+            f"{self.owner} with owner names, {self.failed} unreadable "
+            f"in {elapsed:.2f}s ({self.files / elapsed:.1f} files/s)"
+        )
+
+
+def run_export(paths, sink, workers=None, max_in_flight=None, chunk_size=64):
+    """
+    Read the EXIF of every path on a process pool and write the rows to sink.
+
+    Rows are written in input order. At most max_in_flight chunks are
+    queued at once, so the path iterator is consumed lazily.
+
+    Args:
+        paths: iterable of file paths
+        sink: CsvSink, JsonlSink or ParquetSink (see open_sink)
+        workers: pool size, defaults to the core count
+
+    Returns:
+        ExportStats
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 4
+    stats = ExportStats()
+    paths = iter(paths)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+
+        def fill():
+            while len(pending) < max_in_flight:
+                chunk = list(islice(paths, chunk_size))
+                if not chunk:
+                    return
+                try:
+                    future = pool.submit(_export_task, chunk)
+                except BrokenProcessPool as e:
+                    # A worker died and took the pool down; the remaining chunks get error rows too
+                    future = Future()
+                    future.set_exception(e)
+                pending.append((future, chunk))
+
+        fill()
+        while pending:
+            future, chunk = pending.popleft()
+            try:
+                rows = future.result()
+            except Exception as e:
+                # The worker itself died; report the whole chunk
+                rows = [{"path": path, "error": str(e)} for path in chunk]
+            sink.write(rows)
+            for row in rows:
+                stats.add(row)
+            fill()
+    return stats
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="exifuscator export",
+        description="Export the EXIF metadata of many images to CSV, JSON lines or Parquet.",
+    )
+    parser.add_argument("inputs", nargs="+", help="image files, directories or glob patterns")
+    parser.add_argument("-o", "--output", required=True, help="output file (.csv, .jsonl or .parquet)")
+    parser.add_argument("--format", choices=FORMATS, help="output format (default: from the file extension)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: core count)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="files per worker task (default: %(default)s)")
+    parser.add_argument("--no-recursive", action="store_true", help="don't descend into subdirectories")
+    return parser
+
+
+def main(argv=None):
+    """Command line entry point. Returns a process exit code."""
+    args = build_parser().parse_args(argv)
+    try:
+        sink = open_sink(args.output, args.format)
+    except (OSError, ExportError) as e:
+        print(f"Can't write {args.output}: {e}", file=sys.stderr)
+        return 2
+
+    paths = (path for path, _ in iter_input_files(args.inputs, not args.no_recursive))
+    try:
+        stats = run_export(paths, sink, workers=args.workers, chunk_size=max(1, args.chunk_size))
+    finally:
+        sink.close()
+    print(stats.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+Folder gallery for the main window.
+
+A QListView in icon mode over a list model of the folder's images. The
+view only asks for the items it paints, and a thumbnail is only loaded
+(on a thread pool, through thumbnail_cache) when an item is asked for.
+Items scrolled past before their turn came are skipped. Each thumbnail
+gets GPS / SN badges for images that leak a location or serial number.
+"""
+import os
+from collections import OrderedDict
+
+from PyQt5.QtWidgets import QDockWidget, QListView, QAbstractItemView
+from PyQt5.QtCore import (Qt, QAbstractListModel, QModelIndex, QObject, QPoint, QRunnable,
+                          QSize, QThreadPool, pyqtSignal)
+from PyQt5.QtGui import QColor, QFont, QImage, QPainter, QPixmap
+
+from batch import IMAGE_EXTENSIONS
+from thumbnail_cache import HAS_GPS, HAS_SERIAL, ThumbnailCache
+
+ICON_SIZE = 128
+MAX_PIXMAPS = 600  # decoded thumbnails kept in memory
+BADGES = [(HAS_GPS, "GPS", QColor(200, 40, 40)), (HAS_SERIAL, "SN", QColor(220, 130, 0))]
+
+
+def list_images(folder):
+    """Image files directly inside folder, sorted by name."""
+    with os.scandir(folder) as entries:
+        names = [e.name for e in entries
+                 if e.is_file() and os.path.splitext(e.name)[1].lower() in IMAGE_EXTENSIONS]
+    return [os.path.join(folder, name) for name in sorted(names, key=str.lower)]
+
+
+class ThumbnailSignals(QObject):
+    # generation, path, QImage (null if it couldn't be made), badge flags
+    finished = pyqtSignal(int, str, QImage, int)
+    skipped = pyqtSignal(int, str)
+
+
+class ThumbnailTask(QRunnable):
+    """QThreadPool job loading one thumbnail, unless its item is no longer wanted."""
+
+    def __init__(self, generation, row, path, cache, wanted):
+        super().__init__()
+        self.generation = generation
+        self.row = row
+        self.path = path
+        self.cache = cache
+        self.wanted = wanted
+        self.signals = ThumbnailSignals()
+
+    def run(self):
+        if not self.wanted(self.generation, self.row):
+            self.signals.skipped.emit(self.generation, self.path)
+            return
+        try:
+            flags, jpeg = self.cache.load(self.path)
+            qimage = QImage.fromData(jpeg)
+            if not qimage.isNull():
+                qimage = qimage.scaled(ICON_SIZE, ICON_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        except Exception:
+            flags, qimage = 0, QImage()
+        self.signals.finished.emit(self.generation, self.path, qimage, flags)
+
+
+def _badged(qimage, flags):
+    """Square pixmap with the thumbnail centered and the badges in the top left corner."""
+    pixmap = QPixmap(ICON_SIZE, ICON_SIZE)
+    pixmap.fill(Qt.transparent)
+    painter = QPainter(pixmap)
+    if not qimage.isNull():
+        painter.drawImage((ICON_SIZE - qimage.width()) // 2, (ICON_SIZE - qimage.height()) // 2, qimage)
+    font = QFont()
+    font.setPointSize(7)
+    font.setBold(True)
+    painter.setFont(font)
+    x = 2
+    for bit, text, color in BADGES:
+        if flags & bit:
+            width = painter.fontMetrics().horizontalAdvance(text) + 6
+            painter.fillRect(x, 2, width, 14, color)
+            painter.setPen(Qt.white)
+            painter.drawText(x, 2, width, 14, Qt.AlignCenter, text)
+            x += width + 2
+    painter.end()
+    return pixmap
+
+
+class ThumbnailModel(QAbstractListModel):
+    """Images of one folder; thumbnails are requested as the view paints them."""
+
+    PathRole = Qt.UserRole
+
+    def __init__(self, cache=None, parent=None):
+        super().__init__(parent)
+        self.cache = cache or ThumbnailCache()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(2, (os.cpu_count() or 2) // 2))
+        self.paths = []
+        self.rows = {}
+        self.flags = {}
+        self.generation = 0
+        self.visible = (0, -1)
+        self._pixmaps = OrderedDict()
+        self._loading = set()
+        self._signals = set()
+        self._placeholder = QPixmap(ICON_SIZE, ICON_SIZE)
+        self._placeholder.fill(QColor(60, 60, 60))
+
+    def set_folder(self, folder):
+        self.beginResetModel()
+        self.generation += 1  # results of the old folder's tasks are dropped
+        self.paths = list_images(folder)
+        self.rows = {path: row for row, path in enumerate(self.paths)}
+        # Also dropped on a refresh: files may have been rewritten since, and the
+        # disk cache (keyed by mtime) hands back the unchanged ones quickly
+        self.flags.clear()
+        self._pixmaps.clear()
+        self._loading.clear()
+        self.visible = (0, -1)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.paths)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        path = self.paths[index.row()]
+        if role == Qt.DisplayRole:
+            return os.path.basename(path)
+        if role == Qt.DecorationRole:
+            pixmap = self._pixmaps.get(path)
+            if pixmap is not None:
+                self._pixmaps.move_to_end(path)
+                return pixmap
+            self._request(index.row(), path)
+            return self._placeholder
+        if role == Qt.ToolTipRole:
+            badges = [text for bit, text, _ in BADGES if self.flags.get(path, 0) & bit]
+            return path + (f"\nLeaks: {', '.join(badges)}" if badges else "")
+        if role == self.PathRole:
+            return path
+        return None
+
+    def wanted(self, generation, row):
+        """Called from the worker threads: still on screen (or close to it)?"""
+        first, last = self.visible
+        return generation == self.generation and (last < first or first <= row <= last)
+
+    def _request(self, row, path):
+        if path in self._loading:
+            return
+        self._loading.add(path)
+        task = ThumbnailTask(self.generation, row, path, self.cache, self.wanted)
+        task.signals.finished.connect(self._on_loaded)
+        task.signals.skipped.connect(self._on_skipped)
+        self._signals.add(task.signals)  # keep alive until delivered
+        self.pool.start(task)
+
+    def _on_skipped(self, generation, path):
+        self._signals.discard(self.sender())
+        if generation == self.generation:
+            self._loading.discard(path)  # asked for again when it's scrolled back into view
+
+    def _on_loaded(self, generation, path, qimage, flags):
+        self._signals.discard(self.sender())
+        if generation != self.generation:
+            return
+        self._loading.discard(path)
+        self.flags[path] = flags
+        self._pixmaps[path] = _badged(qimage, flags)
+        while len(self._pixmaps) > MAX_PIXMAPS:
+            self._pixmaps.popitem(last=False)
+        index = self.index(self.rows[path])
+        self.dataChanged.emit(index, index, [Qt.DecorationRole, Qt.ToolTipRole])
+
+
+class GalleryPanel(QDockWidget):
+    """Dock with the thumbnails of a folder; emits image_selected(path) on click."""
+
+    image_selected = pyqtSignal(str)
+
+    def __init__(self, parent=None, cache=None):
+        super().__init__("Gallery", parent)
+        self.setObjectName("gallery")
+        self.model = ThumbnailModel(cache, self)
+        self.folder = None
+
+        self.view = QListView()
+        self.view.setViewMode(QListView.IconMode)
+        self.view.setIconSize(QSize(ICON_SIZE, ICON_SIZE))
+        self.view.setGridSize(QSize(ICON_SIZE + 24, ICON_SIZE + 28))
+        self.view.setUniformItemSizes(True)
+        self.view.setMovement(QListView.Static)
+        self.view.setResizeMode(QListView.Adjust)
+        # Lay big folders out in batches so opening them doesn't block
+        self.view.setLayoutMode(QListView.Batched)
+        self.view.setBatchSize(256)
+        # Ctrl/Shift-click selects several images for a bulk edit
+        self.view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.view.setModel(self.model)
+        self.view.clicked.connect(self._on_clicked)
+        self.view.activated.connect(self._on_clicked)
+        self.view.verticalScrollBar().valueChanged.connect(self.update_visible)
+        self.setWidget(self.view)
+
+    def open_folder(self, folder):
+        self.folder = folder
+        self.model.set_folder(folder)
+        self.setWindowTitle(f"Gallery - {folder} ({len(self.model.paths)} images)")
+        self.update_visible()
+
+    def refresh(self):
+        """List the folder again, e.g. after files were written into it."""
+        if self.folder:
+            self.open_folder(self.folder)
+
+    def selected_paths(self):
+        rows = sorted(index.row() for index in self.view.selectionModel().selectedIndexes())
+        return [self.model.paths[row] for row in rows]
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_visible()
+
+    def update_visible(self, _=None):
+        """Tell the model which rows are on screen, plus a screenful either way."""
+        viewport = self.view.viewport().size()
+        grid = self.view.gridSize()
+        columns = max(viewport.width() // grid.width(), 1)
+        first = max(self.view.indexAt(QPoint(4, 4)).row(), 0)
+        screenful = columns * (viewport.height() // grid.height() + 2)
+        self.model.visible = (max(first - screenful, 0), first + 2 * screenful)
+
+    def _on_clicked(self, index):
+        path = index.data(ThumbnailModel.PathRole)
+        if path:
+            self.image_selected.emit(path)
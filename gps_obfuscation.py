@@ -0,0 +1,212 @@
+"""
+Location obfuscation for the GPS IFD (tag 34853).
+
+Coordinates are pulled out of the GPS rational triplets, moved in one
+vectorized pass (NumPy when it's installed, plain Python otherwise) and
+written back. Supported modes:
+
+    keep    leave GPS alone
+    snap    move every point to the center of its grid cell
+    jitter  add a bounded random offset (in meters)
+    strip   remove the GPS IFD entirely
+"""
+import functools
+import math
+import random
+
+from PIL.TiffImagePlugin import IFDRational
+
+from instrumentation import timed
+
+GPS_LATITUDE_REF = 1
+GPS_LATITUDE = 2
+GPS_LONGITUDE_REF = 3
+GPS_LONGITUDE = 4
+GPS_DEST_LATITUDE_REF = 19
+GPS_DEST_LATITUDE = 20
+GPS_DEST_LONGITUDE_REF = 21
+GPS_DEST_LONGITUDE = 22
+GPS_IFD_POINTER = 34853
+
+# (lat ref, lat, lon ref, lon) tags of the two positions a GPS IFD can
+# hold: where the picture was taken and the destination it points at
+POSITION_TAGS = (GPS_LATITUDE_REF, GPS_LATITUDE, GPS_LONGITUDE_REF, GPS_LONGITUDE)
+DEST_TAGS = (GPS_DEST_LATITUDE_REF, GPS_DEST_LATITUDE, GPS_DEST_LONGITUDE_REF, GPS_DEST_LONGITUDE)
+POSITIONS = (POSITION_TAGS, DEST_TAGS)
+
+MODES = ("keep", "snap", "jitter", "strip")
+METERS_PER_DEGREE = 111_320.0  # at the equator; longitude is scaled by cos(lat)
+MIN_COS_LAT = 0.01  # keeps longitude jitter finite near the poles
+
+
+class GpsSettings:
+    """
+    How coordinates are obfuscated.
+
+    Args:
+        mode: one of MODES
+        cell: grid cell size in decimal degrees for "snap" (0.01 is ~1.1 km)
+        jitter: maximum offset in meters for "jitter"
+    """
+
+    def __init__(self, mode="snap", cell=0.01, jitter=500.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown GPS mode {mode!r}, expected one of {', '.join(MODES)}")
+        if not float(cell) > 0:
+            raise ValueError(f"GPS cell must be positive, not {cell!r}")
+        if not float(jitter) >= 0:
+            raise ValueError(f"GPS jitter can't be negative, not {jitter!r}")
+        self.mode = mode
+        self.cell = float(cell)
+        self.jitter = float(jitter)
+
+
+def dms_to_degrees(dms, ref):
+    """(deg, min, sec) rationals + "N"/"S"/"E"/"W" -> signed decimal degrees."""
+    if not isinstance(dms, tuple) or len(dms) != 3:
+        raise ValueError(f"Not a DMS triplet: {dms!r}")
+    degrees = float(dms[0]) + float(dms[1]) / 60 + float(dms[2]) / 3600
+    if isinstance(ref, bytes):
+        ref = ref.decode("ascii", errors="replace")
+    # Raw ASCII refs can keep their NUL terminator ("S\0")
+    return -degrees if ref.strip(" \x00").upper() in ("S", "W") else degrees
+
+
+def degrees_to_dms(value, positive_ref, negative_ref):
+    """Signed decimal degrees -> ((deg, min, sec) rationals, ref)."""
+    ref = positive_ref if value >= 0 else negative_ref
+    # Rounded as a whole first, so the seconds can't round up to 60
+    degrees, hundredths = divmod(round(abs(value) * 360000), 360000)
+    minutes, hundredths = divmod(hundredths, 6000)
+    return (IFDRational(degrees, 1), IFDRational(minutes, 1), IFDRational(hundredths, 100)), ref
+
+
+def read_coordinates(gps, tags=POSITION_TAGS):
+    """
+    (lat, lon) from a GPS IFD dict, or None if it has no usable position.
+
+    Args:
+        tags: which position, POSITION_TAGS or DEST_TAGS
+    """
+    lat_ref, lat_tag, lon_ref, lon_tag = tags
+    try:
+        lat = dms_to_degrees(gps[lat_tag], gps.get(lat_ref, "N"))
+        lon = dms_to_degrees(gps[lon_tag], gps.get(lon_ref, "E"))
+    except (KeyError, ValueError, TypeError, ZeroDivisionError):
+        return None
+    if math.isnan(lat) or math.isnan(lon):
+        return None
+    return lat, lon
+
+
+def obfuscate_coordinates(lats, lons, settings, noise=None):
+    """
+    Obfuscate many coordinates at once.
+
+    Args:
+        lats, lons: sequences of decimal degrees
+        settings: GpsSettings ("snap" or "jitter")
+        noise: optional sequence of (u, v) pairs in [-1, 1] used for
+            jitter; pass values drawn from a seeded rng for reproducible
+            runs. Drawn from `random` when omitted.
+
+    Returns:
+        (lats, lons) as lists
+    """
+    n = len(lats)
+    if settings.mode == "jitter" and noise is None:
+        noise = [(random.uniform(-1, 1), random.uniform(-1, 1)) for _ in range(n)]
+    np = _numpy()
+    if np is not None:
+        return _obfuscate_numpy(np, lats, lons, settings, noise)
+
+    out_lats, out_lons = [], []
+    for i in range(n):
+        lat, lon = lats[i], lons[i]
+        if settings.mode == "snap":
+            lat = math.floor(lat / settings.cell) * settings.cell + settings.cell / 2
+            lon = math.floor(lon / settings.cell) * settings.cell + settings.cell / 2
+        elif settings.mode == "jitter":
+            u, v = noise[i]
+            cos_lat = max(math.cos(math.radians(lat)), MIN_COS_LAT)
+            lat += v * settings.jitter / METERS_PER_DEGREE
+            lon += u * settings.jitter / (METERS_PER_DEGREE * cos_lat)
+        out_lats.append(min(max(lat, -90.0), 90.0))
+        out_lons.append((lon + 180.0) % 360.0 - 180.0)
+    return out_lats, out_lons
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    """numpy, imported on first use (it's slow to import), or None."""
+    try:
+        import numpy
+    except ImportError:  # optional, the pure Python path gives the same results
+        return None
+    return numpy
+
+
+def _obfuscate_numpy(np, lats, lons, settings, noise):
+    lat = np.asarray(lats, dtype=np.float64)
+    lon = np.asarray(lons, dtype=np.float64)
+    if settings.mode == "snap":
+        lat = np.floor(lat / settings.cell) * settings.cell + settings.cell / 2
+        lon = np.floor(lon / settings.cell) * settings.cell + settings.cell / 2
+    elif settings.mode == "jitter":
+        uv = np.asarray(noise, dtype=np.float64).reshape(-1, 2)
+        cos_lat = np.maximum(np.cos(np.radians(lat)), MIN_COS_LAT)
+        lat = lat + uv[:, 1] * settings.jitter / METERS_PER_DEGREE
+        lon = lon + uv[:, 0] * settings.jitter / (METERS_PER_DEGREE * cos_lat)
+    lat = np.clip(lat, -90.0, 90.0)
+    lon = (lon + 180.0) % 360.0 - 180.0
+    return lat.tolist(), lon.tolist()
+
+
+@timed("scrub.gps")
+def apply_gps(documents, settings, noise=None):
+    """
+    Obfuscate the GPS position of every document in one pass.
+
+    Edits are recorded in each ImageDocument's GPS diff (or the GPS IFD is
+    removed for "strip"). Both the position and the destination (GPSDest*)
+    are moved; documents without either are left alone.
+
+    Args:
+        documents: ImageDocuments
+        settings: GpsSettings
+        noise: optional list of (u, v) per document (see obfuscate_coordinates)
+
+    Returns:
+        number of documents whose location was changed
+    """
+    if settings.mode == "keep":
+        return 0
+    if settings.mode == "strip":
+        count = 0
+        for document in documents:
+            if GPS_IFD_POINTER in document.values():
+                document.remove(GPS_IFD_POINTER)
+                count += 1
+        return count
+
+    targets, lats, lons, target_noise = [], [], [], []  # targets: (document, tags)
+    for i, document in enumerate(documents):
+        gps = document.values("GPS")
+        for tags in POSITIONS:
+            coords = read_coordinates(gps, tags)
+            if coords is None:
+                continue
+            targets.append((document, tags))
+            lats.append(coords[0])
+            lons.append(coords[1])
+            if noise is not None:
+                target_noise.append(noise[i])
+
+    if not targets:
+        return 0
+    new_lats, new_lons = obfuscate_coordinates(lats, lons, settings, target_noise or None)
+    for (document, tags), lat, lon in zip(targets, new_lats, new_lons):
+        lat_dms, lat_ref = degrees_to_dms(lat, "N", "S")
+        lon_dms, lon_ref = degrees_to_dms(lon, "E", "W")
+        document.update(dict(zip(tags, (lat_ref, lat_dms, lon_ref, lon_dms))), ifd="GPS")
+    return len({id(document) for document, _ in targets})
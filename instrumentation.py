@@ -0,0 +1,265 @@
+"""
+Lightweight timing spans for the load / randomize / save path.
+
+    with span("exif.parse"):
+        tree = read_exif_from_file(fp)
+
+    @timed("db.sample")
+    def random_camera(self): ...
+
+Disabled by default: span() then hands back one shared no-op context
+manager, so an instrumented call costs a function call and a flag check.
+When enabled, every span adds to per-name counters (count, total, min,
+max and a window of recent durations for percentiles) and, optionally,
+writes one JSON line to a trace file. The counters can be rendered as
+Prometheus text, shown in the GUI's debug panel (debug_panel.py), and
+shipped from batch worker processes to the parent with drain()/merge().
+
+Set EXIFUSCATOR_TRACE=1 (and EXIFUSCATOR_TRACE_FILE=path for JSON lines)
+to enable it from the environment.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+RECENT_SAMPLES = 1024  # durations kept per span name for percentiles
+METRIC_NAME = "exifuscator_span_seconds"
+
+_enabled = False
+_trace_file = None
+_lock = threading.Lock()
+_stats = {}
+
+
+def percentile(values, q):
+    """q-th percentile (0-100) of values, linearly interpolated."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    pos = (len(ordered) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+class SpanStats:
+    """Aggregated durations (in seconds) of one span name."""
+
+    __slots__ = ("count", "total", "min", "max", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def merge(self, count, total, low, high, recent):
+        self.count += count
+        self.total += total
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+        self.recent.extend(recent)
+
+
+class _NullSpan:
+    """What span() returns while instrumentation is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "start")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _record(self.name, seconds, self.attrs)
+        return False
+
+    def set(self, **attrs):
+        """Attach attributes (file size, container, ...) to the trace line."""
+        self.attrs.update(attrs)
+
+
+def span(name, **attrs):
+    """Context manager timing the block under name (a no-op when disabled)."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, attrs)
+
+
+def timed(name):
+    """Decorator form of span()."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record(name, seconds, **attrs):
+    """Add a duration measured elsewhere (e.g. time to the first window)."""
+    if _enabled:
+        _record(name, seconds, attrs)
+
+
+def _record(name, seconds, attrs):
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = SpanStats()
+        stats.add(seconds)
+        if _trace_file is not None:
+            line = {"ts": round(time.time(), 6), "span": name, "ms": round(seconds * 1000, 4), "pid": os.getpid()}
+            line.update(attrs)
+            _trace_file.write(json.dumps(line, default=str) + "\n")
+
+
+def enable(trace_path=None):
+    """
+    Start recording spans.
+
+    Args:
+        trace_path: also append one JSON line per span to this file
+            (safe to share between processes; lines are written whole)
+    """
+    global _enabled, _trace_file
+    with _lock:
+        if trace_path and _trace_file is None:
+            _trace_file = open(trace_path, "a", buffering=1)
+        _enabled = True
+
+
+def disable():
+    """Stop recording; the counters collected so far are kept."""
+    global _enabled, _trace_file
+    with _lock:
+        _enabled = False
+        if _trace_file is not None:
+            _trace_file.close()
+            _trace_file = None
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def snapshot():
+    """
+    Current counters, slowest total first.
+
+    Returns:
+        list of dicts with span, count, total_ms, mean_ms, p50_ms, p99_ms, max_ms
+    """
+    with _lock:
+        items = [(name, stats.count, stats.total, stats.max, list(stats.recent)) for name, stats in _stats.items()]
+    rows = []
+    for name, count, total, high, recent in items:
+        rows.append({
+            "span": name,
+            "count": count,
+            "total_ms": total * 1000,
+            "mean_ms": total / count * 1000 if count else 0.0,
+            "p50_ms": percentile(recent, 50) * 1000,
+            "p99_ms": percentile(recent, 99) * 1000,
+            "max_ms": high * 1000,
+        })
+    rows.sort(key=lambda row: row["total_ms"], reverse=True)
+    return rows
+
+
+def drain():
+    """
+    Take the counters collected since the last drain() (and reset them),
+    in a picklable form for merge() in another process.
+    """
+    with _lock:
+        drained = {
+            name: (s.count, s.total, s.min, s.max, list(s.recent))
+            for name, s in _stats.items()
+        }
+        _stats.clear()
+    return drained
+
+
+def merge(drained):
+    """Add counters from drain() (e.g. sent back by a worker process)."""
+    if not drained:
+        return
+    with _lock:
+        for name, values in drained.items():
+            stats = _stats.get(name)
+            if stats is None:
+                stats = _stats[name] = SpanStats()
+            stats.merge(*values)
+
+
+def prometheus_text():
+    """The counters in the Prometheus text exposition format (as a summary)."""
+    lines = [
+        f"# HELP {METRIC_NAME} Time spent in instrumented operations.",
+        f"# TYPE {METRIC_NAME} summary",
+    ]
+    with _lock:
+        items = sorted((name, stats.count, stats.total, list(stats.recent)) for name, stats in _stats.items())
+    for name, count, total, recent in items:
+        label = name.replace("\\", "\\\\").replace('"', '\\"')
+        for q in (0.5, 0.9, 0.99):
+            lines.append(f'{METRIC_NAME}{{span="{label}",quantile="{q}"}} {percentile(recent, q * 100):.9f}')
+        lines.append(f'{METRIC_NAME}_sum{{span="{label}"}} {total:.9f}')
+        lines.append(f'{METRIC_NAME}_count{{span="{label}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """Write prometheus_text() to path atomically (for node_exporter's textfile collector)."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as fp:
+        fp.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+
+if os.environ.get("EXIFUSCATOR_TRACE"):
+    enable(os.environ.get("EXIFUSCATOR_TRACE_FILE"))
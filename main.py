@@ -1,564 +1,75 @@
-import sys
-import os
-import random
-import string
-import piexif
-import sqlite3
-
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                             QHBoxLayout, QPushButton, QLabel, QFileDialog, 
-                             QTextEdit, QScrollArea, QSplitter, QFrame, QToolBar)
-
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPixmap, QFont, QIcon
-from PyQt5 import QtGui
-from PIL import Image
-from PIL.ExifTags import TAGS
-from Metadata_window import MetadataEditorDialog
-
-class ExifMetadataViewer(QMainWindow):
-    """
-    A simple GUI application for viewing EXIF metadata of images.
-    Built with PyQt5 and Pillow for easy customization and extension.
-    """
-    
-    def __init__(self):
-        super().__init__()
-        self.current_image_path = None
-        self._last_exif_data = None
-        self.logo_pixmap_original = None  # Cache original logo to avoid reloading
-        self.dark_mode = True  # Start in dark mode
-        
-        # Cache theme icon pixmaps
-        self.moon_icon = QPixmap("img/dark mode mod.png")
-        self.sun_icon = QPixmap("img/sun light.png")
-        self.logo_dark = QPixmap("img/exifuscator_dark.png")
-        self.logo_white = QPixmap("img/exifuscator_white.png")
-        
-        self.init_ui()
-        
-    
-    def init_ui(self):
-        """Initialize the user interface."""
-        self.setWindowTitle("EXIFuscator")
-        self.setWindowIcon(QIcon('img/favicon.png')) 
-        self.setGeometry(100, 100, 1000, 700)
-
-        # Create menu bar first
-        self.create_menu_bar()
-        
-        # Create toolbar with logo and Load Image button
-        self.create_toolbar()
-
-        # Create central widget and main layout
-        central_widget = QWidget()
-        self.setCentralWidget(central_widget)
-        
-        # Create main horizontal splitter
-        main_splitter = QSplitter(Qt.Horizontal)
-        central_widget.setLayout(QHBoxLayout())
-        central_widget.layout().addWidget(main_splitter)
-        
-        # Left panel for image display
-        self.setup_image_panel(main_splitter)
-        
-        # Right panel for metadata display
-        self.setup_metadata_panel(main_splitter)
-        
-        # Set splitter proportions (60% image, 40% metadata)
-        main_splitter.setSizes([600, 400])
-        
-        # Status bar
-        self.statusBar().showMessage("Ready - Click 'Load Image' to begin")
-    
-    def setup_image_panel(self, parent):
-        """Setup the left panel for image display."""
-        image_frame = QFrame()
-        image_frame.setFrameStyle(QFrame.StyledPanel)
-        image_layout = QVBoxLayout(image_frame)
-
-        # Image display area with scroll
-        self.image_scroll = QScrollArea()
-        self.image_scroll.setWidgetResizable(True)
-        self.image_scroll.setAlignment(Qt.AlignCenter)
-        
-        self.image_label = QLabel("No image loaded")
-        self.image_label.setAlignment(Qt.AlignCenter)
-        self.image_label.setStyleSheet("background-color: #000000; border: 2px dashed #ccc;")
-        self.image_label.setMinimumSize(400, 300)
-
-        self.image_scroll.setWidget(self.image_label)
-        image_layout.addWidget(self.image_scroll)
-
-        parent.addWidget(image_frame)
-
-    def setup_metadata_panel(self, parent):
-        """Setup the right panel for metadata display."""
-        metadata_frame = QFrame()
-        metadata_frame.setFrameStyle(QFrame.StyledPanel)
-        metadata_layout = QVBoxLayout(metadata_frame)
-        
-        # Top row with Load Image button aligned to the left
-        top_row = QHBoxLayout()
-        self.load_button_meta = QPushButton("Load Image")
-        self.load_button_meta.clicked.connect(self.load_image)
-        top_row.addWidget(self.load_button_meta)
-        top_row.setAlignment(Qt.AlignLeft)
-        metadata_layout.addLayout(top_row)
+"""
+EXIFuscator launcher.
 
-        #Top row with Randomize button aligned to the right
-        top_row.addStretch()
-        self.load_button_meta = QPushButton("Randomize")
-        self.load_button_meta.clicked.connect(self.randomize_metadata)
-        top_row.addWidget(self.load_button_meta, alignment=Qt.AlignRight)
-        
-        # Metadata display area
-        self.metadata_text = QTextEdit()
-        self.metadata_text.setReadOnly(True)
-        self.metadata_text.setPlainText("Load an image to view its EXIF metadata")
-        metadata_layout.addWidget(self.metadata_text)
-        
-        # Edit metadata button
-        self.edit_button = QPushButton("Edit Metadata")
-        self.edit_button.clicked.connect(self.write_metadata)
-        self.edit_button.setEnabled(False)
-        metadata_layout.addWidget(self.edit_button)
-        
-        # Save image button
-        self.save_button = QPushButton("Save Image")
-        self.save_button.clicked.connect(self.save_image)
-        self.save_button.setEnabled(False)
-        metadata_layout.addWidget(self.save_button)
-        parent.addWidget(metadata_frame)
-    
-    def create_toolbar(self):
-        """Create toolbar with theme toggles, centered logo, and Load Image button."""
-        toolbar = QToolBar()
-        toolbar.setMovable(False)
-        self.addToolBar(toolbar)
-        # keep a reference to the toolbar so other methods can query its size
-        self.toolbar = toolbar
-
-        # Create a container widget with horizontal layout for centering
-        container = QWidget()
-        layout = QHBoxLayout(container)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(10)
-
-        layout.addStretch(1) # this was the bane of our existance, no one likes stretch
-
-        # Moon icon button (left of logo) - toggles to dark mode
-        self.moon_button = QLabel()
-        self.moon_button.setPixmap(self.moon_icon.scaledToHeight(70, Qt.SmoothTransformation))
-        self.moon_button.setCursor(Qt.PointingHandCursor)
-        self.moon_button.setToolTip("Switch to Dark Mode")
-        self.moon_button.mousePressEvent = lambda event: self.toggle_theme(True)
-        layout.addWidget(self.moon_button)
-
-        # Logo label - load and cache the original pixmap once
-        self.logo_label = QLabel()
-        # Start with white logo (for dark mode)
-        self.logo_pixmap_original = self.logo_white
-        
-        if not self.logo_pixmap_original.isNull():
-            # Initial scaling - will be adjusted on resize
-            self.update_logo_size()
-        else:
-            self.logo_label.setText("EXIFfuscator")
-            self.logo_label.setStyleSheet("font-weight: bold; font-size: 14pt;")
-        
-        self.logo_label.setAlignment(Qt.AlignCenter) # obscure ahh function
-        layout.addWidget(self.logo_label)
-
-        # Sun icon button (right of logo) - toggles to light mode
-        self.sun_button = QLabel()
-        self.sun_button.setPixmap(self.sun_icon.scaledToHeight(70, Qt.SmoothTransformation))
-        self.sun_button.setCursor(Qt.PointingHandCursor)
-        self.sun_button.setToolTip("Switch to Light Mode")
-        self.sun_button.mousePressEvent = lambda event: self.toggle_theme(False)
-        layout.addWidget(self.sun_button)
-
-        layout.addStretch(1) # this was the bane of our existance, no one likes stretch
-
-        toolbar.addWidget(container)
-
-    def create_menu_bar(self):
-        """Create the application menu bar."""
-        menubar = self.menuBar()
-        
-        # File menu
-        file_menu = menubar.addMenu('File')
-        
-        # Load action
-        load_action = file_menu.addAction('Load Image')
-        load_action.setShortcut('Ctrl+O')
-        load_action.triggered.connect(self.load_image)
-        
-        file_menu.addSeparator()
-        
-        # Exit action
-        exit_action = file_menu.addAction('Exit')
-        exit_action.setShortcut('Ctrl+Q')
-        exit_action.triggered.connect(self.close)
-        
-        # Help menu
-        help_menu = menubar.addMenu('Help')
-        about_action = help_menu.addAction('About')
-        about_action.triggered.connect(self.show_about)
-    
-    def toggle_theme(self, to_dark_mode):
-        """
-        Toggle between light and dark mode.
-        
-        Args:
-            to_dark_mode (bool): True to switch to dark mode, False for light mode
-        """
-        # Only toggle if we're changing modes
-        if self.dark_mode == to_dark_mode:
-            return
-        
-        self.dark_mode = to_dark_mode
-        
-        # Get the application instance
-        app = QApplication.instance()
-        
-        if self.dark_mode:
-            # Apply dark theme
-            try:
-                import qdarkstyle
-                app.setStyleSheet(qdarkstyle.load_stylesheet_pyqt5())
-            except ImportError:
-                # Fallback to a simple dark style if qdarkstyle not available
-                app.setStyleSheet("""
-                    QMainWindow, QWidget {
-                        background-color: #2b2b2b;
-                        color: #ffffff;
-                    }
-                    QTextEdit, QScrollArea {
-                        background-color: #1e1e1e;
-                        color: #ffffff;
-                    }
-                """)
-            # Use white logo for dark mode
-            self.logo_pixmap_original = self.logo_white
-        else:
-            # Apply light theme (default Qt style)
-            app.setStyleSheet("")
-            # Use dark logo for light mode
-            self.logo_pixmap_original = self.logo_dark
-        
-        # Update logo display
-        self.update_logo_size()
-        
-        # Update status message
-        mode_name = "Dark Mode" if self.dark_mode else "Light Mode"
-        self.statusBar().showMessage(f"Switched to {mode_name}")
-    
-    def load_image(self):
-        """Load and display an image, then extract its EXIF metadata."""
-        file_path, _ = QFileDialog.getOpenFileName(
-            self,
-            "Select Image File",
-            "",
-            "Image Files (*.jpg *.jpeg *.png *.tiff *.bmp *.gif);;All Files (*)"
-        )
-       
-        
-        if file_path:
-            self.current_image_path = file_path
-
-            self.display_image(file_path)
-            self.extract_and_display_metadata(file_path)
-            self.save_button.setEnabled(True)
-            self.edit_button.setEnabled(True)
-            self.statusBar().showMessage(f"Loaded: {os.path.basename(file_path)}")
-    
-    def randomize_metadata(self):
-        """Randomize the EXIF metadata of the current image (does not save automatically)."""
-        
-        if not self.current_image_path:
-            return
+`main.py` alone starts the GUI; `main.py batch|watch|bench|remote|export ...`
+runs a headless command. Only what the chosen mode needs is imported, so
+the headless commands start without loading Qt at all.
+"""
+import time
 
-        try:
-            with Image.open(self.current_image_path) as img:
-                #Get existing Exif Metadata
-                exif = img.getexif() or {}
+STARTED = time.perf_counter()  # before any heavy import, for the startup report
 
-                #Common Exif tags (used for randomization later)
-                common_tags = {
-                    271: 'Make',  # Camera manufacturer
-                    272: 'Model',  # Camera model
-                    305: 'Software',  # Software used
-                    306: 'DateTime',  # Date and time
-                    315: 'Artist',  # Artist name
-                    33432: 'Copyright'  # Copyright info
-                }
-                
-                make, model = self.get_random_camera()
-                software = self.get_random_software()
-
-                #Randomize common exif tags
-                for tag_id, tag_name in common_tags.items():
-                    if tag_id in exif:
-                        #Generate random data based on tag type
-
-                        if tag_id == 271: #Make
-                            exif[tag_id] = make or "Unknown"
-                        elif tag_id == 272: #Model
-                            exif[tag_id] = model or "Unknown"
-                        elif tag_id == 305: #Software
-                            exif[tag_id] = software or "Unknown"
-                        elif tag_id == 306: #DateTime
-                            year = random.randint(2000, 2025)
-                            month = random.randint(1, 12)
-                            day = random.randint(1, 28)
-                            hour = random.randint(0, 23)
-                            minute = random.randint(0, 59)
-                            second = random.randint(0, 59)
-                            exif[tag_id] = f"{year}:{month:02d}:{day:02d} {hour:02d}:{minute:02d}:{second:02d}"
-                        else:
-                            #for other text fields generate random string
-                            exif[tag_id] = ''.join(random.choices(string.ascii_letters + string.digits, k=10))
-                        
-                # Store the modified EXIF data for display and potential saving
-                self._last_exif_data = dict(exif)
-                
-                # Update display without saving
-                self.update_metadata_display()
-                self.statusBar().showMessage("Metadata randomized (not saved yet - click 'Save Image' to apply)")
-        
-        except Exception as e:
-            self.statusBar().showMessage(f"Error reading EXIF data: {str(e)}")
-
-    def get_random_camera(self):
-        """Get a random camera from the database."""
-        conn = sqlite3.connect('metadata.db')
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT name FROM makes ORDER BY RANDOM() LIMIT 1")
-        row = cursor.fetchone()
-        if not row:
-            conn.close()
-            return None, None
-        make = row[0]
-
-        cursor.execute(
-            "SELECT name FROM models WHERE make_id = (SELECT id FROM makes WHERE name = ?) ORDER BY RANDOM() LIMIT 1",
-            (make,)
-        )
-        row = cursor.fetchone()
-        model = row[0] if row else "Unknown"
-
-        conn.close()
-        return make, model          
-
-    def get_random_software(self):
-        """Get a random software from the database."""
-        conn = sqlite3.connect('metadata.db')
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT name FROM software ORDER BY RANDOM() LIMIT 1")
-        row = cursor.fetchone()
-        if not row:
-            conn.close()
-            return None
-        software = row[0]
-
-        conn.close()
-        return software
-        
-    def display_image(self, file_path):
-        """Display the selected image in the image panel."""
-        try:
-            pixmap = QPixmap(file_path)
-            if not pixmap.isNull():
-                # Scale image to fit while maintaining aspect ratio
-                available = self.image_scroll.viewport().size()
-                scaled_pixmap = pixmap.scaled(
-                    available,
-                    Qt.KeepAspectRatio,
-                    Qt.SmoothTransformation
-                )
-                self.image_label.setPixmap(scaled_pixmap)
-                self.image_label.setStyleSheet("")  # Remove placeholder styling
-            else:
-                self.image_label.setText("Failed to load image")
-                self.statusBar().showMessage("Error: Failed to load image")
-        except Exception as e:
-            self.image_label.setText(f"Error loading image: {str(e)}")
-            self.statusBar().showMessage("Error loading image")
-    
-    def extract_and_display_metadata(self, file_path):
-        """Extract and display EXIF metadata from the image."""
-        try:
-            # Open image with Pillow
-            with Image.open(file_path) as image:
-                exif_data = image.getexif()
-                
-                print(exif_data)  # Debug: print raw EXIF data to console
-
-                if exif_data is not None:
-                    self._last_exif_data = dict(exif_data)
-                    self.update_metadata_display()
-                else:
-                    self.metadata_text.setPlainText("No EXIF metadata found in this image.")
-                    
-        except Exception as e:
-            error_message = f"Error reading EXIF data: {str(e)}\n\n"
-            error_message += "This could be due to:\n"
-            error_message += "- Unsupported image format\n"
-            error_message += "- Corrupted image file\n"
-            error_message += "- Image has no EXIF data"
-            self.metadata_text.setPlainText(error_message)
-            self.statusBar().showMessage("Error reading EXIF data")
-
-       # self.load_button = QPushButton("Load Image")
-        #self.load_button.clicked.connect(self.load_image)
-        #self.load_button.setMinimumHeight(30)
-        #toolbar.addWidget(self.load_button)
-
-    def update_metadata_display(self):
-        if self._last_exif_data:
-            divider = "=" * int(self.width() * 0.045)
-            text = "EXIF Metadata:\n" + divider + "\n\n"
-            for tag_id, value in self._last_exif_data.items():
-                tag_name = TAGS.get(tag_id, tag_id)
-                text += f"{tag_name}: {value}\n"
-            print(text)
-            self.metadata_text.setPlainText(text)
-    
-    def write_metadata(self, _=None):
-        """Open the metadata editor dialog (does not save automatically)."""
-        if not self.current_image_path:
-            return
-        dlg = MetadataEditorDialog(self, self.current_image_path)
-        if dlg.exec_() == dlg.Accepted:
-            # Metadata was edited in the dialog, update display
-            try:
-                with Image.open(self.current_image_path) as image:
-                    exif = image.getexif()
-                self._last_exif_data = dict(exif) if exif is not None else None
-                self.update_metadata_display()
-                self.statusBar().showMessage("Metadata edited (not saved yet - click 'Save Image' to apply)")
-            except Exception:
-                pass
-
-    def save_image(self):
-        """Save the image with current metadata to a new file."""
-        if not self.current_image_path or not self._last_exif_data:
-            self.statusBar().showMessage("No image or metadata to save")
-            return
-        
-        # Get save file path from user
-        default_name = os.path.splitext(os.path.basename(self.current_image_path))[0]
-        default_ext = os.path.splitext(self.current_image_path)[1]
-        suggested_name = f"{default_name}_modified{default_ext}"
-        suggested_path = os.path.join(os.path.dirname(self.current_image_path), suggested_name)
-        
-        save_path, _ = QFileDialog.getSaveFileName(
-            self,
-            "Save Image As",
-            suggested_path,
-            "JPEG Images (*.jpg *.jpeg);;PNG Images (*.png);;TIFF Images (*.tiff *.tif);;All Files (*)"
-        )
-        
-        if save_path:
-            try:
-                with Image.open(self.current_image_path) as img:
-                    # Get the existing exif object from the image
-                    exif = img.getexif()
-                    
-                    # Update it with our modified data
-                    for tag_id, value in self._last_exif_data.items():
-                        exif[tag_id] = value
-                    
-                    # Save the image with the updated EXIF data
-                    img.save(save_path, exif=exif)
-                    
-                self.statusBar().showMessage(f"Image saved successfully to: {os.path.basename(save_path)}")
-            except Exception as e:
-                self.statusBar().showMessage(f"Error saving image: {str(e)}")
+import sys
+import importlib
+import multiprocessing
 
-    def resizeEvent(self, event):
-        """Handle window resize events safely."""
-        super().resizeEvent(event)
-        
-        # Update logo size dynamically (safe with cached pixmap)
-        self.update_logo_size()
-        
-        # Update metadata divider if we have data
-        if self._last_exif_data:
-            self.update_metadata_display()
-    
-    def update_logo_size(self):
-        """
-        Update logo size based on toolbar height.
-        Adjust MAX_LOGO_HEIGHT and MIN_LOGO_HEIGHT to change logo size.
-        """
-        # Configuration - easy to edit
-        MAX_LOGO_HEIGHT = 200 / 3  # Maximum logo height in pixels
-        MIN_LOGO_HEIGHT = 100  # Minimum logo height in pixels
-        TOOLBAR_PADDING = 8   # Padding from toolbar edges
-        
-        # Safety checks
-        if not hasattr(self, 'logo_label'):
-            return
-        if not hasattr(self, 'toolbar'):
-            return
-        if self.logo_pixmap_original is None or self.logo_pixmap_original.isNull():
-            return
-        
-        try:
-            # Calculate logo height based on toolbar size
-            toolbar_height = self.toolbar.height()
-            logo_height = max(MIN_LOGO_HEIGHT, min(MAX_LOGO_HEIGHT, toolbar_height - TOOLBAR_PADDING))
-            
-            # Scale the cached pixmap
-            scaled = self.logo_pixmap_original.scaledToHeight(logo_height, Qt.SmoothTransformation)
-            self.logo_label.setPixmap(scaled)
-        except Exception as e:
-            # Silently handle any errors to prevent crashes
-            print(f"Logo resize error (non-critical): {e}")
-    
-    def show_about(self):
-        """Show about dialog."""
-        from PyQt5.QtWidgets import QMessageBox
-        QMessageBox.about(
-            self,
-            "About EXIFuscator",
-            "EXIFbuscator 1.0\n\n"
-            "A python GUI program to manage EXIF metadata in images and obfuscate values such as location coordinates and time.\n\n"
-            "Made by Angel Juarez, Erik Shaver, and Daniel\n\n"
-            "Logo made by @gabrielmaroni on github"
-        )
+import instrumentation
 
 
 def create_application():
     """Factory function to create and return the application instance."""
+    from PyQt5.QtWidgets import QApplication
+    from viewer import ExifMetadataViewer, dark_stylesheet
+
     app = QApplication(sys.argv)
     app.setApplicationName("EXIF Metadata Viewer")
     app.setOrganizationName("CipherHacks")
-    # Apply dark style if available without making it a hard dependency
-    try:
-        import qdarkstyle
-        app.setStyleSheet(qdarkstyle.load_stylesheet_pyqt5())
-    except Exception:
-        pass
+    # qdarkstyle if it's installed, a simple dark style otherwise
+    app.setStyleSheet(dark_stylesheet())
     
     viewer = ExifMetadataViewer()
     return app, viewer
 
 
+def report_first_window(viewer):
+    """Show (and record, when timing is on) how long the first window took to appear."""
+    seconds = time.perf_counter() - STARTED
+    instrumentation.record("startup.first_window", seconds)
+    viewer.statusBar().showMessage(f"Ready in {seconds:.2f}s - Click 'Load Image' to begin")
+
+
+# Sub-commands that don't need the GUI -> module with a main(argv)
+HEADLESS_COMMANDS = {
+    "batch": "batch",
+    "watch": "watcher",
+    "bench": "benchmark",
+    "remote": "remote",
+    "export": "export",
+}
+
+
 def main():
     """Main entry point for the application."""
+    # `main.py batch ...` / `main.py watch ...` run headless instead of the GUI
+    if len(sys.argv) > 1 and sys.argv[1] in HEADLESS_COMMANDS:
+        module = importlib.import_module(HEADLESS_COMMANDS[sys.argv[1]])
+        instrumentation.record("startup.command", time.perf_counter() - STARTED, command=sys.argv[1])
+        sys.exit(module.main(sys.argv[2:]))
+
+    from PyQt5.QtCore import QTimer
+
     app, viewer = create_application()
     viewer.show()
+    # Runs once the event loop has shown the window
+    QTimer.singleShot(0, lambda: report_first_window(viewer))
     
     # Start the application event loop
     sys.exit(app.exec_())
 
 
 if __name__ == "__main__":
+    # Needed for the process pool in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     main()
 
     # say hi if you see this
\ No newline at end of file
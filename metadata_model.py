@@ -0,0 +1,214 @@
+"""
+Table models for the metadata panel and the editor dialog.
+
+Rows are fetched in batches and values are formatted only when the view
+asks for a visible cell, so images with hundreds of tags (or a huge
+MakerNote) don't cost anything on resize.
+"""
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QFont
+from PIL.ExifTags import TAGS
+
+from exif_writer import IMAGE_LAYOUT_TAGS
+from metadata_session import SUB_IFD_POINTERS, text_to_value, value_to_text
+
+FETCH_BATCH = 100
+MAX_BYTES_SHOWN = 48  # long binary values (MakerNote etc.) are cut off
+
+
+def format_value(value):
+    """Short display string for an EXIF value."""
+    if isinstance(value, bytes):
+        if len(value) > MAX_BYTES_SHOWN:
+            return f"{value[:MAX_BYTES_SHOWN]!r}... ({len(value)} bytes)"
+        return repr(value)
+    if isinstance(value, tuple) and len(value) > 16:
+        return f"{value[:16]}... ({len(value)} values)"
+    return str(value)
+
+
+class ExifTableModel(QAbstractTableModel):
+    """Two-column (Tag, Value) model over a {tag_id: value} dict."""
+
+    HEADERS = ("Tag", "Value")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []  # (tag_id, value)
+        self._edited = set()
+        self._fetched = 0
+
+    def set_values(self, values, edited=()):
+        """
+        Replace the model contents.
+
+        Args:
+            values: {tag_id: value}
+            edited: tag ids with unsaved changes (shown in bold)
+        """
+        self.beginResetModel()
+        self._rows = list(values.items())
+        self._edited = set(edited)
+        self._fetched = min(FETCH_BATCH, len(self._rows))
+        self.endResetModel()
+
+    def clear(self):
+        self.set_values({})
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._fetched
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._fetched < len(self._rows)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(FETCH_BATCH, len(self._rows) - self._fetched)
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._fetched += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        tag_id, value = self._rows[index.row()]
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            if index.column() == 0:
+                return str(TAGS.get(tag_id, tag_id))
+            if role == Qt.ToolTipRole and isinstance(value, bytes):
+                return f"{len(value)} bytes"
+            return format_value(value)
+        if role == Qt.FontRole and tag_id in self._edited:
+            font = QFont()
+            font.setBold(True)
+            return font
+        if role == Qt.UserRole:
+            return tag_id
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+
+class TagEditModel(QAbstractTableModel):
+    """
+    Editable (Tag, Value) rows for one or more documents.
+
+    Only tags that every document has, with a value that can be edited as
+    text, get a row. A tag whose value differs between the documents is
+    shown as mixed until a new value is typed in. The view only creates an
+    editor for the cell being edited, so hundreds of rows stay cheap.
+    """
+
+    HEADERS = ("Tag", "Value")
+    EDIT_IFDS = ("IFD0", "Exif")
+    MIXED_TEXT = "(mixed)"
+    # Offsets and image layout; changing them would break the file
+    SKIP_TAGS = set(SUB_IFD_POINTERS.values()) | set(IMAGE_LAYOUT_TAGS)
+
+    invalid = pyqtSignal(str)  # message for a rejected value
+
+    def __init__(self, documents, parent=None):
+        super().__init__(parent)
+        self._rows = self._shared_rows(documents)  # [ifd, tag_id, like, text or None if mixed, new text or None]
+
+    def _shared_rows(self, documents):
+        rows = []
+        for ifd in self.EDIT_IFDS:
+            first, others = documents[0].values(ifd), [d.values(ifd) for d in documents[1:]]
+            for tag_id, value in first.items():
+                text = value_to_text(value)
+                if tag_id in self.SKIP_TAGS or text is None:
+                    continue
+                mixed = False
+                for other in others:
+                    other_value = other.get(tag_id)
+                    if type(other_value) is not type(value) or value_to_text(other_value) is None:
+                        break  # not shared (or not the same kind of value)
+                    mixed = mixed or value_to_text(other_value) != text
+                else:
+                    rows.append([ifd, tag_id, value, None if mixed else text, None])
+        return rows
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() == 1:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        ifd, tag_id, _, text, new_text = self._rows[index.row()]
+        if index.column() == 0:
+            if role == Qt.DisplayRole:
+                return str(TAGS.get(tag_id, tag_id))
+            if role == Qt.ToolTipRole:
+                return f"{ifd} tag {tag_id}"
+            return None
+        if role == Qt.DisplayRole:
+            if new_text is not None:
+                return new_text
+            return self.MIXED_TEXT if text is None else text
+        if role == Qt.EditRole:
+            return new_text if new_text is not None else (text or "")
+        if role == Qt.ToolTipRole and text is None and new_text is None:
+            return "The selected images have different values; type one to set it on all of them"
+        if role == Qt.FontRole and (new_text is not None or text is None):
+            font = QFont()
+            font.setBold(new_text is not None)
+            font.setItalic(new_text is None)
+            return font
+        if role == Qt.ForegroundRole and text is None and new_text is None:
+            return QColor(Qt.gray)
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or index.column() != 1 or role != Qt.EditRole:
+            return False
+        row = self._rows[index.row()]
+        _, tag_id, like, text, _ = row
+        value = str(value)
+        if value == text or (text is None and not value):
+            row[4] = None  # back to what the file(s) have
+        else:
+            try:
+                text_to_value(value, like)
+            except ValueError as e:
+                self.invalid.emit(f"{TAGS.get(tag_id, tag_id)}: {e}")
+                return False
+            row[4] = value
+        self.dataChanged.emit(index, index)
+        return True
+
+    def set_text(self, tag_id, text, ifd="IFD0"):
+        """Edit a tag's value by id (what typing into its cell does)."""
+        for i, row in enumerate(self._rows):
+            if row[0] == ifd and row[1] == tag_id:
+                return self.setData(self.index(i, 1), text)
+        return False
+
+    def edits(self):
+        """The changed rows as a diff: {(ifd, tag_id): value}."""
+        return {
+            (ifd, tag_id): text_to_value(new_text, like)
+            for ifd, tag_id, like, _, new_text in self._rows
+            if new_text is not None
+        }
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
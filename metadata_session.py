@@ -0,0 +1,288 @@
+"""
+Per-image metadata session.
+
+An ImageDocument parses a file's EXIF once and keeps the pending edits as
+a diff on top of it. The viewer, the editor dialog and the saver all go
+through the same document, so one load -> randomize -> edit -> save flow
+reads the file once. Documents are cached by path and dropped as soon as
+the file's mtime or size changes on disk.
+"""
+import os
+from collections import OrderedDict
+from fractions import Fraction
+
+from PIL import Image
+from PIL.TiffImagePlugin import IFDRational
+
+from exif_reader import (EXIF_HEADER, EXIF_IFD_POINTER, GPS_IFD_POINTER,
+                         INTEROP_IFD_POINTER, read_exif)
+
+
+def stat_key(path):
+    """(mtime_ns, size) - cheap way to tell whether a file changed."""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class _Removed:
+    """Marker for a tag (or whole sub-IFD pointer) that should be deleted."""
+
+    def __repr__(self):
+        return "<removed>"
+
+
+REMOVED = _Removed()
+
+# Sub-IFDs that can be edited, and the IFD0/Exif pointer tag Pillow knows them by
+SUB_IFD_POINTERS = {
+    "Exif": EXIF_IFD_POINTER,
+    "GPS": GPS_IFD_POINTER,
+    "Interop": INTEROP_IFD_POINTER,
+}
+
+
+class ImageDocument:
+    """
+    Parsed EXIF of one file plus the edits that haven't been saved yet.
+
+    Attributes:
+        path: image path
+        key: stat_key() of the file when it was parsed (None for from_tree())
+        tree: ExifTree (or None if the file has no EXIF)
+        edits: IFD0 tag_id -> new value, only for tags that differ from the file
+        ifd_edits: same, per sub-IFD ("Exif", "GPS", "Interop")
+
+    A value of REMOVED deletes the tag; removing a pointer tag such as
+    34853 (GPSInfo) drops that whole sub-IFD.
+    """
+
+    def __init__(self, path):
+        self._load(path, stat_key(path), read_exif(path))
+
+    @classmethod
+    def from_tree(cls, path, tree):
+        """
+        Document for EXIF that was parsed elsewhere, e.g. from the first
+        bytes of a remote object. path is only a label; there is no file
+        to go stale.
+        """
+        document = cls.__new__(cls)
+        document._load(path, None, tree)
+        return document
+
+    def _load(self, path, key, tree):
+        self.path = path
+        self.key = key
+        self.tree = tree
+        self.original = self.tree.values() if self.tree else {}
+        self.edits = {}
+        self.ifd_edits = {name: {} for name in SUB_IFD_POINTERS}
+
+    @property
+    def original_bytes(self):
+        """Raw TIFF bytes of the original EXIF block (None for TIFF files or no EXIF)."""
+        return self.tree.payload if self.tree else None
+
+    def is_stale(self):
+        """True if the file was modified or removed after it was parsed."""
+        if self.key is None:
+            return False
+        try:
+            return stat_key(self.path) != self.key
+        except OSError:
+            return True
+
+    def _original(self, ifd):
+        if ifd == "IFD0":
+            return self.original
+        return self.tree.values(ifd) if self.tree else {}
+
+    def _edits(self, ifd):
+        return self.edits if ifd == "IFD0" else self.ifd_edits[ifd]
+
+    def values(self, ifd="IFD0"):
+        """Current values of one IFD: the file's values with the pending edits applied."""
+        merged = dict(self._original(ifd))
+        merged.update(self._edits(ifd))
+        return {tag: value for tag, value in merged.items() if value is not REMOVED}
+
+    def set(self, tag_id, value, ifd="IFD0"):
+        """Record an edit. Setting a tag back to its original value drops the edit."""
+        original = self._original(ifd)
+        edits = self._edits(ifd)
+        if tag_id in original and original[tag_id] == value:
+            edits.pop(tag_id, None)
+        elif value is REMOVED and tag_id not in original:
+            edits.pop(tag_id, None)
+        else:
+            edits[tag_id] = value
+
+    def remove(self, tag_id, ifd="IFD0"):
+        self.set(tag_id, REMOVED, ifd)
+
+    def update(self, values, ifd="IFD0"):
+        """Record edits for every tag in values that differs from the current state."""
+        current = self.values(ifd)
+        for tag_id, value in values.items():
+            if current.get(tag_id) != value:
+                self.set(tag_id, value, ifd)
+
+    def discard_edits(self):
+        self.edits.clear()
+        for edits in self.ifd_edits.values():
+            edits.clear()
+
+    @property
+    def has_edits(self):
+        return bool(self.edits) or any(self.ifd_edits.values())
+
+    def build_exif(self):
+        """
+        Pillow Exif object for saving: the original block with edits applied.
+
+        Built from the cached EXIF bytes, so the image isn't opened again.
+        """
+        exif = Image.Exif()
+        if self.original_bytes is not None:
+            exif.load(EXIF_HEADER + self.original_bytes)
+        elif self.tree is not None:
+            # TIFF files aren't held in memory; let Pillow read the header
+            with Image.open(self.path) as img:
+                # Detached copy: sub-IFDs are read lazily from the open file
+                exif.load(img.getexif().tobytes())
+
+        # Sub-IFDs first; Pillow hands out the dict it serializes from
+        for name, edits in self.ifd_edits.items():
+            pointer = SUB_IFD_POINTERS[name]
+            if not edits or self.edits.get(pointer) is REMOVED:
+                continue
+            if name == "Interop" and self.ifd_edits["Exif"].get(pointer) is REMOVED:
+                continue
+            _apply(exif.get_ifd(pointer), edits)
+        _apply(exif, self.edits)
+        return exif
+
+
+def _apply(target, edits):
+    for tag_id, value in edits.items():
+        if value is REMOVED:
+            if tag_id in target:
+                del target[tag_id]
+        else:
+            target[tag_id] = value
+
+
+MAX_EDITABLE_BYTES = 256  # longer binary values (MakerNote, ...) aren't offered as text
+
+
+def value_to_text(value):
+    """
+    Editable text for a tag value: strings as-is, numbers and rationals
+    ("1/250") space-separated for tuples.
+
+    Returns:
+        str, or None if the value can't be edited as text
+    """
+    if isinstance(value, bytes):
+        if len(value) > MAX_EDITABLE_BYTES:
+            return None
+        try:
+            return value.rstrip(b"\x00").decode("utf-8")
+        except UnicodeDecodeError:
+            return None  # binary; editing it as text would corrupt it
+    if isinstance(value, str):
+        return value
+    if isinstance(value, IFDRational):
+        if value.denominator == 0:
+            return None
+        return str(value.numerator) if value.denominator == 1 else f"{value.numerator}/{value.denominator}"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, tuple) and 0 < len(value) <= 16:
+        parts = [value_to_text(item) for item in value]
+        if all(part is not None and not isinstance(item, (str, bytes)) for part, item in zip(parts, value)):
+            return " ".join(parts)
+    return None
+
+
+def text_to_value(text, like):
+    """
+    Parse edited text into the same kind of value as like (the tag's
+    current value). Rationals accept "1/250" or "0.004".
+
+    Raises:
+        ValueError: if the text doesn't fit
+    """
+    if isinstance(like, bytes):
+        return text.encode("utf-8")
+    if isinstance(like, str):
+        return text
+    if isinstance(like, tuple):
+        parts = text.replace(",", " ").split()
+        if len(parts) != len(like):
+            raise ValueError(f"expected {len(like)} values, got {len(parts)}")
+        return tuple(text_to_value(part, item) for part, item in zip(parts, like))
+    text = text.strip()
+    if isinstance(like, IFDRational):
+        try:
+            fraction = Fraction(text).limit_denominator(2**31 - 1)
+        except (ValueError, ZeroDivisionError):
+            raise ValueError(f"not a number or fraction: {text!r}") from None
+        if fraction < 0 and like >= 0:
+            raise ValueError("must not be negative")
+        return IFDRational(fraction.numerator, fraction.denominator)
+    if isinstance(like, bool):
+        raise ValueError("not editable")
+    if isinstance(like, int):
+        value = int(text)
+        if value < 0 <= like:
+            raise ValueError("must not be negative")
+        return value
+    if isinstance(like, float):
+        return float(text)
+    raise ValueError("not editable")
+
+
+def apply_edits(document, edits):
+    """
+    Record a diff on a document.
+
+    Args:
+        edits: {(ifd, tag_id): value}; REMOVED deletes the tag
+    """
+    for (ifd, tag_id), value in edits.items():
+        document.set(tag_id, value, ifd)
+
+
+class SessionCache:
+    """Small LRU of ImageDocuments keyed by path, validated by mtime/size."""
+
+    def __init__(self, max_documents=32):
+        self.max_documents = max_documents
+        self._documents = OrderedDict()
+
+    def get(self, path):
+        """Return the cached document for path, re-parsing it if the file changed."""
+        path = os.path.abspath(path)
+        doc = self._documents.get(path)
+        if doc is None or doc.is_stale():
+            doc = ImageDocument(path)
+            self._documents[path] = doc
+        self._documents.move_to_end(path)
+        while len(self._documents) > self.max_documents:
+            self._documents.popitem(last=False)
+        return doc
+
+    def invalidate(self, path):
+        self._documents.pop(os.path.abspath(path), None)
+
+    def clear(self):
+        self._documents.clear()
+
+
+# Shared by every component in the GUI process
+session = SessionCache()
+
+
+def get_document(path):
+    return session.get(path)
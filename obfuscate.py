@@ -0,0 +1,189 @@
+"""
+Metadata randomization shared by the GUI and the headless batch tools.
+
+Nothing in here imports Qt, so it can run inside worker processes.
+"""
+import os
+
+from exif_blocks import BlockSettings, build_payload, patch_blocks_in_place
+from exif_patch import PatchError
+from exif_writer import save_with_exif
+from gps_obfuscation import GpsSettings, apply_gps
+from instrumentation import span
+from metadata_session import ImageDocument
+from scrub_policy import ScrubContext, load_policy
+from time_shift import apply_time_shift
+from value_provider import DB_PATH, get_provider
+
+
+def get_random_camera(db_path=DB_PATH):
+    """Get a random (make, model) pair from the database."""
+    return get_provider(db_path).random_camera()
+
+
+def get_random_software(db_path=DB_PATH):
+    """Get a random software name from the database."""
+    return get_provider(db_path).random_software()
+
+
+def seed_key(path, root=None):
+    """
+    What a file's random values are seeded with, next to the run's seed.
+
+    Its path relative to the input root: same-named files in different
+    directories get different values, and a tree gets the same ones
+    wherever it's stored. Without a root, the path as given.
+    """
+    return os.path.relpath(path, root) if root else path
+
+
+def randomize_document(document, provider, policy=None):
+    """
+    Apply a scrub policy to a document, recording the changes as edits.
+
+    Args:
+        provider: ValueProvider the random values are drawn from
+        policy: CompiledPolicy (default: the built-in policy, which
+            randomizes Make, Model, Software, DateTime, Artist and Copyright)
+    """
+    policy = policy or load_policy()
+    with span("policy.apply", policy=policy.name):
+        policy.apply(document, ScrubContext(provider))
+
+
+def scrub_document(document, provider, policy=None, gps=None, dates=None, root=None):
+    """
+    Record every scrub edit for a single document, the same way scrub_files()
+    does for each file of a group: policy, date shift, then GPS.
+
+    Args:
+        policy: CompiledPolicy (default: the built-in one)
+        gps: GpsSettings (default: the policy's, else snap to a ~1 km grid)
+        dates: TimeSettings (default: the policy's)
+        root: input root the seed key is relative to (see seed_key)
+    """
+    policy = policy or load_policy()
+    provider.reseed(seed_key(document.path, root))
+    randomize_document(document, provider, policy)
+    noise = [(provider.rng.uniform(-1, 1), provider.rng.uniform(-1, 1))]
+    apply_time_shift([document], dates or policy.time)
+    apply_gps([document], gps or policy.gps or GpsSettings(), noise)
+
+
+def scrub_documents(documents, provider, policy, gps, dates, root=None):
+    """
+    Record the scrub edits for a group of documents: the policy for each
+    one, then the date shift and GPS obfuscation of the group in one pass.
+
+    Args:
+        policy, gps, dates: CompiledPolicy, GpsSettings and TimeSettings,
+            already resolved (see scrub_files)
+        root: input root the seed keys are relative to (see seed_key)
+
+    Returns:
+        list of (document, error); documents the policy failed on are
+        left out of the date and GPS pass
+    """
+    results = []
+    scrubbed = []
+    noise = []
+    for document in documents:
+        try:
+            provider.reseed(seed_key(document.path, root))
+            randomize_document(document, provider, policy)
+            # Drawn per file so seeded runs don't depend on how files are grouped
+            noise.append((provider.rng.uniform(-1, 1), provider.rng.uniform(-1, 1)))
+            scrubbed.append(document)
+            results.append((document, None))
+        except Exception as e:
+            results.append((document, e))
+    apply_time_shift(scrubbed, dates)
+    apply_gps(scrubbed, gps, noise)
+    return results
+
+
+def scrub_files(jobs, db_path=DB_PATH, seed=None, gps=None, policy=None,
+                in_place=False, backup=False, blocks=None, dates=None, reencode=False, root=None):
+    """
+    Randomize and save a group of files.
+
+    GPS positions of the whole group are obfuscated in one vectorized pass.
+    A failure only affects its own file.
+
+    Args:
+        jobs: list of (src_path, dst_path)
+        seed: makes the values picked for each file reproducible
+        gps: GpsSettings (default: the policy's, else snap to a ~1 km grid)
+        policy: path of a JSON scrub policy (default: the built-in one)
+        in_place: when src and dst are the same file, overwrite just the
+            changed bytes if every edit fits (see exif_patch), otherwise
+            rewrite the file as usual
+        backup: keep an undo file next to files patched in place
+        blocks: BlockSettings for the thumbnail and MakerNote (default:
+            the policy's, else strip the thumbnail and keep the MakerNote)
+        dates: TimeSettings; every date of the group is shifted by the
+            batch's (or album's) offset (default: the policy's)
+        reencode: re-encode files that can't be saved losslessly instead
+            of failing them (see exif_writer.save_with_exif)
+        root: input root; each file's values are seeded from its path
+            relative to it (see seed_key)
+
+    Returns:
+        list of (src_path, error, lossless); error is None on success
+    """
+    policy = load_policy(policy)
+    gps = gps or policy.gps or GpsSettings()
+    blocks = blocks or policy.blocks or BlockSettings()
+    dates = dates or policy.time
+    provider = get_provider(db_path, seed)
+    results = {}
+    documents = {}
+    for src_path, _ in jobs:
+        try:
+            documents[src_path] = ImageDocument(src_path)
+        except Exception as e:
+            results[src_path] = (src_path, e, False)
+    for document, error in scrub_documents(list(documents.values()), provider, policy, gps, dates, root):
+        if error is not None:
+            results[document.path] = (document.path, error, False)
+
+    for src_path, dst_path in jobs:
+        document = documents.get(src_path)
+        if document is None or src_path in results:
+            continue
+        try:
+            if in_place and os.path.abspath(dst_path) == os.path.abspath(src_path):
+                try:
+                    patch_blocks_in_place(document, blocks, backup=backup)
+                    results[src_path] = (src_path, None, True)
+                    continue
+                except PatchError:
+                    pass  # doesn't fit, rewrite the whole file
+            lossless = save_with_exif(src_path, dst_path, build_payload(document, blocks), reencode=reencode)
+            results[src_path] = (src_path, None, lossless)
+        except Exception as e:
+            results[src_path] = (src_path, e, False)
+    return [results[src_path] for src_path, _ in jobs]
+
+
+def scrub_file(src_path, dst_path, db_path=DB_PATH, seed=None, gps=None, policy=None,
+               blocks=None, dates=None, reencode=False):
+    """
+    Randomize the metadata of src_path and write the result to dst_path.
+
+    Args:
+        seed: makes the values picked for this file reproducible
+        gps: GpsSettings (default: the policy's, else snap to a ~1 km grid)
+        policy: path of a JSON scrub policy (default: the built-in one)
+        blocks: BlockSettings for the thumbnail and MakerNote
+        dates: TimeSettings for the shared date offset
+        reencode: allow re-encoding when a lossless save isn't possible
+
+    Returns:
+        bool: True if the lossless save path was used
+    """
+    _, error, lossless = scrub_files([(src_path, dst_path)], db_path, seed, gps, policy,
+                                     blocks=blocks, dates=dates, reencode=reencode)[0]
+    if error is not None:
+        raise error
+    return lossless
@@ -0,0 +1,389 @@
+"""
+Pipelined batch executor: read -> scrub -> write.
+
+run_batch hands every worker whole files, so each worker waits on its
+own reads and writes in turn, and on slow (e.g. network) storage the
+cores mostly sit idle. Here the three kinds of work overlap, each with
+its own workers:
+
+    read    threads read every source file in one large sequential read
+    scrub   worker processes parse the EXIF blocks cut out of those bytes,
+            apply the policy and build the new metadata block; the image
+            data itself never leaves the read/write process
+    write   threads splice the block into the in-memory source and write
+            the output (temp file + rename, see exif_writer.atomic_output)
+
+The stages are connected by bounded queues and the file contents held in
+memory are capped, so a fast stage blocks instead of running ahead of a
+slow one. The summary reports how busy each stage was; the busiest one is
+what limits throughput.
+
+Usage:
+    python main.py batch PHOTOS/ -o scrubbed/ --pipeline --readers 8 --writers 4
+"""
+import io
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import instrumentation
+from batch import BatchStats, init_worker, record_results, skip_current
+from exif_blocks import BlockSettings, build_payload
+from exif_reader import EXIF_FINDERS, ExifTree, parse_tiff_payload, read_exif_from_file, sniff_container
+from exif_writer import save_with_exif
+from gps_obfuscation import GpsSettings
+from instrumentation import span
+from metadata_session import ImageDocument
+from obfuscate import DB_PATH, scrub_documents
+from scrub_index import fingerprint, policy_key
+from scrub_policy import load_policy
+from value_provider import get_provider
+from verify import VerifyRules, check_output, snapshot
+
+DONE = object()  # end of stream marker on the queues
+MAX_BUFFERED = 512 * 1024 * 1024  # file contents held between reading and writing
+POLL_SECONDS = 0.1
+
+
+class MemoryBudget:
+    """Bytes of file contents in flight; acquire() blocks while they're spent."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, size):
+        with self._cond:
+            # A file bigger than the whole budget still gets through, on its own
+            while self.used and self.used + size > self.limit:
+                self._cond.wait()
+            self.used += size
+
+    def release(self, size):
+        with self._cond:
+            self.used -= size
+            self._cond.notify_all()
+
+
+class Stage:
+    """Busy time of one stage, summed over its workers."""
+
+    def __init__(self, name, workers, unit):
+        self.name = name
+        self.workers = workers
+        self.unit = unit
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.busy += seconds
+
+    def report(self):
+        return self.name, self.workers, self.unit, self.busy
+
+
+def _exif_part(data):
+    """
+    What the scrub stage needs of a file read into memory, without its image data.
+
+    Returns:
+        (container, tiff_offset, payload) for containers that keep the EXIF
+        in one block, which the worker parses; the parsed ExifTree for TIFF
+        files, whose IFDs can be anywhere in the file; None without EXIF
+    """
+    container = sniff_container(data[:12])
+    if container == "tiff":
+        with span("exif.parse"):
+            return read_exif_from_file(io.BytesIO(data))
+    if container not in EXIF_FINDERS:
+        return None
+    offset, payload = EXIF_FINDERS[container](io.BytesIO(data))
+    return None if payload is None else (container, offset, payload)
+
+
+def _parse_part(part):
+    """ExifTree (or None) from what _exif_part cut out."""
+    if part is None or isinstance(part, ExifTree):
+        return part
+    container, offset, payload = part
+    return parse_tiff_payload(payload, container, offset)
+
+
+def _scrub_task(items, db_path, seed, gps, policy, blocks, dates, root):
+    """
+    Worker entry point: new EXIF blocks for files that were read already.
+
+    Args:
+        items: list of (src_path, part), part being the file's EXIF as
+            cut out by _exif_part
+
+    Returns:
+        (results, seconds, timings): results is a list of (payload,
+        error_message) in the order of items, seconds the time the task
+        took and timings instrumentation.drain()
+    """
+    started = time.perf_counter()
+    policy = load_policy(policy)
+    gps = gps or policy.gps or GpsSettings()
+    blocks = blocks or policy.blocks or BlockSettings()
+    dates = dates or policy.time
+    provider = get_provider(db_path, seed)
+    errors = {}
+    documents = []
+    for src_path, part in items:
+        try:
+            with span("exif.parse"):
+                tree = _parse_part(part)
+            # The real path, so seeds and album offsets match a run_batch run
+            documents.append(ImageDocument.from_tree(src_path, tree))
+        except Exception as e:
+            errors[src_path] = e
+    for document, error in scrub_documents(documents, provider, policy, gps, dates, root):
+        if error is not None:
+            errors[document.path] = error
+
+    payloads = {}
+    for document in documents:
+        if document.path not in errors:
+            try:
+                payloads[document.path] = build_payload(document, blocks)
+            except Exception as e:
+                errors[document.path] = e
+    results = [
+        (payloads.get(src_path), str(errors[src_path]) if src_path in errors else None)
+        for src_path, _ in items
+    ]
+    return results, time.perf_counter() - started, instrumentation.drain()
+
+
+def _write_output(src_path, dst_path, data, payload, rules, want_fingerprint, reencode):
+    """
+    Write one scrubbed file from its in-memory source.
+
+    Returns:
+        its result row, as batch._scrub_task makes them
+    """
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(dst_path)), exist_ok=True)
+        lossless = save_with_exif(src_path, dst_path, payload, data=data, reencode=reencode)
+        stamp = None
+        if want_fingerprint:
+            try:
+                stamp = fingerprint(src_path)
+            except OSError:
+                pass
+        check = None
+        if rules is not None:
+            started = time.perf_counter()
+            problems, hashed, compared = check_output(snapshot(src_path, data), dst_path, rules, lossless)
+            check = (problems, hashed, compared, time.perf_counter() - started)
+        return src_path, None, len(data), os.path.getsize(dst_path), lossless, stamp, check
+    except Exception as e:
+        return src_path, str(e), 0, 0, False, None, None
+
+
+def run_pipeline(jobs, workers=None, readers=4, writers=4, queue_size=None, max_buffered=MAX_BUFFERED,
+                 db_path=DB_PATH, seed=None, gps=None, policy=None, chunk_size=16, blocks=None,
+                 dates=None, index=None, trace=None, verify=False, reencode=False, root=None, log=print):
+    """
+    Scrub (src, dst) jobs with reading, scrubbing and writing overlapped.
+
+    Takes the same settings as batch.run_batch, except that outputs are
+    always whole new files (no in-place patching), plus:
+
+    Args:
+        workers: scrub stage processes, defaults to the core count
+        readers: read stage threads
+        writers: write stage threads
+        queue_size: files waiting between two stages before the earlier
+            one blocks (default: chunk_size x workers)
+        max_buffered: cap on the bytes of file contents held in memory,
+            from the start of a read to the end of its write
+        chunk_size: max files per scrub task; a task takes whatever has
+            been read so far, up to this many
+
+    Returns:
+        BatchStats, with the stages' busy times in stats.stages
+    """
+    workers = workers or os.cpu_count() or 1
+    queue_size = queue_size or chunk_size * workers
+    dates = dates or load_policy(policy).time
+    stats = BatchStats()
+    jobs = iter(jobs)
+    key = None
+    if index is not None:
+        key = policy_key(load_policy(policy), gps, dates, blocks)
+        jobs = skip_current(jobs, index, key, stats)
+    rules = VerifyRules(load_policy(policy), gps, dates, blocks) if verify else None
+
+    budget = MemoryBudget(max_buffered)
+    read_stage = Stage("read", readers, "threads")
+    scrub_stage = Stage("scrub", workers, "processes")
+    write_stage = Stage("write", writers, "threads")
+    job_queue = queue.Queue(readers * 2)
+    read_queue = queue.Queue(queue_size)
+    write_queue = queue.Queue(queue_size)
+    results = queue.Queue()  # small rows; drained by this thread
+    pending = queue.Queue()  # (future, chunk); bounded by slots
+    slots = threading.Semaphore(workers * 2)
+
+    def read():
+        busy = 0.0
+        try:
+            while True:
+                job = job_queue.get()
+                if job is DONE:
+                    return
+                src_path, dst_path = job
+                try:
+                    size = os.path.getsize(src_path)
+                except OSError as e:
+                    results.put((dst_path, (src_path, str(e), 0, 0, False, None, None)))
+                    continue
+                budget.acquire(size)
+                started = time.perf_counter()
+                try:
+                    with span("pipeline.read"), open(src_path, "rb") as fp:
+                        data = fp.read()
+                    head = _exif_part(data)
+                except Exception as e:  # unreadable, or a TIFF the parser rejects
+                    budget.release(size)
+                    results.put((dst_path, (src_path, str(e), 0, 0, False, None, None)))
+                    continue
+                finally:
+                    busy += time.perf_counter() - started
+                # size is what gets released, even if the file changed since the stat
+                read_queue.put((src_path, dst_path, data, head, size))
+        finally:
+            read_stage.add(busy)
+            read_queue.put(DONE)
+
+    def dispatch():
+        open_readers = readers
+        try:
+            while open_readers:
+                chunk = []
+                item = read_queue.get()
+                while True:
+                    if item is DONE:
+                        open_readers -= 1
+                    else:
+                        chunk.append(item)
+                    if len(chunk) >= chunk_size or not open_readers:
+                        break
+                    try:
+                        item = read_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                if chunk:
+                    slots.acquire()
+                    items = [(src_path, head) for src_path, _, _, head, _ in chunk]
+                    try:
+                        future = pool.submit(_scrub_task, items, db_path, seed, gps, policy, blocks, dates, root)
+                    except BrokenProcessPool as e:
+                        # A worker died and took the pool down: this chunk and everything
+                        # read after it fails, but the stages keep draining so they all stop
+                        future = Future()
+                        future.set_exception(e)
+                    pending.put((future, chunk))
+        finally:
+            pending.put(DONE)
+
+    def collect():
+        try:
+            while True:
+                entry = pending.get()
+                if entry is DONE:
+                    return
+                future, chunk = entry
+                try:
+                    scrubbed, seconds, timings = future.result()
+                    instrumentation.merge(timings)
+                    scrub_stage.add(seconds)
+                except Exception as e:
+                    # The worker itself died; every file in the chunk failed
+                    scrubbed = [(None, str(e))] * len(chunk)
+                slots.release()
+                for (src_path, dst_path, data, _, size), (payload, error) in zip(chunk, scrubbed):
+                    write_queue.put((src_path, dst_path, data, size, payload, error))
+        finally:
+            for _ in range(writers):
+                write_queue.put(DONE)
+
+    def write():
+        busy = 0.0
+        try:
+            while True:
+                item = write_queue.get()
+                if item is DONE:
+                    return
+                src_path, dst_path, data, size, payload, error = item
+                if error is not None:
+                    result = (src_path, error, 0, 0, False, None, None)
+                else:
+                    started = time.perf_counter()
+                    result = _write_output(src_path, dst_path, data, payload, rules, index is not None,
+                                           reencode)
+                    busy += time.perf_counter() - started
+                budget.release(size)
+                results.put((dst_path, result))
+        finally:
+            write_stage.add(busy)
+            results.put(DONE)
+
+    def drain(block):
+        """Record the files finished so far; returns how many writers quit meanwhile."""
+        finished = []
+        quit = 0
+        try:
+            item = results.get(block)
+            while True:
+                if item is DONE:
+                    quit += 1
+                else:
+                    finished.append(item)
+                item = results.get_nowait()
+        except queue.Empty:
+            pass
+        record_results(stats, finished, index, key, log)
+        return quit
+
+    def feed(item):
+        # The index (SQLite) lives in this thread, so it hands out the jobs
+        # and records the results, in between
+        while True:
+            try:
+                job_queue.put(item, timeout=POLL_SECONDS)
+                return
+            except queue.Full:
+                drain(False)
+
+    initializer, initargs = None, ()
+    if trace:
+        initializer, initargs = init_worker, (trace if isinstance(trace, str) else None,)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+        threads = [threading.Thread(target=read, name=f"read-{i}", daemon=True) for i in range(readers)]
+        threads += [threading.Thread(target=dispatch, name="dispatch", daemon=True),
+                    threading.Thread(target=collect, name="collect", daemon=True)]
+        threads += [threading.Thread(target=write, name=f"write-{i}", daemon=True) for i in range(writers)]
+        for thread in threads:
+            thread.start()
+
+        for job in jobs:
+            feed(job)
+        for _ in range(readers):
+            feed(DONE)
+        open_writers = writers
+        while open_writers:
+            open_writers -= drain(True)
+        for thread in threads:
+            thread.join()
+
+    stats.stages = [stage.report() for stage in (read_stage, scrub_stage, write_stage)]
+    return stats
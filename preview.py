@@ -0,0 +1,90 @@
+"""
+Background preview loading for the image panel.
+
+Previews are decoded off the GUI thread with Pillow, using JPEG draft mode
+so a large photo is decoded at (close to) the viewport size instead of
+full resolution. Finished previews are kept in a small LRU so switching
+back to an image or resizing the window doesn't decode it again.
+"""
+import os
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+from PyQt5.QtGui import QImage
+from PIL import Image
+
+from instrumentation import span
+
+# Previews are requested in steps of this many pixels, so small resizes
+# reuse the same cached preview instead of decoding again
+SIZE_STEP = 256
+
+
+def preview_size(width, height):
+    """Round a viewport size up to the next SIZE_STEP bucket."""
+    def bucket(v):
+        return max(SIZE_STEP, -(-v // SIZE_STEP) * SIZE_STEP)
+    return bucket(width), bucket(height)
+
+
+def decode_preview(path, max_size):
+    """
+    Decode path at roughly max_size and return a QImage.
+
+    Safe to call from a worker thread (QImage, unlike QPixmap, is).
+    """
+    with span("preview.decode", size=max_size), Image.open(path) as img:
+        # JPEG only: let libjpeg scale by 1/2, 1/4 or 1/8 while decoding
+        img.draft("RGB", max_size)
+        img.thumbnail(max_size, Image.BILINEAR)
+        img = img.convert("RGBA")
+        data = img.tobytes("raw", "RGBA")
+    qimage = QImage(data, img.width, img.height, img.width * 4, QImage.Format_RGBA8888)
+    return qimage.copy()  # detach from the Python buffer
+
+
+class PreviewSignals(QObject):
+    # key, QImage (null on failure), error message
+    finished = pyqtSignal(object, QImage, str)
+
+
+class PreviewTask(QRunnable):
+    """QThreadPool job that decodes one preview."""
+
+    def __init__(self, key, path, max_size):
+        super().__init__()
+        self.key = key
+        self.path = path
+        self.max_size = max_size
+        self.signals = PreviewSignals()
+
+    def run(self):
+        try:
+            qimage = decode_preview(self.path, self.max_size)
+            self.signals.finished.emit(self.key, qimage, "")
+        except Exception as e:
+            self.signals.finished.emit(self.key, QImage(), str(e))
+
+
+class PreviewCache:
+    """LRU of decoded previews keyed by (path, mtime, size bucket)."""
+
+    def __init__(self, max_items=8):
+        self.max_items = max_items
+        self._items = OrderedDict()
+
+    @staticmethod
+    def key_for(path, max_size):
+        return os.path.abspath(path), os.stat(path).st_mtime_ns, max_size
+
+    def get(self, key):
+        qimage = self._items.get(key)
+        if qimage is not None:
+            self._items.move_to_end(key)
+        return qimage
+
+    def put(self, key, qimage):
+        self._items[key] = qimage
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
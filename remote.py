@@ -0,0 +1,559 @@
+"""
+Scrub images that live in an S3-compatible bucket (AWS, MinIO, ...) or
+behind plain HTTP URLs, without downloading whole files.
+
+For a JPEG only the marker segments in front of the scan data are fetched,
+with a ranged GET. The new header is built from them, and the upload is
+streamed: new header first, then the original scan data, which is piped
+from a second ranged GET straight into the PUT. Each object is in memory
+only as far as its header goes. Many objects are processed at once on one
+event loop, so the fetch, scrub and upload of different files overlap.
+
+Other formats (and thumbnail regeneration, which needs the pixels) are
+downloaded to a temp file, scrubbed as usual and uploaded from there.
+
+Usage:
+    python main.py remote s3://photos/2024/ --dest s3://scrubbed/2024/ \\
+        --s3-endpoint http://localhost:9000
+    python main.py remote https://example.com/a.jpg --dest s3://scrubbed/
+
+S3 credentials come from AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY
+(and AWS_SESSION_TOKEN). Requests are signed with SigV4; upload bodies
+are sent as UNSIGNED-PAYLOAD, since they are streamed.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import io
+import os
+import re
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import quote, unquote, urlsplit
+
+from async_http import HttpClient, HttpError
+from batch import (BatchStats, add_gps_arguments, add_trace_arguments, block_settings_from_args,
+                   gps_settings_from_args, time_settings_from_args, trace_from_args,
+                   write_metrics)
+from exif_blocks import BlockSettings, build_payload
+from exif_reader import read_exif_from_file
+from exif_writer import (SOI, ExifWriteError, read_jpeg_header, save_with_exif,
+                         splice_segments)
+from gps_obfuscation import GpsSettings
+from instrumentation import span
+from metadata_session import ImageDocument
+from obfuscate import scrub_document
+from scrub_policy import PolicyError, load_policy
+from value_provider import DB_PATH, get_provider
+
+HEADER_WINDOW = 64 * 1024        # first ranged GET; covers the header of almost every JPEG
+MAX_HEADER_SIZE = 16 * 1024 * 1024
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+S3_NAMESPACE = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".jpe", ".jfif", ".png", ".tif", ".tiff", ".webp", ".heic", ".heif"}
+
+_content_range = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+def _uri_encode(value, safe="-_.~"):
+    return quote(value, safe=safe)
+
+
+class S3Signer:
+    """
+    AWS Signature Version 4 for the S3 service.
+
+    Args:
+        access_key, secret_key: credentials
+        region: e.g. "us-east-1" (MinIO accepts any, by default that one)
+        session_token: for temporary credentials
+    """
+
+    def __init__(self, access_key, secret_key, region="us-east-1", session_token=None):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.session_token = session_token
+
+    @classmethod
+    def from_env(cls, region=None):
+        """Signer from the usual AWS_* variables, or None if they aren't set."""
+        access_key = os.environ.get("AWS_ACCESS_KEY_ID")
+        secret_key = os.environ.get("AWS_SECRET_ACCESS_KEY")
+        if not access_key or not secret_key:
+            return None
+        region = region or os.environ.get("AWS_REGION") or os.environ.get("AWS_DEFAULT_REGION") or "us-east-1"
+        return cls(access_key, secret_key, region, os.environ.get("AWS_SESSION_TOKEN"))
+
+    def _key(self, date):
+        key = ("AWS4" + self.secret_key).encode("utf-8")
+        for part in (date, self.region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode("utf-8"), hashlib.sha256).digest()
+        return key
+
+    def sign(self, method, url, headers, payload_hash=UNSIGNED_PAYLOAD, now=None):
+        """
+        Headers with x-amz-date, x-amz-content-sha256 and Authorization added.
+
+        The URL's path and query must already be URI-encoded the way S3
+        expects (see S3Store.object_url()).
+        """
+        now = now or datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date = amz_date[:8]
+        parts = urlsplit(url)
+
+        headers = dict(headers)
+        headers["x-amz-date"] = amz_date
+        headers["x-amz-content-sha256"] = payload_hash
+        if self.session_token:
+            headers["x-amz-security-token"] = self.session_token
+        host = parts.netloc
+        signed = {"host": host}
+        for name, value in headers.items():
+            lower = name.lower()
+            if lower.startswith("x-amz-") or lower in ("range", "content-type", "content-md5"):
+                signed[lower] = " ".join(str(value).split())
+        names = sorted(signed)
+
+        query = "&".join(sorted(p if "=" in p else p + "=" for p in parts.query.split("&") if p))
+        canonical = "\n".join([
+            method,
+            parts.path or "/",
+            query,
+            "".join(f"{name}:{signed[name]}\n" for name in names),
+            ";".join(names),
+            payload_hash,
+        ])
+        scope = f"{date}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical.encode("utf-8")).hexdigest(),
+        ])
+        signature = hmac.new(self._key(date), string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+        headers["Authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={';'.join(names)}, Signature={signature}"
+        )
+        return headers
+
+
+class S3Store:
+    """
+    Maps s3://bucket/key URLs onto HTTP requests against an endpoint
+    (path-style, which MinIO and AWS both accept) and signs them.
+    http(s):// URLs pass through unsigned.
+
+    Args:
+        client: HttpClient
+        endpoint: e.g. "http://localhost:9000" (default: AWS for the region)
+        signer: S3Signer, or None for anonymous access
+    """
+
+    def __init__(self, client, endpoint=None, signer=None):
+        self.client = client
+        self.signer = signer
+        region = signer.region if signer else "us-east-1"
+        self.endpoint = (endpoint or f"https://s3.{region}.amazonaws.com").rstrip("/")
+
+    def object_url(self, url):
+        """HTTP URL for an s3:// or http(s):// URL."""
+        parts = urlsplit(url)
+        if parts.scheme != "s3":
+            return url
+        return f"{self.endpoint}/{_uri_encode(parts.netloc)}/{_uri_encode(parts.path.lstrip('/'), '/-_.~')}"
+
+    async def request(self, method, url, headers=None, body=None, content_length=None):
+        http_url = self.object_url(url)
+        headers = headers or {}
+        if url.startswith("s3://") and self.signer is not None:
+            payload_hash = UNSIGNED_PAYLOAD if body is not None else EMPTY_SHA256
+            headers = self.signer.sign(method, http_url, headers, payload_hash)
+        return await self.client.request(method, http_url, headers, body, content_length)
+
+    async def list_objects(self, url):
+        """
+        Yield (url, relative_name) for every object under an s3://bucket/prefix/.
+
+        Follows ListObjectsV2 continuation tokens, 1000 keys per page.
+        """
+        parts = urlsplit(url)
+        bucket, prefix = parts.netloc, parts.path.lstrip("/")
+        token = None
+        while True:
+            params = {"list-type": "2", "prefix": prefix}
+            if token:
+                params["continuation-token"] = token
+            query = "&".join(f"{_uri_encode(k)}={_uri_encode(v)}" for k, v in sorted(params.items()))
+            list_url = f"{self.endpoint}/{_uri_encode(bucket)}?{query}"
+            headers = self.signer.sign("GET", list_url, {}, EMPTY_SHA256) if self.signer else {}
+            response = await self.client.request("GET", list_url, headers)
+            body = await response.read()
+            if response.status != 200:
+                raise HttpError(f"Listing {url} failed: {response.status} {body[:200]!r}", response.status)
+
+            root = ET.fromstring(body)
+            for item in root.iter(f"{S3_NAMESPACE}Contents"):
+                key = item.find(f"{S3_NAMESPACE}Key").text
+                if not key.endswith("/"):
+                    yield f"s3://{bucket}/{key}", key[len(prefix):].lstrip("/")
+            token = root.findtext(f"{S3_NAMESPACE}NextContinuationToken")
+            if root.findtext(f"{S3_NAMESPACE}IsTruncated") != "true" or not token:
+                return
+
+
+class ObjectReader:
+    """
+    Sequential access to one object: the header through ranged GETs, then
+    the rest as a stream. Servers that ignore Range (200 instead of 206)
+    get a single GET whose body is read up to the header and then piped on.
+    """
+
+    def __init__(self, store, url):
+        self.store = store
+        self.url = url
+        self.head = b""
+        self.size = None
+        self._stream = None
+        self._response = None  # the GET whose body is still being read
+
+    async def open(self, window=HEADER_WINDOW):
+        response = await self.store.request("GET", self.url, {"Range": f"bytes=0-{window - 1}"})
+        if response.status == 206:
+            match = _content_range.match(response.headers.get("content-range", ""))
+            if match and match.group(3) != "*":
+                self.size = int(match.group(3))
+            self.head = await response.read()
+        elif response.status == 200:
+            if "content-length" in response.headers:
+                self.size = int(response.headers["content-length"])
+            self._response = response
+            self._stream = response.iter_chunks()
+            await self._pull(window)
+        else:
+            body = await response.read()
+            raise HttpError(f"GET {self.url}: {response.status} {body[:200]!r}", response.status)
+        if self.size is None:
+            raise HttpError(f"GET {self.url}: server didn't report the object size")
+        return self
+
+    async def _pull(self, size):
+        parts = [self.head]
+        have = len(self.head)
+        while have < size:
+            try:
+                chunk = await self._stream.__anext__()
+            except StopAsyncIteration:
+                break
+            parts.append(chunk)
+            have += len(chunk)
+        self.head = b"".join(parts)
+
+    async def extend(self, size):
+        """Make sure the first `size` bytes (or the whole object) are in self.head."""
+        size = min(size, self.size)
+        if len(self.head) >= size:
+            return
+        if self._stream is not None:
+            await self._pull(size)
+            return
+        response = await self.store.request("GET", self.url, {"Range": f"bytes={len(self.head)}-{size - 1}"})
+        body = await response.read()
+        if response.status != 206:
+            raise HttpError(f"GET {self.url}: {response.status}", response.status)
+        self.head += body
+
+    @property
+    def complete(self):
+        return len(self.head) >= self.size
+
+    async def iter_from(self, offset):
+        """Yield the object's bytes from offset to the end."""
+        if offset < len(self.head):
+            yield self.head[offset:]
+        offset = max(offset, len(self.head))
+        if offset >= self.size:
+            return
+        if self._stream is not None:
+            async for chunk in self._stream:
+                yield chunk
+            return
+        response = await self.store.request("GET", self.url, {"Range": f"bytes={offset}-"})
+        if response.status != 206:
+            response.close()
+            raise HttpError(f"GET {self.url}: {response.status}", response.status)
+        self._response = response
+        async for chunk in response.iter_chunks():
+            yield chunk
+
+    def close(self):
+        """Drop a GET that wasn't read to the end (e.g. the upload failed)."""
+        if self._response is not None:
+            self._response.close()
+            self._response = None
+
+
+class Scrubber:
+    """
+    The scrub settings of a run plus the CPU side of the work.
+
+    Scrubbing runs on one worker thread: the value provider isn't
+    thread-safe, and the event loop stays free for network I/O meanwhile.
+    """
+
+    def __init__(self, db_path=DB_PATH, seed=None, gps=None, policy=None, blocks=None, dates=None,
+                 reencode=False):
+        self.policy_path = policy
+        self.policy = load_policy(policy)
+        self.db_path = db_path
+        self.seed = seed
+        self.gps = gps or self.policy.gps or GpsSettings()
+        self.blocks = blocks or self.policy.blocks or BlockSettings()
+        self.dates = dates or self.policy.time
+        self.reencode = reencode
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scrub")
+
+    async def run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def jpeg_header(self, label, head):
+        """
+        New header for a JPEG whose first bytes are head.
+
+        Returns:
+            (header_bytes, scan_offset): the SOI plus rewritten marker
+            segments, and where the original scan data starts
+
+        Raises:
+            ExifWriteError: if head doesn't hold the complete header
+        """
+        fp = io.BytesIO(head)
+        segments = read_jpeg_header(fp)
+        scan_offset = fp.tell()
+        document = ImageDocument.from_tree(label, read_exif_from_file(io.BytesIO(head)))
+        scrub_document(document, get_provider(self.db_path, self.seed), self.policy, self.gps, self.dates)
+        payload = build_payload(document, self.blocks)
+        return SOI + b"".join(splice_segments(segments, payload)), scan_offset
+
+    def local_file(self, label, src_path, dst_path):
+        """Scrub a downloaded file the regular way. Returns True if saved losslessly."""
+        document = ImageDocument(src_path)
+        document.path = label  # seeds and album offsets follow the remote key
+        scrub_document(document, get_provider(self.db_path, self.seed), self.policy, self.gps, self.dates)
+        document.path = src_path
+        return save_with_exif(src_path, dst_path, build_payload(document, self.blocks), reencode=self.reencode)
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def _label(url):
+    """Stand-in path for a remote object: seeds use its name, album offsets its prefix."""
+    parts = urlsplit(url)
+    return f"/{parts.netloc}{parts.path}"
+
+
+async def _upload(store, url, body, length, content_type):
+    with span("remote.upload", bytes=length):
+        response = await store.request("PUT", url, {"Content-Type": content_type}, body, length)
+        reply = await response.read()
+    if response.status not in (200, 201, 204):
+        raise HttpError(f"PUT {url}: {response.status} {reply[:200]!r}", response.status)
+
+
+async def scrub_object(store, scrubber, src_url, dst_url, header_window=HEADER_WINDOW):
+    """
+    Scrub one remote object into dst_url.
+
+    Returns:
+        (bytes_in, bytes_out, bytes_fetched_for_the_header, lossless)
+    """
+    with span("remote.fetch", window=header_window):
+        reader = await ObjectReader(store, src_url).open(header_window)
+    try:
+        if reader.head.startswith(SOI) and scrubber.blocks.thumbnail != "regenerate":
+            window = header_window
+            while True:
+                try:
+                    header, scan_offset = await scrubber.run(scrubber.jpeg_header, _label(src_url), reader.head)
+                    break
+                except ExifWriteError:
+                    # Header runs past what we have (big ICC profile, ...); fetch more
+                    if reader.complete or window >= MAX_HEADER_SIZE:
+                        raise
+                    window *= 4
+                    await reader.extend(window)
+
+            fetched = len(reader.head)
+            length = len(header) + reader.size - scan_offset
+
+            async def body():
+                yield header
+                async for chunk in reader.iter_from(scan_offset):
+                    yield chunk
+
+            await _upload(store, dst_url, body(), length, "image/jpeg")
+            return reader.size, length, fetched, True
+
+        # Not a JPEG: fall back to a temp file
+        with tempfile.TemporaryDirectory(prefix="exifuscator-") as tmp_dir:
+            name = os.path.basename(urlsplit(src_url).path) or "image"
+            src_path = os.path.join(tmp_dir, name)
+            dst_path = os.path.join(tmp_dir, "scrubbed-" + name)
+            with open(src_path, "wb") as fp:
+                async for chunk in reader.iter_from(0):
+                    fp.write(chunk)
+            lossless = await scrubber.run(scrubber.local_file, _label(src_url), src_path, dst_path)
+            length = os.path.getsize(dst_path)
+
+            async def body():
+                with open(dst_path, "rb") as fp:
+                    for block in iter(lambda: fp.read(256 * 1024), b""):
+                        yield block
+
+            await _upload(store, dst_url, body(), length, "application/octet-stream")
+            return reader.size, length, reader.size, lossless
+    finally:
+        reader.close()
+
+
+def _dest_url(dest, name):
+    """dest prefix + relative name; s3:// keys are encoded when the request is made."""
+    return dest + (name if dest.startswith("s3://") else _uri_encode(name, "/-_.~"))
+
+
+async def iter_sources(store, sources):
+    """Yield (url, relative_name) for URLs and s3:// prefixes (ending in "/")."""
+    for source in sources:
+        if source.startswith("s3://") and source.endswith("/"):
+            async for url, name in store.list_objects(source):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                    yield url, name
+        else:
+            name = os.path.basename(urlsplit(source).path)
+            yield source, name if source.startswith("s3://") else unquote(name)
+
+
+async def run_remote(sources, dest, scrubber, endpoint=None, signer=None, concurrency=16,
+                     header_window=HEADER_WINDOW, log=print):
+    """
+    Scrub remote objects into a destination prefix.
+
+    Args:
+        sources: object URLs and s3://bucket/prefix/ listings
+        dest: s3:// or http(s):// prefix; each object keeps its name
+            relative to its source prefix
+        scrubber: Scrubber with the run's settings
+        concurrency: objects in flight at once
+
+    Returns:
+        BatchStats
+    """
+    stats = BatchStats()
+    stats.fetched = 0
+    client = HttpClient(limit_per_host=2 * concurrency + 1)  # a GET and a PUT per object, plus listing
+    store = S3Store(client, endpoint, signer)
+    dest = dest if dest.endswith("/") else dest + "/"
+    queue = asyncio.Queue(maxsize=2 * concurrency)
+
+    async def produce():
+        try:
+            async for url, name in iter_sources(store, sources):
+                await queue.put((url, _dest_url(dest, name)))
+        finally:
+            for _ in range(concurrency):
+                await queue.put(None)
+
+    async def work():
+        while True:
+            job = await queue.get()
+            if job is None:
+                return
+            src_url, dst_url = job
+            try:
+                if store.object_url(src_url) == store.object_url(dst_url):
+                    raise ValueError("source and destination are the same object")
+                size_in, size_out, fetched, lossless = await scrub_object(
+                    store, scrubber, src_url, dst_url, header_window)
+            except Exception as e:
+                stats.failed += 1
+                log(f"FAILED {src_url}: {e}")
+                continue
+            stats.ok += 1
+            stats.bytes_in += size_in
+            stats.bytes_out += size_out
+            stats.fetched += fetched
+            if not lossless:
+                stats.reencoded += 1
+            log(f"{src_url} -> {dst_url}")
+
+    try:
+        await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+    finally:
+        await client.close()
+    return stats
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="exifuscator remote",
+        description="Scrub images in S3-compatible buckets or at HTTP URLs, streaming them back.",
+    )
+    parser.add_argument("sources", nargs="+", help="object URLs (s3://bucket/key, https://...) or s3://bucket/prefix/ listings")
+    parser.add_argument("--dest", required=True, help="s3:// or http(s):// prefix the scrubbed objects are uploaded to")
+    parser.add_argument("--s3-endpoint", default=os.environ.get("AWS_ENDPOINT_URL"),
+                        help="S3 endpoint, e.g. http://localhost:9000 for MinIO (default: $AWS_ENDPOINT_URL, else AWS)")
+    parser.add_argument("--region", help="S3 region for signing (default: $AWS_REGION, else us-east-1)")
+    parser.add_argument("-j", "--concurrency", type=int, default=16, help="objects in flight (default: %(default)s)")
+    parser.add_argument("--header-window", type=int, default=HEADER_WINDOW // 1024, metavar="KB",
+                        help="size of the first ranged GET (default: %(default)s)")
+    parser.add_argument("--db", default=DB_PATH, help="metadata database (default: %(default)s)")
+    parser.add_argument("--seed", help="seed for reproducible runs (same seed, same values)")
+    add_gps_arguments(parser)
+    add_trace_arguments(parser)
+    return parser
+
+
+def main(argv=None):
+    """Command line entry point. Returns a process exit code."""
+    args = build_parser().parse_args(argv)
+    try:
+        load_policy(args.policy)
+    except (OSError, PolicyError) as e:
+        print(f"Bad policy: {e}", file=sys.stderr)
+        return 2
+
+    trace_from_args(args)
+    scrubber = Scrubber(
+        db_path=os.path.abspath(args.db),
+        seed=args.seed,
+        gps=gps_settings_from_args(args),
+        policy=args.policy,
+        blocks=block_settings_from_args(args),
+        dates=time_settings_from_args(args),
+        reencode=args.allow_reencode,
+    )
+    try:
+        stats = asyncio.run(run_remote(
+            args.sources,
+            args.dest,
+            scrubber,
+            endpoint=args.s3_endpoint,
+            signer=S3Signer.from_env(args.region),
+            concurrency=max(1, args.concurrency),
+            header_window=max(1, args.header_window) * 1024,
+            log=lambda line: print(line, file=sys.stderr),
+        ))
+    finally:
+        scrubber.close()
+    write_metrics(args)
+    print(f"{stats.summary()}, {stats.fetched / (1024 * 1024):.1f} MB fetched for headers")
+    return 1 if stats.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Index of already-scrubbed files.
+
+A sidecar SQLite file remembers, per source path, the size and mtime the
+file had after scrubbing, where the scrubbed copy went and the settings
+that were applied. A re-run over a growing archive then skips unchanged
+files with one stat() and one primary-key lookup, without opening them.
+"""
+import os
+import sqlite3
+import time
+
+from exif_blocks import BlockSettings
+from gps_obfuscation import GpsSettings
+
+SCHEMA_VERSION = 2  # tracked in PRAGMA user_version
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS scrubbed (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        policy TEXT NOT NULL,
+        output TEXT NOT NULL,
+        scrubbed_at REAL NOT NULL
+    )
+"""
+
+
+def policy_key(policy, gps=None, dates=None, blocks=None):
+    """
+    Identifies the settings a file is scrubbed with in the index.
+
+    Args:
+        policy: CompiledPolicy; its spec's digest is part of the key, so
+            editing the policy file re-scrubs files even if its version
+            stays the same
+        gps, dates, blocks: the run's overrides, resolved against the
+            policy the same way scrub_files does. The date offset's seed
+            isn't part of the key; unseeded runs draw a new one each time.
+    """
+    gps = gps or policy.gps or GpsSettings()
+    blocks = blocks or policy.blocks or BlockSettings()
+    dates = dates or policy.time
+    return "|".join([
+        f"{policy.name}:{policy.version}:{policy.digest}",
+        f"gps={gps.mode},{gps.cell},{gps.jitter}",
+        f"time={dates.max_days},{dates.scope}" if dates else "time=off",
+        f"blocks={blocks.thumbnail},{blocks.makernote}",
+    ])
+
+
+def fingerprint(path):
+    """(size, mtime_ns) of a file as it is now."""
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+class ScrubIndex:
+    """
+    The sidecar database. Only the parent process writes to it.
+
+    Args:
+        path: SQLite file, created if missing
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # Older layout; the index is only a cache, so start over
+            self.conn.execute("DROP TABLE IF EXISTS scrubbed")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def is_current(self, src_path, dst_path, policy):
+        """
+        True if src_path was scrubbed to dst_path with these settings and
+        neither file has gone away or (for the source) changed since.
+
+        Args:
+            policy: policy_key() of the settings about to be applied
+        """
+        try:
+            st = os.stat(src_path)
+        except OSError:
+            return False
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, policy, output FROM scrubbed WHERE path = ?",
+            (os.path.abspath(src_path),),
+        ).fetchone()
+        if row is None or row[:3] != (st.st_size, st.st_mtime_ns, policy):
+            return False
+        dst_path = os.path.abspath(dst_path)
+        if row[3] != dst_path:
+            return False  # scrubbed, but to another output
+        # The scrubbed copy must still be there (in-place runs write to the source)
+        return dst_path == os.path.abspath(src_path) or os.path.exists(dst_path)
+
+    def record_many(self, rows, policy):
+        """
+        Remember scrubbed files.
+
+        Args:
+            rows: (src_path, dst_path, (size, mtime_ns)) tuples, where the
+                fingerprint is the source's state after the run
+        """
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO scrubbed (path, size, mtime_ns, policy, output, scrubbed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (os.path.abspath(src), size, mtime_ns, policy, os.path.abspath(dst), now)
+                for src, dst, (size, mtime_ns) in rows
+            ],
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
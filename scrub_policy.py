@@ -0,0 +1,378 @@
+"""
+Declarative scrub policies.
+
+A policy is a JSON file mapping tags (or whole IFDs) to actions:
+
+    {
+        "name": "strict",
+        "version": 3,
+        "default": "keep",
+        "gps": {"mode": "snap", "cell": 0.01},
+        "time": {"max_days": 365, "scope": "album"},
+        "thumbnail": "regenerate",
+        "makernote": "strip",
+        "rules": [
+            {"tag": "Make", "action": "randomize"},
+            {"tag": "DateTimeOriginal", "ifd": "Exif", "action": "shift-time", "max_days": 365},
+            {"tag": "BodySerialNumber", "ifd": "Exif", "action": "hash", "salt": "..."},
+            {"tag": "Artist", "action": "constant", "value": "", "always": true},
+            {"ifd": "Interop", "action": "drop"}
+        ]
+    }
+
+Actions: keep, drop, randomize (from one metadata.db camera profile for
+Make/Model/Software, LensMake/LensModel and the focal plane resolution,
+a random timestamp for date tags, a random string otherwise), shift-time,
+hash and constant. "time" shifts every date of a batch (or album) by
+one shared offset, see time_shift. "thumbnail" (keep/strip/regenerate)
+and "makernote" (keep/strip) pick what happens to those blocks. Rules only touch tags that are present unless they
+set "always". Each policy is compiled once into a tag id -> handler
+table per IFD, so applying it costs one dict lookup per tag.
+"""
+import hashlib
+import json
+import os
+import random
+import string
+
+from PIL.ExifTags import GPSTAGS, TAGS
+from PIL.TiffImagePlugin import IFDRational
+
+from exif_blocks import BlockSettings
+from gps_obfuscation import GpsSettings
+from metadata_session import REMOVED, SUB_IFD_POINTERS
+from time_shift import TimeSettings, shift_datetime
+
+ACTIONS = ("keep", "drop", "randomize", "shift-time", "hash", "constant")
+IFDS = ("IFD0", "Exif", "GPS", "Interop")
+
+# Date/time tags (IFD0 DateTime, Exif DateTimeOriginal / DateTimeDigitized)
+DATETIME_TAGS = {306, 36867, 36868}
+# Tags filled in from the image's camera profile
+RANDOM_SOURCES = {
+    271: "make", 272: "model", 305: "software",
+    0xA433: "lens_make", 0xA434: "lens_model",
+}
+FOCAL_PLANE_TAGS = {0xA20E: "x", 0xA20F: "y", 0xA210: "unit"}
+
+# Never touched by an IFD-wide default: sub-IFD pointers and the TIFF
+# structure tags that TIFF files need to find their pixels
+PROTECTED_TAGS = {
+    34665, 34853, 40965,  # Exif / GPS / Interop pointers
+    256, 257, 258, 259, 262, 273, 277, 278, 279, 284, 322, 323, 324, 325, 330,
+}
+
+# What Randomize does: rewrite the common tags if present and move every
+# date by one shared offset (instead of a new random DateTime per image)
+DEFAULT_POLICY = {
+    "name": "default",
+    "version": 3,
+    "default": "keep",
+    "time": {"max_days": 365},
+    "rules": [
+        {"tag": "Make", "action": "randomize"},
+        {"tag": "Model", "action": "randomize"},
+        {"tag": "Software", "action": "randomize"},
+        {"tag": "LensMake", "ifd": "Exif", "action": "randomize"},
+        {"tag": "LensModel", "ifd": "Exif", "action": "randomize"},
+        {"tag": "FocalPlaneXResolution", "ifd": "Exif", "action": "randomize"},
+        {"tag": "FocalPlaneYResolution", "ifd": "Exif", "action": "randomize"},
+        {"tag": "FocalPlaneResolutionUnit", "ifd": "Exif", "action": "randomize"},
+        {"tag": "Artist", "action": "randomize"},
+        {"tag": "Copyright", "action": "randomize"},
+    ],
+}
+
+
+class PolicyError(Exception):
+    """Raised for policy files that can't be compiled."""
+
+
+def random_datetime(rng=random):
+    """Random EXIF-formatted timestamp ("YYYY:MM:DD HH:MM:SS")."""
+    year = rng.randint(2000, 2025)
+    month = rng.randint(1, 12)
+    day = rng.randint(1, 28)
+    hour = rng.randint(0, 23)
+    minute = rng.randint(0, 59)
+    second = rng.randint(0, 59)
+    return f"{year}:{month:02d}:{day:02d} {hour:02d}:{minute:02d}:{second:02d}"
+
+
+def random_string(rng=random, k=10):
+    return ''.join(rng.choices(string.ascii_letters + string.digits, k=k))
+
+
+class ScrubContext:
+    """
+    Per-image state shared by the handlers of one policy run.
+
+    The camera profile is drawn once so Make, Model, Software and the
+    lens always belong together, and the
+    shift-time offset is drawn once so every date in the image moves
+    by the same amount.
+    """
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.rng = provider.rng
+        self._profile = None
+        self._drawn = False
+        self.time_offsets = {}
+
+    @property
+    def profile(self):
+        """The image's value_provider.Profile (None if the database has none)."""
+        if not self._drawn:
+            self._profile = self.provider.random_profile()
+            self._drawn = True
+        return self._profile
+
+    def time_offset(self, max_seconds):
+        if max_seconds not in self.time_offsets:
+            self.time_offsets[max_seconds] = self.rng.randint(-max_seconds, max_seconds)
+        return self.time_offsets[max_seconds]
+
+
+# -- handlers: (value, ctx) -> new value (REMOVED deletes the tag) --------
+
+def _drop(value, ctx):
+    return REMOVED
+
+
+def _make_randomize(tag_id):
+    source = RANDOM_SOURCES.get(tag_id)
+    if source is not None:
+        return lambda value, ctx: (getattr(ctx.profile, source) if ctx.profile else None) or "Unknown"
+    if tag_id in FOCAL_PLANE_TAGS:
+        return _make_focal_plane(FOCAL_PLANE_TAGS[tag_id])
+    if tag_id in DATETIME_TAGS:
+        return lambda value, ctx: random_datetime(ctx.rng)
+
+    def randomize(value, ctx):
+        if isinstance(value, bytes):
+            return random_string(ctx.rng).encode("ascii")
+        if value is None or isinstance(value, str):
+            return random_string(ctx.rng)
+        return value  # numbers and rationals have no sensible random stand-in
+    return randomize
+
+
+def _make_focal_plane(axis):
+    """FocalPlaneX/YResolution (pixels per cm) and the unit, from the profile's sensor size."""
+    def focal_plane(value, ctx):
+        profile = ctx.profile
+        if not profile or not profile.sensor_width_mm or not profile.sensor_height_mm:
+            return value
+        if axis == "unit":
+            return 3  # centimeters
+        pixels, mm = (profile.width, profile.sensor_width_mm) if axis == "x" else (profile.height, profile.sensor_height_mm)
+        return IFDRational(round(pixels * 10000 / mm), 1000)
+    return focal_plane
+
+
+def _make_shift_time(rule):
+    if "seconds" in rule:
+        fixed = int(rule["seconds"])
+        offset_for = lambda ctx: fixed
+    else:
+        max_seconds = int(rule.get("max_seconds", int(rule.get("max_days", 365)) * 86400))
+        offset_for = lambda ctx: ctx.time_offset(max_seconds)
+
+    def shift(value, ctx):
+        if not isinstance(value, str):
+            return value
+        shifted = shift_datetime(value.strip(), offset_for(ctx))
+        return value if shifted is None else shifted  # blank or malformed dates are left alone
+    return shift
+
+
+def _make_hash(rule):
+    salt = str(rule.get("salt", "")).encode("utf-8")
+    length = int(rule.get("length", 16))
+
+    def hash_value(value, ctx):
+        if isinstance(value, str):
+            return hashlib.sha256(salt + value.encode("utf-8")).hexdigest()[:length]
+        if isinstance(value, bytes):
+            return hashlib.sha256(salt + value).hexdigest()[:length].encode("ascii")
+        return value
+    return hash_value
+
+
+def _make_constant(rule):
+    if "value" not in rule:
+        raise PolicyError(f"constant rule needs a value: {rule}")
+    constant = rule["value"]
+    return lambda value, ctx: constant
+
+
+def _compile_handler(rule, tag_id):
+    action = rule["action"]
+    if action == "keep":
+        return None
+    if action == "drop":
+        return _drop
+    if action == "randomize":
+        return _make_randomize(tag_id)
+    if action == "shift-time":
+        return _make_shift_time(rule)
+    if action == "hash":
+        return _make_hash(rule)
+    return _make_constant(rule)
+
+
+_TAG_IDS = {
+    "IFD0": {name: tag for tag, name in TAGS.items()},
+    "Exif": {name: tag for tag, name in TAGS.items()},
+    "Interop": {name: tag for tag, name in TAGS.items()},
+    "GPS": {name: tag for tag, name in GPSTAGS.items()},
+}
+
+
+def _resolve_tag(tag, ifd):
+    if isinstance(tag, int):
+        return tag
+    if isinstance(tag, str) and tag.isdigit():
+        return int(tag)
+    tag_id = _TAG_IDS[ifd].get(tag)
+    if tag_id is None:
+        raise PolicyError(f"Unknown tag {tag!r} in {ifd}")
+    return tag_id
+
+
+class CompiledPolicy:
+    """
+    A policy turned into lookup tables.
+
+    Attributes:
+        tables: IFD name -> {tag_id: handler}; None handlers mean keep
+        rules: IFD name -> {tag_id: rule}, the rule dicts behind tables
+        defaults: IFD name -> handler for tags without a rule
+        dropped_ifds: sub-IFDs removed entirely
+        always: IFD name -> [(tag_id, handler)] applied even if the tag is missing
+        gps: GpsSettings from the policy, or None
+        blocks: BlockSettings (thumbnail / MakerNote) from the policy, or None
+        time: TimeSettings from the policy, or None
+        digest: short hash of the spec, so edits show even without a
+            version bump
+    """
+
+    def __init__(self, spec):
+        self.name = spec.get("name", "unnamed")
+        self.version = spec.get("version", 1)
+        canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"), default=repr)
+        self.digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+        self.tables = {ifd: {} for ifd in IFDS}
+        self.rules = {ifd: {} for ifd in IFDS}
+        self.defaults = {}
+        self.dropped_ifds = set()
+        self.always = {ifd: [] for ifd in IFDS}
+        self.gps = None
+        if "gps" in spec:
+            try:
+                self.gps = GpsSettings(**spec["gps"])
+            except (TypeError, ValueError) as e:
+                raise PolicyError(f"gps: {e}") from e
+        self.time = None
+        if "time" in spec:
+            try:
+                self.time = TimeSettings(**spec["time"])
+            except (TypeError, ValueError) as e:
+                raise PolicyError(f"bad time settings: {e}") from e
+        self.blocks = None
+        if "thumbnail" in spec or "makernote" in spec:
+            try:
+                self.blocks = BlockSettings(spec.get("thumbnail", "strip"), spec.get("makernote", "keep"))
+            except ValueError as e:
+                raise PolicyError(str(e)) from e
+
+        default = spec.get("default", "keep")
+        if default not in ("keep", "drop"):
+            raise PolicyError(f"default must be keep or drop, not {default!r}")
+        for ifd in IFDS:
+            self.defaults[ifd] = _drop if default == "drop" else None
+
+        for rule in spec.get("rules", []):
+            action = rule.get("action")
+            if action not in ACTIONS:
+                raise PolicyError(f"Unknown action {action!r} in rule {rule}")
+            ifd = rule.get("ifd", "IFD0")
+            if ifd not in IFDS:
+                raise PolicyError(f"Unknown IFD {ifd!r} in rule {rule}")
+
+            if "tag" not in rule:
+                # Whole-IFD rule
+                if action == "drop":
+                    if ifd == "IFD0":
+                        raise PolicyError("IFD0 can't be dropped")
+                    self.dropped_ifds.add(ifd)
+                elif action == "keep":
+                    self.defaults[ifd] = None
+                else:
+                    raise PolicyError(f"Whole-IFD rules can only keep or drop: {rule}")
+                continue
+
+            tag_id = _resolve_tag(rule["tag"], ifd)
+            try:
+                handler = _compile_handler(rule, tag_id)
+            except (TypeError, ValueError) as e:
+                raise PolicyError(f"Bad parameter in rule {rule}: {e}") from e
+            self.tables[ifd][tag_id] = handler
+            self.rules[ifd][tag_id] = rule
+            if rule.get("always") and handler is not None:
+                self.always[ifd].append((tag_id, handler))
+
+    def apply(self, document, ctx):
+        """Record the policy's changes as edits on an ImageDocument."""
+        for ifd in IFDS:
+            if ifd in self.dropped_ifds:
+                pointer = SUB_IFD_POINTERS[ifd]
+                document.remove(pointer, "Exif" if ifd == "Interop" else "IFD0")
+                continue
+
+            table = self.tables[ifd]
+            default = self.defaults[ifd]
+            values = document.values(ifd)
+            changes = {}
+            for tag_id, value in values.items():
+                handler = table.get(tag_id, default)
+                if handler is None or (handler is default and tag_id in PROTECTED_TAGS):
+                    continue
+                new_value = handler(value, ctx)
+                if new_value is not value:
+                    changes[tag_id] = new_value
+            for tag_id, handler in self.always[ifd]:
+                if tag_id not in values:
+                    changes[tag_id] = handler(None, ctx)
+            if changes:
+                document.update(changes, ifd)
+
+
+_compiled = {}
+
+
+def load_policy(path=None):
+    """
+    Compiled policy from a JSON file (None = the built-in default).
+
+    Compiled policies are cached by path and mtime, so a worker compiles
+    each policy once no matter how many files it scrubs.
+    """
+    if path is None:
+        key = None
+    else:
+        path = os.path.abspath(path)
+        key = (path, os.stat(path).st_mtime_ns)
+    policy = _compiled.get(key)
+    if policy is None:
+        if path is None:
+            spec = DEFAULT_POLICY
+        else:
+            with open(path, "r", encoding="utf-8") as fp:
+                try:
+                    spec = json.load(fp)
+                except ValueError as e:
+                    raise PolicyError(f"{path}: {e}") from e
+        policy = _compiled[key] = CompiledPolicy(spec)
+    return policy
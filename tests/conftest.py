@@ -0,0 +1,24 @@
+import os
+import sys
+
+from PIL import Image
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_image(path, fmt="JPEG", ifd0=None, gps=None, exif_ifd=None, size=(48, 32)):
+    """Write a small patterned image with the given EXIF tags and return its path as str."""
+    width, height = size
+    img = Image.new("RGB", size)
+    img.putdata([(x * 5 % 256, y * 7 % 256, (x ^ y) % 256) for y in range(height) for x in range(width)])
+    exif = Image.Exif()
+    for tag, value in (ifd0 or {}).items():
+        exif[tag] = value
+    if gps:
+        exif.get_ifd(0x8825).update(gps)
+    if exif_ifd:
+        exif.get_ifd(0x8769).update(exif_ifd)
+    options = {"lossless": True} if fmt == "WEBP" else {}
+    img.save(path, format=fmt, exif=exif, **options)
+    return str(path)
@@ -0,0 +1,107 @@
+import os
+
+import batch
+from batch import input_root, iter_input_files, main, output_path_for, run_batch
+from conftest import make_image
+from exif_reader import read_exif
+from scrub_index import ScrubIndex
+
+
+def _die(*args):
+    os._exit(1)  # a worker crashing, e.g. killed by the OOM killer
+
+
+def _images(directory, count=3):
+    directory.mkdir(parents=True, exist_ok=True)
+    return [make_image(directory / f"{i}.jpg", "JPEG", {271: "Make", 305: "Software"}) for i in range(count)]
+
+
+def test_output_dir_is_skipped_but_not_its_namesakes(tmp_path):
+    _images(tmp_path / "out", 1)
+    kept = _images(tmp_path / "out_raw", 1)
+
+    found = [path for path, _ in iter_input_files([str(tmp_path)], exclude_dir=str(tmp_path / "out"))]
+
+    assert found == kept
+
+
+def test_output_path_keeps_the_tree_layout(tmp_path):
+    src = os.path.join("in", "a", "b.jpg")
+    assert output_path_for(src, "in", "out") == os.path.join("out", "a", "b_modified.jpg")
+    assert output_path_for(src, "in", None, "_x") == os.path.join("in", "a", "b_x.jpg")
+
+
+def test_run_batch_scrubs_and_indexes(tmp_path):
+    sources = _images(tmp_path / "in")
+    jobs = [(src, str(tmp_path / "out" / os.path.basename(src))) for src in sources]
+    index = ScrubIndex(str(tmp_path / "index.sqlite"))
+
+    stats = run_batch(jobs, workers=1, chunk_size=2, seed="s", index=index, verify=True)
+    again = run_batch(jobs, workers=1, seed="s", index=index)
+    index.close()
+
+    assert (stats.ok, stats.failed, stats.verify_failed) == (3, 0, 0)
+    assert (again.ok, again.skipped) == (0, 3)
+    for _, dst in jobs:
+        assert read_exif(dst).values()[271] != "Make"
+
+
+def test_dead_worker_ends_with_a_summary(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(batch, "_scrub_task", _die)
+    _images(tmp_path / "in", 5)
+
+    code = main([str(tmp_path / "in"), "-o", str(tmp_path / "out"), "-j", "1", "--chunk-size", "1",
+                 "--max-in-flight", "1"])
+
+    assert code == 1
+    assert "0 scrubbed, 5 failed" in capsys.readouterr().out
+
+
+def test_earlier_outputs_are_not_inputs(tmp_path):
+    originals = _images(tmp_path, 2)
+    make_image(tmp_path / "0_modified.jpg", "JPEG")
+    (tmp_path / "out").mkdir()
+    make_image(tmp_path / "out" / "9.jpg", "JPEG")
+
+    def found(patterns, **kwargs):
+        return [path for path, _ in iter_input_files(patterns, **kwargs)]
+
+    out = str(tmp_path / "out")
+    assert found([str(tmp_path)], exclude_dir=out, skip_suffix="_modified") == originals
+    assert found([str(tmp_path / "*.jpg")], skip_suffix="_modified") == originals
+    assert found([str(tmp_path / "**" / "*.jpg")], exclude_dir=out) == sorted(
+        originals + [str(tmp_path / "0_modified.jpg")])
+    # Named explicitly, it's still an input
+    assert found([str(tmp_path / "0_modified.jpg")], skip_suffix="_modified") == [str(tmp_path / "0_modified.jpg")]
+
+
+def test_rerun_next_to_originals_doesnt_rescrub_outputs(tmp_path, capsys):
+    _images(tmp_path, 2)
+    pattern = str(tmp_path / "*.jpg")
+
+    assert main([pattern, "-j", "1", "--seed", "s"]) == 0
+    assert main([pattern, "-j", "1", "--seed", "s"]) == 0
+
+    assert sorted(os.listdir(tmp_path)) == ["0.jpg", "0_modified.jpg", "1.jpg", "1_modified.jpg"]
+
+
+def _scrubbed_values(tmp_path, tree, names):
+    """IFD0 of each scrubbed copy from a seeded run over tree."""
+    jobs = [(str(tree / name), str(tmp_path / "out" / tree.name / name)) for name in names]
+    run_batch(jobs, workers=1, seed="s", root=input_root([str(tree)]))
+    return [read_exif(dst).values() for _, dst in jobs]
+
+
+def test_seeded_values_follow_the_relative_path(tmp_path):
+    names = [os.path.join("a", "IMG.jpg"), os.path.join("b", "IMG.jpg")]
+    for tree in ("one", "two"):
+        for name in names:
+            (tmp_path / tree / name).parent.mkdir(parents=True, exist_ok=True)
+            make_image(tmp_path / tree / name, "JPEG", {271: "Make", 305: "Software", 315: "Someone"})
+
+    one = _scrubbed_values(tmp_path, tmp_path / "one", names)
+    two = _scrubbed_values(tmp_path, tmp_path / "two", names)
+
+    # Same-named files aren't linkable, and a moved tree gets the same values
+    assert one[0] != one[1]
+    assert one == two
@@ -0,0 +1,88 @@
+import io
+import os
+import shutil
+
+import pytest
+from PIL import Image
+
+from exif_blocks import MAKERNOTE, BlockSettings, build_payload, extract_thumbnail, patch_blocks_in_place
+from exif_patch import PatchError
+from exif_reader import parse_tiff_payload, read_exif
+from metadata_session import ImageDocument
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Has an IFD1 thumbnail and a MakerNote
+SAMPLE = os.path.join(ROOT, "Image Tests (MetaData)", "Nikon_COOLPIX_P1.jpg")
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "sample.jpg"
+    shutil.copy(SAMPLE, path)
+    document = ImageDocument(str(path))
+    assert document.tree.thumbnail_range is not None and MAKERNOTE in document.tree.ifds["Exif"]
+    return document
+
+
+def _makernote(tree):
+    entry = tree.ifds["Exif"].get(MAKERNOTE)
+    return None if entry is None else (entry.value_offset, tree.payload[entry.value_offset:entry.value_offset + entry.size])
+
+
+def test_strip_drops_the_thumbnail_and_keeps_the_makernote(document):
+    document.update({306: "2001:01:01 00:00:00"})
+
+    payload = build_payload(document, BlockSettings("strip", "keep"))
+
+    tree = parse_tiff_payload(payload)
+    assert "IFD1" not in tree.ifd_offsets and extract_thumbnail(tree) is None
+    assert extract_thumbnail(document.tree) not in payload
+    # Same-length edits are patched into the old payload, so the MakerNote doesn't move
+    assert _makernote(tree) == _makernote(document.tree)
+    assert tree.values()[306] == "2001:01:01 00:00:00"
+
+
+def test_keep_carries_the_thumbnail_over(document):
+    document.update({271: "A camera make longer than the original one"})
+
+    tree = parse_tiff_payload(build_payload(document, BlockSettings("keep")))
+
+    assert extract_thumbnail(tree) == extract_thumbnail(document.tree)
+    assert tree.values()[271] == "A camera make longer than the original one"
+
+
+def test_regenerate_makes_a_new_thumbnail(document):
+    tree = parse_tiff_payload(build_payload(document, BlockSettings("regenerate")))
+
+    thumbnail = extract_thumbnail(tree)
+    assert thumbnail and thumbnail != extract_thumbnail(document.tree)
+    with Image.open(io.BytesIO(thumbnail)) as img:
+        assert img.format == "JPEG" and max(img.size) <= 160
+
+
+def test_strip_makernote(document):
+    tree = parse_tiff_payload(build_payload(document, BlockSettings("strip", "strip")))
+
+    assert MAKERNOTE not in tree.ifds["Exif"]
+
+
+def test_thumbnail_is_stripped_in_place(document):
+    size = os.path.getsize(document.path)
+    old_thumbnail = extract_thumbnail(document.tree)
+
+    patch_blocks_in_place(document, BlockSettings("strip"), fsync=False)
+
+    assert os.path.getsize(document.path) == size
+    with open(document.path, "rb") as fp:
+        assert old_thumbnail not in fp.read()
+    assert read_exif(document.path).thumbnail_range is None
+
+
+def test_makernote_strip_is_not_done_in_place(document):
+    with open(document.path, "rb") as fp:
+        before = fp.read()
+
+    with pytest.raises(PatchError):
+        patch_blocks_in_place(document, BlockSettings("strip", "strip"), fsync=False)
+    with open(document.path, "rb") as fp:
+        assert fp.read() == before
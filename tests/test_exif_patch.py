@@ -0,0 +1,89 @@
+import os
+
+import pytest
+from PIL import Image
+
+from conftest import make_image
+from exif_patch import BACKUP_SUFFIX, PatchError, patch_in_place, restore_backup
+from exif_reader import read_exif
+from metadata_session import ImageDocument
+from verify import payload_digest
+
+CONTAINERS = [(".jpg", "JPEG"), (".png", "PNG"), (".tif", "TIFF")]
+TAGS = {271: "OriginalMake", 305: "Software 1.0", 306: "2020:01:01 12:00:00"}
+
+
+def _read(path):
+    with open(path, "rb") as fp:
+        return fp.read()
+
+
+def _digest(path):
+    with open(path, "rb") as fp:
+        return payload_digest(fp)[0]
+
+
+@pytest.mark.parametrize("ext, fmt", CONTAINERS)
+def test_same_length_edits_patch_in_place(tmp_path, ext, fmt):
+    path = make_image(tmp_path / f"a{ext}", fmt, TAGS)
+    size, digest = os.path.getsize(path), _digest(path)
+    document = ImageDocument(path)
+    # A date keeps its length, a shorter Make fits its slot, a 2-char one moves into the entry
+    document.update({306: "2021:06:30 08:15:00", 271: "Short", 305: "ab"})
+
+    written = patch_in_place(document, fsync=False)
+
+    assert 0 < written < 100
+    assert os.path.getsize(path) == size
+    assert _digest(path) == digest
+    values = read_exif(path).values()
+    assert (values[306], values[271], values[305]) == ("2021:06:30 08:15:00", "Short", "ab")
+    with Image.open(path) as img:  # a PNG's eXIf CRC has to match again
+        img.load()
+        assert img.getexif()[271] == "Short"
+
+
+def test_longer_value_is_refused_untouched(tmp_path):
+    path = make_image(tmp_path / "a.jpg", "JPEG", TAGS)
+    before = _read(path)
+    document = ImageDocument(path)
+    document.update({271: "A much longer camera make"})
+
+    with pytest.raises(PatchError):
+        patch_in_place(document, fsync=False)
+    assert _read(path) == before
+
+
+def test_added_tag_is_refused(tmp_path):
+    path = make_image(tmp_path / "a.jpg", "JPEG", TAGS)
+    document = ImageDocument(path)
+    document.update({315: "Artist"})
+
+    with pytest.raises(PatchError):
+        patch_in_place(document, fsync=False)
+
+
+def test_changed_file_is_refused(tmp_path):
+    path = make_image(tmp_path / "a.jpg", "JPEG", TAGS)
+    document = ImageDocument(path)
+    document.update({271: "Short"})
+    with open(path, "ab") as fp:
+        fp.write(b"\0")
+
+    with pytest.raises(PatchError):
+        patch_in_place(document, fsync=False)
+
+
+@pytest.mark.parametrize("ext, fmt", CONTAINERS)
+def test_backup_restores_the_original_bytes(tmp_path, ext, fmt):
+    path = make_image(tmp_path / f"a{ext}", fmt, TAGS)
+    before = _read(path)
+    document = ImageDocument(path)
+    document.update({306: "2021:06:30 08:15:00", 271: "ab"})
+
+    patch_in_place(document, fsync=False, backup=True)
+    assert _read(path) != before
+    restore_backup(path, fsync=False)
+
+    assert _read(path) == before
+    assert not os.path.exists(path + BACKUP_SUFFIX)
@@ -0,0 +1,93 @@
+import glob
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from conftest import make_image
+from exif_reader import EXIF_HEADER, parse_tiff_payload, read_exif, read_exif_from_file, sniff_container
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES = sorted(glob.glob(os.path.join(ROOT, "Image Tests (MetaData)", "*.jpg")))
+CONTAINERS = [(".jpg", "JPEG"), (".png", "PNG"), (".webp", "WEBP"), (".tif", "TIFF")]
+
+
+class CountingReader(io.BytesIO):
+    """BytesIO that counts the bytes read through it."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.read_bytes = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.read_bytes += len(data)
+        return data
+
+
+@pytest.mark.parametrize("path", SAMPLES, ids=os.path.basename)
+def test_matches_pillow(path):
+    tree = read_exif(path)
+    with Image.open(path) as img:
+        exif = img.getexif()
+    if not exif:
+        assert not tree
+        return
+    for tag in (271, 272, 306):
+        if tag in exif:
+            # Pillow keeps whatever follows the NUL terminator
+            assert tree.values()[tag] == exif[tag].split("\x00")[0]
+    sub = exif.get_ifd(0x8769)
+    for tag in (36867, 33434):
+        if tag in sub:
+            assert tree.values("Exif")[tag] == sub[tag]
+
+
+@pytest.mark.parametrize("ext, fmt", CONTAINERS)
+def test_every_container(tmp_path, ext, fmt):
+    path = make_image(tmp_path / f"a{ext}", fmt, {271: "Make", 305: "Software"},
+                      exif_ifd={36867: "2020:01:01 00:00:00"})
+
+    tree = read_exif(path)
+
+    assert tree.container == sniff_container(open(path, "rb").read(12))
+    assert (tree.values()[271], tree.values()[305]) == ("Make", "Software")
+    if fmt != "TIFF":  # Pillow doesn't write the Exif IFD into TIFFs
+        assert tree.values("Exif")[36867] == "2020:01:01 00:00:00"
+
+
+def test_reads_only_the_metadata(tmp_path):
+    path = make_image(tmp_path / "big.jpg", "JPEG", {271: "Make"}, size=(1024, 1024))
+    with open(path, "rb") as fp:
+        data = fp.read()
+    fp = CountingReader(data)
+
+    assert read_exif_from_file(fp).values()[271] == "Make"
+    assert fp.read_bytes < 1024 < len(data) // 10
+
+
+def test_no_exif(tmp_path):
+    assert read_exif(make_image(tmp_path / "a.png", "PNG")) is None
+    assert read_exif_from_file(io.BytesIO(b"not an image at all")) is None
+
+
+def test_entry_offsets_point_at_the_values(tmp_path):
+    payload = Image.Exif()
+    payload[271] = "A longer make string"
+    raw = payload.tobytes()
+
+    tree = parse_tiff_payload(raw)
+
+    entry = tree.ifds["IFD0"][271]
+    start = entry.value_offset + len(EXIF_HEADER)  # offsets are relative to the TIFF header
+    assert raw[start:start + entry.size] == b"A longer make string\x00"
+
+
+def test_ifd_loops_terminate():
+    # IFD0 whose "next IFD" link points back at itself
+    payload = b"II*\x00\x08\x00\x00\x00" + b"\x01\x00" + b"\x0f\x01\x02\x00\x02\x00\x00\x00A\x00\x00\x00" + b"\x08\x00\x00\x00"
+
+    tree = parse_tiff_payload(payload)
+
+    assert tree.values()[271] == "A"
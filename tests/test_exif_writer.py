@@ -0,0 +1,74 @@
+import io
+
+import pytest
+from PIL import Image
+
+from conftest import make_image
+from exif_reader import read_exif, read_exif_from_file
+from exif_writer import ExifWriteError, read_jpeg_header, save_with_exif
+from verify import payload_digest
+
+CONTAINERS = [(".jpg", "JPEG"), (".png", "PNG"), (".webp", "WEBP"), (".tif", "TIFF")]
+
+
+def _payload(make):
+    exif = Image.Exif()
+    exif[271] = make
+    return exif.tobytes()
+
+
+def _digest(path):
+    with open(path, "rb") as fp:
+        return payload_digest(fp)[0]
+
+
+@pytest.mark.parametrize("ext, fmt", CONTAINERS)
+def test_splice_keeps_image_data(tmp_path, ext, fmt):
+    src = make_image(tmp_path / f"src{ext}", fmt, {271: "OldMake", 305: "OldSoftware"})
+    dst = str(tmp_path / f"dst{ext}")
+
+    assert save_with_exif(src, dst, _payload("NewMake")) is True
+
+    with Image.open(src) as before, Image.open(dst) as after:
+        assert before.tobytes() == after.tobytes()
+    assert _digest(src) == _digest(dst)
+    values = read_exif(dst).values()
+    assert values[271] == "NewMake"
+    assert 305 not in values
+
+
+@pytest.mark.parametrize("ext, fmt", CONTAINERS)
+def test_splice_from_memory_matches_file(tmp_path, ext, fmt):
+    src = make_image(tmp_path / f"src{ext}", fmt, {271: "OldMake"})
+    from_file, from_memory = str(tmp_path / f"a{ext}"), str(tmp_path / f"b{ext}")
+    with open(src, "rb") as fp:
+        data = fp.read()
+
+    save_with_exif(src, from_file, _payload("NewMake"))
+    save_with_exif(src, from_memory, _payload("NewMake"), data=data)
+
+    with open(from_file, "rb") as a, open(from_memory, "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_format_change_needs_reencode(tmp_path):
+    src = make_image(tmp_path / "src.png", "PNG", {271: "OldMake"})
+    dst = str(tmp_path / "dst.jpg")
+
+    with pytest.raises(ExifWriteError):
+        save_with_exif(src, dst, _payload("NewMake"))
+    assert not (tmp_path / "dst.jpg").exists()
+
+    assert save_with_exif(src, dst, _payload("NewMake"), reencode=True) is False
+    assert read_exif(dst).values()[271] == "NewMake"
+
+
+def test_exif_found_after_fill_bytes(tmp_path):
+    src = make_image(tmp_path / "src.jpg", "JPEG", {271: "OldMake"})
+    with open(src, "rb") as fp:
+        data = fp.read()
+    fp = io.BytesIO(data)
+    segments = read_jpeg_header(fp)
+    padded = b"\xff\xd8" + b"".join(b"\xff\xff" + segment[1:] for _, segment in segments) + data[fp.tell():]
+
+    assert read_exif_from_file(io.BytesIO(padded)).values()[271] == "OldMake"
@@ -0,0 +1,66 @@
+import csv
+import json
+import os
+
+from PIL.TiffImagePlugin import IFDRational
+
+import export
+from conftest import make_image
+from export import main
+
+GPS = {1: "N", 2: (IFDRational(48, 1), IFDRational(51, 1), IFDRational(0, 1)),
+       3: "E", 4: (IFDRational(2, 1), IFDRational(17, 1), IFDRational(0, 1))}
+
+
+def _die(*args):
+    os._exit(1)  # a worker crashing, e.g. killed by the OOM killer
+
+
+def _images(directory, count=4):
+    directory.mkdir()
+    return [
+        make_image(directory / f"{i}.jpg", "JPEG", {271: "Make", 315: "Someone"}, gps=GPS if i % 2 else None)
+        for i in range(count)
+    ]
+
+
+def _rows(path):
+    with open(path, encoding="utf-8") as fp:
+        return [json.loads(line) for line in fp]
+
+
+def test_export_flags_what_leaks(tmp_path):
+    paths = _images(tmp_path / "in")
+    out = tmp_path / "inventory.jsonl"
+
+    assert main([str(tmp_path / "in"), "-o", str(out), "-j", "1", "--chunk-size", "3"]) == 0
+
+    rows = _rows(out)
+    assert [row["path"] for row in rows] == paths
+    assert [row["gps"] for row in rows] == [False, True, False, True]
+    assert all(row["owner"] and row["Make"] == "Make" and "error" not in row for row in rows)
+    assert rows[1]["latitude"] == 48.85
+
+
+def test_csv_has_every_column(tmp_path):
+    _images(tmp_path / "in", 1)
+    out = tmp_path / "inventory.csv"
+
+    main([str(tmp_path / "in"), "-o", str(out), "-j", "1"])
+
+    with open(out, newline="", encoding="utf-8") as fp:
+        reader = csv.DictReader(fp)
+        assert reader.fieldnames == export.COLUMNS
+        assert len(list(reader)) == 1
+
+
+def test_dead_worker_gives_error_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "_export_task", _die)
+    paths = _images(tmp_path / "in", 5)
+    out = tmp_path / "inventory.jsonl"
+
+    main([str(tmp_path / "in"), "-o", str(out), "-j", "1", "--chunk-size", "1"])
+
+    rows = _rows(out)
+    assert [row["path"] for row in rows] == paths
+    assert all("error" in row for row in rows)
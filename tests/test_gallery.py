@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+
+from PyQt5.QtCore import Qt  # noqa: E402
+from PyQt5.QtGui import QImage  # noqa: E402
+
+from conftest import make_image  # noqa: E402
+from gallery import ThumbnailModel  # noqa: E402
+from thumbnail_cache import HAS_GPS, ThumbnailCache  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def test_refresh_drops_stale_thumbnails(app, tmp_path):
+    folder = tmp_path / "photos"
+    folder.mkdir()
+    path = make_image(folder / "a.jpg", "JPEG", {271: "Make"})
+    model = ThumbnailModel(ThumbnailCache(str(tmp_path / "cache")))
+    model.set_folder(str(folder))
+    model._on_loaded(model.generation, path, QImage(), HAS_GPS)
+    assert "GPS" in model.data(model.index(0), Qt.ToolTipRole)
+
+    # e.g. the file was scrubbed in place, then the gallery refreshed
+    model.set_folder(str(folder))
+
+    assert path not in model._pixmaps
+    assert "GPS" not in model.data(model.index(0), Qt.ToolTipRole)
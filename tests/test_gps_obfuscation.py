@@ -0,0 +1,75 @@
+import pytest
+from PIL.TiffImagePlugin import IFDRational
+
+from conftest import make_image
+from exif_blocks import build_payload
+from exif_reader import parse_tiff_payload
+from gps_obfuscation import (DEST_TAGS, GPS_IFD_POINTER, GpsSettings, apply_gps, degrees_to_dms,
+                             dms_to_degrees, read_coordinates)
+from metadata_session import ImageDocument
+
+HUNDREDTH_SECOND = 1 / 360000
+
+
+def _dms(d, m, s):
+    return IFDRational(d, 1), IFDRational(m, 1), IFDRational(round(s * 100), 100)
+
+
+@pytest.mark.parametrize("value", [10.99999999, 59.9999999, -0.99999999, 179.999999999])
+def test_degrees_to_dms_carries_rounded_seconds(value):
+    (d, m, s), _ = degrees_to_dms(value, "N", "S")
+    assert 0 <= float(m) < 60 and 0 <= float(s) < 60
+    assert float(d) == round(abs(value))
+    assert float(m) == float(s) == 0
+
+
+@pytest.mark.parametrize("value", [0.0, 0.0001, 48.858222, -33.8688, 151.2093, -122.4194, 89.9999])
+def test_dms_roundtrip(value):
+    dms, ref = degrees_to_dms(value, "E", "W")
+    assert abs(dms_to_degrees(dms, ref) - value) <= HUNDREDTH_SECOND / 2 + 1e-12
+
+
+def test_dms_to_degrees_refs():
+    dms = _dms(10, 30, 0)
+    assert dms_to_degrees(dms, "N") == 10.5
+    assert dms_to_degrees(dms, "S") == -10.5
+    assert dms_to_degrees(dms, b"W\x00") == -10.5
+    with pytest.raises(ValueError):
+        dms_to_degrees((1, 2), "N")
+
+
+def _gps_document(tmp_path):
+    gps = {
+        1: "N", 2: _dms(48, 51, 29.6), 3: "E", 4: _dms(2, 17, 40),
+        19: "N", 20: _dms(40, 41, 21), 21: "W", 22: _dms(74, 2, 40),
+    }
+    return ImageDocument(make_image(tmp_path / "gps.jpg", "JPEG", {271: "Make"}, gps=gps))
+
+
+def test_snap_moves_position_and_destination(tmp_path):
+    document = _gps_document(tmp_path)
+    settings = GpsSettings("snap", cell=0.01)
+
+    assert apply_gps([document], settings) == 1
+
+    gps = document.values("GPS")
+    lat, lon = read_coordinates(gps)
+    dest_lat, dest_lon = read_coordinates(gps, DEST_TAGS)
+    assert (lat, lon) == pytest.approx((48.855, 2.295), abs=HUNDREDTH_SECOND)
+    assert (dest_lat, dest_lon) == pytest.approx((40.685, -74.045), abs=HUNDREDTH_SECOND)
+
+
+def test_strip_removes_gps_ifd(tmp_path):
+    document = _gps_document(tmp_path)
+
+    apply_gps([document], GpsSettings("strip"))
+
+    assert GPS_IFD_POINTER not in document.values()
+    assert "GPS" not in parse_tiff_payload(build_payload(document)).ifd_offsets
+
+
+def test_bad_settings():
+    with pytest.raises(ValueError):
+        GpsSettings("nowhere")
+    with pytest.raises(ValueError):
+        GpsSettings("snap", cell=0)
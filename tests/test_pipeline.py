@@ -0,0 +1,80 @@
+import os
+import pickle
+import threading
+
+import pytest
+
+import pipeline
+from conftest import make_image
+from exif_reader import read_exif
+from pipeline import _exif_part, _parse_part, run_pipeline
+
+CONTAINERS = [(".jpg", "JPEG"), (".png", "PNG"), (".webp", "WEBP"), (".tif", "TIFF")]
+
+
+def _die(*args):
+    os._exit(1)  # a worker crashing, e.g. killed by the OOM killer
+
+
+def _jobs(tmp_path, count=3, containers=((".jpg", "JPEG"),)):
+    src_dir, out_dir = tmp_path / "in", tmp_path / "out"
+    src_dir.mkdir()
+    jobs = []
+    for i in range(count):
+        ext, fmt = containers[i % len(containers)]
+        src = make_image(src_dir / f"{i}{ext}", fmt, {271: "Make", 305: "Software"})
+        jobs.append((src, str(out_dir / f"{i}{ext}")))
+    return jobs
+
+
+def _run(jobs, **kwargs):
+    """run_pipeline in a thread, so a hang fails the test instead of stalling it."""
+    outcome = {}
+    thread = threading.Thread(
+        target=lambda: outcome.update(stats=run_pipeline(jobs, log=lambda line: None, **kwargs)),
+        daemon=True,
+    )
+    thread.start()
+    thread.join(60)
+    assert not thread.is_alive(), "pipeline hung"
+    return outcome["stats"]
+
+
+@pytest.mark.parametrize("ext, fmt", CONTAINERS)
+def test_workers_get_only_the_exif(tmp_path, ext, fmt):
+    src = make_image(tmp_path / f"a{ext}", fmt, {271: "Make", 305: "Software"}, size=(256, 256))
+    with open(src, "rb") as fp:
+        data = fp.read()
+
+    part = _exif_part(data)
+
+    assert len(pickle.dumps(part)) < len(data) / 4
+    tree, expected = _parse_part(pickle.loads(pickle.dumps(part))), read_exif(src)
+    assert (tree.container, tree.tiff_offset) == (expected.container, expected.tiff_offset)
+    assert tree.values() == expected.values()
+
+
+def test_file_without_exif_sends_nothing(tmp_path):
+    src = make_image(tmp_path / "a.png", "PNG")
+    with open(src, "rb") as fp:
+        assert _exif_part(fp.read()) is None
+
+
+def test_pipeline_scrubs_and_verifies(tmp_path):
+    jobs = _jobs(tmp_path, 8, CONTAINERS)
+
+    stats = _run(jobs, workers=1, readers=2, writers=2, chunk_size=2, seed="s", verify=True)
+
+    assert (stats.ok, stats.failed, stats.verify_failed) == (8, 0, 0)
+    for _, dst in jobs:
+        assert read_exif(dst).values()[271] != "Make"
+
+
+def test_dead_worker_fails_files_instead_of_hanging(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "_scrub_task", _die)
+    jobs = _jobs(tmp_path, 5)
+
+    stats = _run(jobs, workers=1, readers=2, writers=2, chunk_size=1)
+
+    assert (stats.ok, stats.failed) == (0, 5)
+    assert not any(os.path.exists(dst) for _, dst in jobs)
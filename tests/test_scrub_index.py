@@ -0,0 +1,84 @@
+import json
+import os
+
+import pytest
+
+from exif_blocks import BlockSettings
+from gps_obfuscation import GpsSettings
+from scrub_index import ScrubIndex, fingerprint, policy_key
+from scrub_policy import load_policy
+from time_shift import TimeSettings
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ScrubIndex(str(tmp_path / "index.sqlite"))
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def scrubbed(tmp_path, index):
+    """(src, dst, key) of a file recorded as scrubbed."""
+    src, dst = tmp_path / "a.jpg", tmp_path / "out" / "a.jpg"
+    dst.parent.mkdir()
+    src.write_bytes(b"source")
+    dst.write_bytes(b"scrubbed")
+    key = policy_key(load_policy())
+    index.record_many([(str(src), str(dst), fingerprint(str(src)))], key)
+    return str(src), str(dst), key
+
+
+def test_current_for_same_output(index, scrubbed):
+    src, dst, key = scrubbed
+    assert index.is_current(src, dst, key)
+
+
+def test_not_current_for_another_output(index, scrubbed, tmp_path):
+    src, _, key = scrubbed
+    assert not index.is_current(src, str(tmp_path / "other" / "a.jpg"), key)
+
+
+def test_not_current_when_output_is_gone(index, scrubbed):
+    src, dst, key = scrubbed
+    os.remove(dst)
+    assert not index.is_current(src, dst, key)
+
+
+def test_not_current_when_source_changed(index, scrubbed):
+    src, dst, key = scrubbed
+    with open(src, "ab") as fp:
+        fp.write(b"more")
+    assert not index.is_current(src, dst, key)
+
+
+def test_not_current_with_other_settings(index, scrubbed):
+    src, dst, _ = scrubbed
+    assert not index.is_current(src, dst, policy_key(load_policy(), gps=GpsSettings("strip")))
+
+
+def test_in_place_output_is_the_source(index, tmp_path):
+    src = tmp_path / "b.jpg"
+    src.write_bytes(b"scrubbed in place")
+    key = policy_key(load_policy())
+    index.record_many([(str(src), str(src), fingerprint(str(src)))], key)
+    assert index.is_current(str(src), str(src), key)
+
+
+def test_policy_key_covers_effective_settings():
+    policy = load_policy()
+    assert policy_key(policy) == policy_key(policy, GpsSettings(), None, BlockSettings())
+    assert policy_key(policy) != policy_key(policy, blocks=BlockSettings("keep"))
+    assert policy_key(policy) != policy_key(policy, dates=TimeSettings(30))
+    # The offset's seed changes every unseeded run; it doesn't make files stale
+    assert policy_key(policy, dates=TimeSettings(30, seed="a")) == policy_key(policy, dates=TimeSettings(30, seed="b"))
+
+
+def test_policy_key_changes_with_the_spec(tmp_path):
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps({"name": "p", "version": 1, "rules": [{"tag": "Make", "action": "drop"}]}))
+    before = policy_key(load_policy(str(path)))
+    path.write_text(json.dumps({"name": "p", "version": 1, "rules": [{"tag": "Model", "action": "drop"}]}))
+    os.utime(path, ns=(0, 1))  # same-second rewrites can keep the mtime the compile cache goes by
+
+    assert policy_key(load_policy(str(path))) != before
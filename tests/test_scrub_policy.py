@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from scrub_policy import CompiledPolicy, PolicyError, load_policy
+
+
+@pytest.mark.parametrize("spec", [
+    {"default": "randomize"},
+    {"rules": [{"tag": "Make", "action": "scramble"}]},
+    {"rules": [{"tag": "Make", "action": "drop", "ifd": "MakerNote"}]},
+    {"rules": [{"tag": "NoSuchTag", "action": "drop"}]},
+    {"rules": [{"action": "drop"}]},
+    {"rules": [{"action": "hash", "ifd": "GPS"}]},
+    {"rules": [{"tag": "Artist", "action": "constant"}]},
+    {"rules": [{"tag": "DateTime", "action": "shift-time", "seconds": "soon"}]},
+    {"rules": [{"tag": "Artist", "action": "hash", "length": "long"}]},
+    {"gps": {"mode": "blur"}},
+    {"gps": {"mode": "snap", "size": 1}},
+    {"gps": {"mode": "snap", "cell": -1}},
+    {"gps": ["snap"]},
+    {"time": {"max_days": 30, "scope": "decade"}},
+    {"time": {"days": 30}},
+    {"time": {"max_days": "365"}},
+    {"time": {"max_days": -1}},
+    {"thumbnail": "shrink"},
+    {"makernote": "encrypt"},
+])
+def test_bad_specs_raise_policy_error(spec):
+    with pytest.raises(PolicyError):
+        CompiledPolicy(dict(spec, name="bad"))
+
+
+def test_bad_json_raises_policy_error(tmp_path):
+    path = tmp_path / "policy.json"
+    path.write_text("{not json")
+    with pytest.raises(PolicyError):
+        load_policy(str(path))
+
+
+def test_valid_policy_compiles(tmp_path):
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps({
+        "name": "ok",
+        "version": 2,
+        "default": "drop",
+        "gps": {"mode": "jitter", "jitter": 100},
+        "time": {"max_days": 30, "scope": "album"},
+        "thumbnail": "regenerate",
+        "rules": [
+            {"tag": "Make", "action": "randomize"},
+            {"tag": "DateTime", "action": "shift-time", "seconds": 3600},
+            {"ifd": "GPS", "action": "drop"},
+        ],
+    }))
+    policy = load_policy(str(path))
+    assert (policy.name, policy.version) == ("ok", 2)
+    assert policy.gps.mode == "jitter" and policy.gps.jitter == 100
+    assert policy.time.scope == "album"
+    assert policy.blocks.thumbnail == "regenerate"
+    assert "GPS" in policy.dropped_ifds
@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _loaded(statement, modules):
+    """Which of modules are imported after running statement in a fresh interpreter."""
+    code = f"import sys; {statement}; print(','.join(m for m in {modules!r} if m in sys.modules))"
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return [name for name in out.stdout.strip().split(",") if name]
+
+
+def test_headless_commands_dont_load_qt():
+    assert _loaded("import main, batch, pipeline, export", ["PyQt5", "PyQt5.QtWidgets"]) == []
+
+
+def test_gui_doesnt_load_the_batch_machinery():
+    pytest.importorskip("PyQt5.QtWidgets")
+    assert _loaded("import viewer", ["batch", "verify", "scrub_index", "concurrent.futures.process"]) == []
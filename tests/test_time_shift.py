@@ -0,0 +1,77 @@
+from datetime import datetime
+
+import pytest
+from PIL.TiffImagePlugin import IFDRational
+
+from conftest import make_image
+from metadata_session import ImageDocument
+from time_shift import TimeSettings, apply_time_shift, shift_datetime, shift_gps_stamp
+
+FORMAT = "%Y:%m:%d %H:%M:%S"
+
+
+def _delta(before, after):
+    return (datetime.strptime(after, FORMAT) - datetime.strptime(before, FORMAT)).total_seconds()
+
+
+def _document(path):
+    return ImageDocument(make_image(
+        path, "JPEG", {306: "2020:01:01 12:00:00"},
+        exif_ifd={36867: "2019:12:31 23:59:30", 36868: "2019:12:31 23:59:31"},
+    ))
+
+
+def test_every_date_moves_by_the_same_offset(tmp_path):
+    first, second = _document(tmp_path / "a.jpg"), _document(tmp_path / "b.jpg")
+    settings = TimeSettings(30, "batch", seed="s")
+
+    assert apply_time_shift([first, second], settings) == 2
+
+    offset = settings.offset_for(first.path)
+    assert offset
+    for document in (first, second):
+        assert _delta("2020:01:01 12:00:00", document.values()[306]) == offset
+        assert _delta("2019:12:31 23:59:30", document.values("Exif")[36867]) == offset
+        assert _delta("2019:12:31 23:59:31", document.values("Exif")[36868]) == offset
+
+
+def test_offsets_are_shared_between_workers():
+    # Every worker process builds its own TimeSettings from the same seed
+    a, b = TimeSettings(365, "batch", seed="run"), TimeSettings(365, "batch", seed="run")
+    assert a.offset_for("/x/1.jpg") == b.offset_for("/y/2.jpg")
+    assert abs(a.offset_for("/x/1.jpg")) <= 365 * 86400
+
+
+def test_album_scope_is_per_directory():
+    settings = TimeSettings(365, "album", seed="run")
+    assert settings.offset_for("/albums/a/1.jpg") == settings.offset_for("/albums/a/2.jpg")
+    assert settings.offset_for("/albums/a/1.jpg") != settings.offset_for("/albums/b/1.jpg")
+
+
+def test_disabled_shift_leaves_dates(tmp_path):
+    document = _document(tmp_path / "a.jpg")
+    assert apply_time_shift([document], TimeSettings(0)) == 0
+    assert not document.has_edits
+
+
+def test_shift_datetime():
+    assert shift_datetime("2019:12:31 23:59:30", 60) == "2020:01:01 00:00:30"
+    assert shift_datetime("    :  :     :  :  ", 60) is None
+
+
+def test_gps_stamp_rolls_the_date():
+    time_stamp = (IFDRational(23, 1), IFDRational(59, 1), IFDRational(3050, 100))
+    date_stamp, (h, m, s) = shift_gps_stamp("2019:12:31", time_stamp, 60)
+    assert date_stamp == "2020:01:01"
+    assert (float(h), float(m), float(s)) == (0, 0, 30.5)
+
+
+@pytest.mark.parametrize("date_stamp, time_stamp, expected_date, expected_time", [
+    ("2019:12:31", (10, 0, 59.999), "2019:12:31", (10, 1, 0)),
+    ("2019:12:31", (23, 59, 59.996), "2020:01:01", (0, 0, 0)),
+    (None, (10, 59, 59.995), None, (11, 0, 0)),
+])
+def test_gps_stamp_carries_rounded_seconds(date_stamp, time_stamp, expected_date, expected_time):
+    new_date, (h, m, s) = shift_gps_stamp(date_stamp, time_stamp, 0)
+    assert new_date == expected_date
+    assert (float(h), float(m), float(s)) == expected_time
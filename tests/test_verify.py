@@ -0,0 +1,112 @@
+import shutil
+
+import pytest
+from PIL import Image
+from PIL.TiffImagePlugin import IFDRational
+
+from conftest import make_image
+from exif_reader import read_exif
+from exif_writer import save_with_exif
+from obfuscate import scrub_file
+from scrub_policy import CompiledPolicy
+from time_shift import TimeSettings
+from verify import VerifyRules, check_output, payload_digest, snapshot
+
+CONTAINERS = [(".jpg", "JPEG"), (".png", "PNG"), (".webp", "WEBP"), (".tif", "TIFF")]
+GPS = {1: "N", 2: (IFDRational(48, 1), IFDRational(51, 1), IFDRational(2961, 100)),
+       3: "E", 4: (IFDRational(2, 1), IFDRational(17, 1), IFDRational(4017, 100))}
+TAGS = {271: "Make", 306: "2020:01:01 12:00:00", 315: "Someone"}
+
+
+def _digest(path):
+    with open(path, "rb") as fp:
+        return payload_digest(fp)
+
+
+def _image_data_offset(path, fmt):
+    """A byte inside the image data (not the metadata) of path."""
+    with open(path, "rb") as fp:
+        data = fp.read()
+    if fmt == "JPEG":
+        return len(data) - 16  # in the scan, before EOI
+    if fmt == "PNG":
+        return data.index(b"IDAT") + 8
+    if fmt == "WEBP":
+        return data.index(b"VP8L") + 16
+    offsets = read_exif(path).values()[273]
+    return (offsets[0] if isinstance(offsets, tuple) else offsets) + 8  # first strip
+
+
+@pytest.mark.parametrize("ext, fmt", CONTAINERS)
+def test_digest_ignores_metadata(tmp_path, ext, fmt):
+    a = make_image(tmp_path / f"a{ext}", fmt, {271: "Make"})
+    b = str(tmp_path / f"b{ext}")
+    exif = Image.Exif()
+    exif.update({271: "Other", 305: "Software with a much longer name"})
+    save_with_exif(a, b, exif.tobytes())
+
+    digest, hashed = _digest(a)
+
+    assert digest is not None and hashed > 0
+    assert _digest(b)[0] == digest
+
+
+@pytest.mark.parametrize("ext, fmt", CONTAINERS)
+def test_digest_detects_changed_image_data(tmp_path, ext, fmt):
+    path = make_image(tmp_path / f"a{ext}", fmt, {271: "Make"})
+    before = _digest(path)[0]
+    offset = _image_data_offset(path, fmt)
+    with open(path, "r+b") as fp:
+        fp.seek(offset)
+        byte = fp.read(1)
+        fp.seek(offset)
+        fp.write(bytes([byte[0] ^ 0xFF]))
+
+    assert _digest(path)[0] != before
+
+
+def test_unknown_container_has_no_digest(tmp_path):
+    path = make_image(tmp_path / "a.bmp", "BMP")
+    assert _digest(path) == (None, 0)
+
+
+def _rules(policy=None):
+    return VerifyRules(policy, dates=TimeSettings(30, seed="s"))
+
+
+def test_scrubbed_output_passes(tmp_path):
+    src = make_image(tmp_path / "a.jpg", "JPEG", TAGS, gps=GPS)
+    dst = str(tmp_path / "b.jpg")
+    before = snapshot(src)
+
+    lossless = scrub_file(src, dst, seed="s", dates=TimeSettings(30, seed="s"))
+    problems, hashed, compared = check_output(before, dst, _rules(), lossless)
+
+    assert problems == []
+    assert compared and hashed > 0
+
+
+def test_unscrubbed_copy_fails(tmp_path):
+    src = make_image(tmp_path / "a.jpg", "JPEG", TAGS, gps=GPS)
+    dst = str(tmp_path / "b.jpg")
+    shutil.copy(src, dst)
+    policy = CompiledPolicy({"name": "t", "rules": [{"tag": "Artist", "action": "drop"}]})
+
+    problems, _, _ = check_output(snapshot(src), dst, _rules(policy))
+
+    assert "IFD0 tag 315 wasn't dropped" in problems
+    assert "IFD0 date 306 wasn't shifted" in problems
+    assert "GPS position isn't snapped to the grid" in problems
+    assert "image data changed" not in problems
+
+
+def test_reencoded_output_fails_the_payload_check(tmp_path):
+    src = make_image(tmp_path / "a.jpg", "JPEG", TAGS)
+    dst = str(tmp_path / "b.jpg")
+    with Image.open(src) as img:
+        img.save(dst, quality=50, exif=img.getexif())
+
+    problems, _, compared = check_output(snapshot(src), dst, _rules())
+
+    assert compared
+    assert "image data changed" in problems
@@ -0,0 +1,172 @@
+"""
+Gallery thumbnails, cached on disk.
+
+A thumbnail is the image's embedded EXIF thumbnail when it has one,
+otherwise a reduced-size decode (exif_blocks.make_thumbnail). Entries are
+keyed by path, size and mtime, so a changed file gets a new thumbnail,
+and they carry the GPS / serial number badges as well, so a folder seen
+before is shown without opening a single image. Once the cache is over
+max_bytes, the least recently used entries are deleted.
+
+Nothing in here imports Qt; the gallery turns the JPEG bytes into pixmaps.
+"""
+import hashlib
+import os
+import sys
+import threading
+
+from exif_blocks import extract_thumbnail, make_thumbnail
+from exif_reader import ExifReadError, read_exif
+from export import SERIAL_TAGS, format_value
+from gps_obfuscation import read_coordinates
+
+HAS_GPS = 1
+HAS_SERIAL = 2
+
+MAX_BYTES = 256 * 1024 * 1024
+ENTRY_VERSION = b"\x01"  # first byte of every entry; bump when the format changes
+
+
+def default_cache_dir():
+    """Per-user cache directory for the thumbnails."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "exifuscator", "thumbnails")
+
+
+def leak_flags(tree):
+    """HAS_GPS / HAS_SERIAL bits for an ExifTree (0 for None)."""
+    if not tree:
+        return 0
+    flags = 0
+    if read_coordinates(tree.values("GPS")) is not None:
+        flags |= HAS_GPS
+    for ifd in ("IFD0", "Exif"):
+        values = tree.values(ifd)
+        if any(format_value(values[tag], tag) for tag in SERIAL_TAGS if tag in values):
+            flags |= HAS_SERIAL
+    return flags
+
+
+def build_entry(path):
+    """
+    Thumbnail and badges of one image, computed from the file.
+
+    Returns:
+        (flags, jpeg_bytes)
+    """
+    try:
+        tree = read_exif(path)
+    except ExifReadError:
+        tree = None
+    jpeg = extract_thumbnail(tree)
+    if jpeg is None or not jpeg.startswith(b"\xff\xd8"):
+        jpeg = make_thumbnail(path)
+    return leak_flags(tree), jpeg
+
+
+class ThumbnailCache:
+    """
+    Size-bounded directory of thumbnail entries.
+
+    Safe to use from several threads; every entry is written to a temp
+    file and renamed into place.
+
+    Args:
+        directory: where entries live (default: default_cache_dir())
+        max_bytes: total size the cache is trimmed back to
+    """
+
+    def __init__(self, directory=None, max_bytes=MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = None  # bytes on disk, counted on the first write
+
+    def _entry_path(self, path):
+        st = os.stat(path)
+        key = f"{os.path.abspath(path)}\0{st.st_size}\0{st.st_mtime_ns}"
+        digest = hashlib.sha1(key.encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest[2:])
+
+    def get(self, path):
+        """(flags, jpeg_bytes) from the cache, or None on a miss."""
+        entry = self._entry_path(path)
+        try:
+            with open(entry, "rb") as fp:
+                data = fp.read()
+            os.utime(entry)  # recently used, evicted last
+        except OSError:
+            return None
+        if len(data) < 2 or data[:1] != ENTRY_VERSION:
+            return None
+        return data[1], data[2:]
+
+    def put(self, path, flags, jpeg):
+        entry = self._entry_path(path)
+        data = ENTRY_VERSION + bytes([flags]) + jpeg
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        tmp_path = f"{entry}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as fp:
+            fp.write(data)
+        os.replace(tmp_path, entry)
+        with self._lock:
+            if self._total is None:
+                self._total = sum(size for _, size, _ in self._entries())
+            else:
+                self._total += len(data)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def load(self, path):
+        """
+        (flags, jpeg_bytes) for path, from the cache or built (and stored).
+
+        A cache that can't be written to doesn't stop the thumbnail.
+        """
+        cached = self.get(path)
+        if cached is not None:
+            return cached
+        flags, jpeg = build_entry(path)
+        try:
+            self.put(path, flags, jpeg)
+        except OSError:
+            pass
+        return flags, jpeg
+
+    def _entries(self):
+        """(path, size, mtime) of every entry."""
+        try:
+            shards = list(os.scandir(self.directory))
+        except OSError:
+            return []
+        entries = []
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            for item in os.scandir(shard.path):
+                try:
+                    st = item.stat()
+                except OSError:
+                    continue
+                entries.append((item.path, st.st_size, st.st_mtime))
+        return entries
+
+    def _evict(self):
+        # Trim to 90% so every write past the limit doesn't rescan the cache
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for entry, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(entry)
+                total -= size
+            except OSError:
+                pass
+        self._total = total
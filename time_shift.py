@@ -0,0 +1,170 @@
+"""
+Consistent time shifting for every date/time tag.
+
+Instead of inventing an unrelated timestamp per image, all dates of a batch
+(or of each album, i.e. directory) move by the same random offset: IFD0
+DateTime, DateTimeOriginal, DateTimeDigitized and the GPS date/time stamp.
+SubSec and OffsetTime tags stay as they are, which keeps every file
+internally consistent and the relative timing between photos intact.
+
+Timestamps are parsed by slicing the fixed "YYYY:MM:DD HH:MM:SS" layout
+(no strptime) and results are memoized, since the three datetime tags of
+one photo are usually identical.
+"""
+import math
+import os
+import random
+import secrets
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from PIL.TiffImagePlugin import IFDRational
+
+from instrumentation import timed
+
+SCOPES = ("batch", "album")
+
+# "YYYY:MM:DD HH:MM:SS" tags per IFD
+DATETIME_FIELDS = {
+    "IFD0": (306,),           # DateTime
+    "Exif": (36867, 36868),   # DateTimeOriginal, DateTimeDigitized
+}
+GPS_TIME_STAMP = 7   # (hour, minute, second) rationals, UTC
+GPS_DATE_STAMP = 29  # "YYYY:MM:DD"
+
+_format_datetime = "{:04d}:{:02d}:{:02d} {:02d}:{:02d}:{:02d}".format
+
+
+class TimeSettings:
+    """
+    How dates are shifted.
+
+    Args:
+        max_days: offsets are drawn from [-max_days, +max_days] (0 disables)
+        scope: "batch" for one offset for everything, "album" for one per
+            directory
+        seed: offsets are derived from it, so every worker process picks the
+            same one; random when omitted
+    """
+
+    def __init__(self, max_days=365, scope="batch", seed=None):
+        if scope not in SCOPES:
+            raise ValueError(f"Unknown time shift scope {scope!r}, expected one of {', '.join(SCOPES)}")
+        if isinstance(max_days, bool) or not isinstance(max_days, (int, float)) or not 0 <= max_days < math.inf:
+            raise ValueError(f"max_days must be a non-negative number, not {max_days!r}")
+        self.max_days = max_days
+        self.scope = scope
+        self.seed = secrets.token_hex(8) if seed is None else seed
+
+    def offset_for(self, path):
+        """Shift in whole seconds for the file at path."""
+        key = os.path.dirname(os.path.abspath(path)) if self.scope == "album" else ""
+        return _offset(str(self.seed), key, int(self.max_days * 86400))
+
+
+@lru_cache(maxsize=1024)
+def _offset(seed, key, max_seconds):
+    if max_seconds <= 0:
+        return 0
+    return random.Random(f"{seed}:time:{key}").randint(-max_seconds, max_seconds)
+
+
+def _parse(value):
+    """datetime from "YYYY:MM:DD HH:MM:SS", or None for blank/malformed values."""
+    if len(value) < 19 or value[4] != ":" or value[7] != ":" or value[13] != ":":
+        return None
+    try:
+        return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                        int(value[11:13]), int(value[14:16]), int(value[17:19]))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=8192)
+def shift_datetime(value, offset):
+    """Shifted EXIF datetime string, or None if value isn't a valid one."""
+    parsed = _parse(value)
+    if parsed is None:
+        return None
+    try:
+        d = parsed + timedelta(seconds=offset)
+    except OverflowError:
+        return None
+    return _format_datetime(d.year, d.month, d.day, d.hour, d.minute, d.second)
+
+
+def shift_gps_stamp(date_stamp, time_stamp, offset):
+    """
+    Shift a GPS date/time pair together.
+
+    Args:
+        date_stamp: "YYYY:MM:DD" or None
+        time_stamp: (h, m, s) rationals or None
+
+    Returns:
+        (date_stamp, time_stamp); values that can't be shifted come back
+        unchanged, and without a date only the time of day moves
+    """
+    if not isinstance(time_stamp, tuple) or len(time_stamp) != 3:
+        return date_stamp, time_stamp
+    try:
+        seconds = float(time_stamp[0]) * 3600 + float(time_stamp[1]) * 60 + float(time_stamp[2])
+    except (TypeError, ValueError, ZeroDivisionError):
+        return date_stamp, time_stamp
+    # Rounded to hundredths as a whole first, so the seconds can't round up to 60
+    whole, hundredths = divmod(round(seconds * 100), 100)
+
+    base = _parse(f"{date_stamp} 00:00:00") if isinstance(date_stamp, str) else None
+    try:
+        d = (base or datetime(2000, 1, 1)) + timedelta(seconds=whole + offset)
+    except OverflowError:
+        return date_stamp, time_stamp
+    new_time = (
+        IFDRational(d.hour, 1),
+        IFDRational(d.minute, 1),
+        IFDRational(d.second * 100 + hundredths, 100),
+    )
+    if base is not None:
+        date_stamp = f"{d.year:04d}:{d.month:02d}:{d.day:02d}"
+    return date_stamp, new_time
+
+
+@timed("scrub.dates")
+def apply_time_shift(documents, settings):
+    """
+    Shift every date/time tag of each document, recording the changes as edits.
+
+    Returns:
+        number of documents that had a date changed
+    """
+    if settings is None or settings.max_days <= 0:
+        return 0
+    count = 0
+    for document in documents:
+        offset = settings.offset_for(document.path)
+        if not offset:
+            continue
+        changed = False
+        for ifd, tags in DATETIME_FIELDS.items():
+            values = document.values(ifd)
+            changes = {}
+            for tag in tags:
+                if isinstance(values.get(tag), str):
+                    shifted = shift_datetime(values[tag], offset)
+                    if shifted is not None:
+                        changes[tag] = shifted
+            if changes:
+                document.update(changes, ifd)
+                changed = True
+
+        gps = document.values("GPS")
+        if GPS_TIME_STAMP in gps:
+            date_stamp, time_stamp = shift_gps_stamp(gps.get(GPS_DATE_STAMP), gps[GPS_TIME_STAMP], offset)
+            changes = {GPS_TIME_STAMP: time_stamp}
+            if date_stamp is not None:
+                changes[GPS_DATE_STAMP] = date_stamp
+            document.update(changes, ifd="GPS")
+            changed = True
+        if changed:
+            count += 1
+    return count
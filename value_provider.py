@@ -0,0 +1,150 @@
+"""
+Random replacement values from metadata.db.
+
+The camera profiles (see database.py) are loaded once per process, and
+an alias table over their weights is built at load time, so drawing a
+profile costs two list lookups however many rows the table has, instead
+of an `ORDER BY RANDOM()` query (and a new connection) per image.
+"""
+import os
+import random
+import sqlite3
+from collections import namedtuple
+from pathlib import Path
+
+from assets import resource_path
+from database import SCHEMA_VERSION
+from instrumentation import span, timed
+
+DB_PATH = resource_path('metadata.db')
+
+Profile = namedtuple("Profile", "make model lens_make lens_model firmware software "
+                                "width height sensor_width_mm sensor_height_mm")
+
+
+class AliasTable:
+    """
+    Walker's alias method: O(n) to build, O(1) per draw.
+
+    Args:
+        weights: non-negative numbers, not all zero
+    """
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        scaled = [w * n / total for w in weights]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Whatever is left is 1.0 up to rounding errors
+
+    def __len__(self):
+        return len(self.prob)
+
+    def sample(self, rng):
+        """Index drawn in proportion to its weight, using one rng.random() call."""
+        u = rng.random() * len(self.prob)
+        i = int(u)
+        return i if u - i < self.prob[i] else self.alias[i]
+
+
+class ValueProvider:
+    """
+    Preloaded random-value source for one database.
+
+    Args:
+        db_path: path to metadata.db
+        seed: optional seed; with the same seed (and reseed keys) a batch
+            run picks exactly the same values again
+    """
+
+    def __init__(self, db_path=DB_PATH, seed=None):
+        self.db_path = db_path
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # Read-only: workers never write, and it can't take write locks
+        uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        with span("db.load"):
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self.reload()
+
+    def reload(self):
+        """(Re)load the profiles into memory and rebuild the sampler."""
+        cursor = self.conn.cursor()
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            raise sqlite3.DatabaseError(
+                f"{self.db_path} has schema version {version}, update it with: python database.py {self.db_path}"
+            )
+        bodies = {row[0]: row[1:] for row in cursor.execute(
+            "SELECT id, make, model, width, height, sensor_width_mm, sensor_height_mm FROM bodies")}
+        lenses = {row[0]: row[1:] for row in cursor.execute("SELECT id, make, model FROM lenses")}
+        software = dict(cursor.execute("SELECT id, name FROM software"))
+
+        # Rows stay as ids until drawn, so a big table costs a few small tuples per row
+        self.profiles = []
+        weights = []
+        for body_id, lens_id, firmware, software_id, weight in cursor.execute(
+                "SELECT body_id, lens_id, firmware, software_id, weight FROM profiles ORDER BY id"):
+            if body_id in bodies:
+                self.profiles.append((body_id, lens_id, firmware, software_id))
+                weights.append(weight)
+        self._bodies = bodies
+        self._lenses = lenses
+        self._software = software
+        self.sampler = AliasTable(weights) if self.profiles else None
+
+    def reseed(self, key):
+        """
+        Derive the random state from the seed and a per-item key (e.g. a path).
+
+        Batch workers finish files in any order, so per-file reseeding is
+        what keeps seeded runs reproducible. Does nothing without a seed.
+        """
+        if self.seed is not None:
+            self.rng.seed(f"{self.seed}:{key}")
+
+    @timed("db.sample")
+    def random_profile(self):
+        """Profile drawn by popularity, or None if there are no profiles."""
+        if self.sampler is None:
+            return None
+        body_id, lens_id, firmware, software_id = self.profiles[self.sampler.sample(self.rng)]
+        make, model, width, height, sensor_w, sensor_h = self._bodies[body_id]
+        lens_make, lens_model = self._lenses.get(lens_id, (None, None))
+        return Profile(make, model, lens_make, lens_model, firmware, self._software.get(software_id),
+                       width, height, sensor_w, sensor_h)
+
+    def random_camera(self):
+        """Random (make, model) pair. Returns (None, None) if there are no profiles."""
+        profile = self.random_profile()
+        return (profile.make, profile.model) if profile else (None, None)
+
+    def random_software(self):
+        """Software string of a random profile, or None if there are none."""
+        profile = self.random_profile()
+        return profile.software if profile else None
+
+    def close(self):
+        self.conn.close()
+
+
+# One provider per (process, database); worker processes each get their own
+_providers = {}
+
+
+def get_provider(db_path=DB_PATH, seed=None):
+    """Shared provider for db_path in this process, created on first use."""
+    key = (os.path.abspath(db_path), seed)
+    provider = _providers.get(key)
+    if provider is None:
+        provider = _providers[key] = ValueProvider(db_path, seed)
+    return provider
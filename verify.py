@@ -0,0 +1,362 @@
+"""
+Output verification: evidence that a scrubbed file kept its image and lost
+what the policy removes.
+
+Two checks per file, neither of which decodes the image:
+
+    payload   the image data of the original and of the output is hashed
+              (BLAKE2b, streamed through one fixed-size buffer) leaving the
+              metadata out: JPEG APPn/COM segments, PNG eXIf and text
+              chunks, WebP VP8X/EXIF/XMP chunks, the Exif item of a HEIC,
+              and for TIFF everything but the first page's strips or tiles.
+              The digests must match.
+    metadata  only the output's EXIF block is parsed again and checked
+              against the scrub rules: dropped tags and IFDs are gone,
+              constants are set, hashed values changed, dates moved, GPS
+              positions are snapped / jittered / stripped and the
+              thumbnail and MakerNote were handled as configured.
+
+Randomized values aren't compared with the original, since a random draw
+can legitimately pick the same camera again. Re-encoded outputs (a format
+change) only get the metadata check.
+"""
+import hashlib
+import io
+import struct
+
+from exif_blocks import BlockSettings, MAKERNOTE
+from exif_reader import ExifReadError, read_exif_from_file, read_heic_items, sniff_container
+from exif_writer import ExifWriteError, IMAGE_LAYOUT_TAGS, PNG_TEXT_CHUNKS, read_jpeg_header
+from gps_obfuscation import (DEST_TAGS, POSITION_TAGS, GpsSettings, degrees_to_dms, dms_to_degrees,
+                             obfuscate_coordinates, read_coordinates)
+from instrumentation import span
+from scrub_policy import DATETIME_TAGS, IFDS, PROTECTED_TAGS, load_policy
+from time_shift import shift_datetime
+
+BUFFER_SIZE = 1024 * 1024
+SNAP_TOLERANCE = 1e-5  # degrees; DMS seconds are stored in hundredths
+
+APP0, APP15, COM = 0xE0, 0xEF, 0xFE
+PNG_METADATA_CHUNKS = (b"eXIf",) + PNG_TEXT_CHUNKS
+WEBP_METADATA_CHUNKS = (b"VP8X", b"EXIF", b"XMP ")
+STRIP_OFFSETS, STRIP_BYTE_COUNTS = 273, 279
+TILE_OFFSETS, TILE_BYTE_COUNTS = 324, 325
+
+
+class VerifyError(Exception):
+    """Raised when a file's image data can't be located."""
+
+
+class _PayloadHash:
+    """BLAKE2b of selected byte ranges of an open file, read through one buffer."""
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.digest = hashlib.blake2b(digest_size=16)
+        self.buffer = memoryview(bytearray(BUFFER_SIZE))
+        self.bytes = 0
+
+    def update(self, data):
+        self.digest.update(data)
+        self.bytes += len(data)
+
+    def add_range(self, length, offset=None):
+        """Hash length bytes at offset (default: where the file is)."""
+        if offset is not None:
+            self.fp.seek(offset)
+        while length > 0:
+            n = self.fp.readinto(self.buffer[:min(length, BUFFER_SIZE)])
+            if not n:
+                raise VerifyError("file ends inside the image data")
+            self.update(self.buffer[:n])
+            length -= n
+
+    def add_rest(self):
+        while True:
+            n = self.fp.readinto(self.buffer)
+            if not n:
+                return
+            self.update(self.buffer[:n])
+
+
+def _hash_jpeg(h):
+    for marker, segment in read_jpeg_header(h.fp):
+        if not (APP0 <= marker <= APP15 or marker == COM):
+            h.update(segment)  # DQT, DHT, SOF, ...
+    h.add_rest()  # scans and whatever follows EOI
+
+
+def _hash_png(h):
+    fp = h.fp
+    fp.seek(8)
+    while True:
+        header = fp.read(8)
+        if len(header) < 8:
+            raise VerifyError("PNG ends without an IEND chunk")
+        length, chunk_type = struct.unpack(">L4s", header)
+        if chunk_type in PNG_METADATA_CHUNKS:
+            fp.seek(length + 4, 1)
+            continue
+        h.update(header)
+        h.add_range(length + 4)  # data + CRC
+        if chunk_type == b"IEND":
+            return
+
+
+def _hash_webp(h):
+    fp = h.fp
+    header = fp.read(12)
+    end = 8 + struct.unpack("<L", header[4:8])[0]
+    while fp.tell() + 8 <= end:
+        chunk = fp.read(8)
+        if len(chunk) < 8:
+            break
+        length = struct.unpack("<L", chunk[4:])[0]
+        if chunk[:4] in WEBP_METADATA_CHUNKS:
+            fp.seek(length + (length & 1), 1)
+            continue
+        h.update(chunk)
+        h.add_range(length)
+        fp.seek(length & 1, 1)
+
+
+def _as_tuple(value):
+    return value if isinstance(value, tuple) else (value,)
+
+
+def _hash_tiff(h):
+    tree = read_exif_from_file(h.fp)
+    ifd0 = tree.values("IFD0") if tree else {}
+    if STRIP_OFFSETS in ifd0:
+        offsets, counts = ifd0[STRIP_OFFSETS], ifd0.get(STRIP_BYTE_COUNTS)
+    else:
+        offsets, counts = ifd0.get(TILE_OFFSETS), ifd0.get(TILE_BYTE_COUNTS)
+    if offsets is None or counts is None:
+        raise VerifyError("TIFF has no strip or tile offsets")
+    for tag in IMAGE_LAYOUT_TAGS:
+        if tag in ifd0:
+            h.update(repr((tag, ifd0[tag])).encode("ascii", "backslashreplace"))
+    for offset, length in zip(_as_tuple(offsets), _as_tuple(counts)):
+        h.add_range(length, offset)
+
+
+def _hash_heic(h):
+    meta = read_heic_items(h.fp)
+    if meta is None:
+        raise VerifyError("HEIC file has no item locations")
+    exif_id, items, _, _ = meta
+    for item_id, method, base, extents in sorted(items):
+        # Items in idat (method 1) live in the meta box, which isn't rewritten
+        if item_id == exif_id or method != 0:
+            continue
+        h.update(struct.pack(">L", item_id))
+        for _, offset, _, length in extents:
+            h.add_range(length, base + offset)
+
+
+PAYLOAD_HASHERS = {
+    "jpeg": _hash_jpeg,
+    "png": _hash_png,
+    "webp": _hash_webp,
+    "tiff": _hash_tiff,
+    "heic": _hash_heic,
+}
+
+
+def payload_digest(fp):
+    """
+    Hash of the image data of an open file, metadata left out.
+
+    Returns:
+        (hex digest, bytes hashed), or (None, 0) for unknown containers
+    """
+    start = fp.tell()
+    hasher = PAYLOAD_HASHERS.get(sniff_container(fp.read(12)))
+    if hasher is None:
+        return None, 0
+    fp.seek(start)
+    h = _PayloadHash(fp)
+    with span("verify.hash"):
+        try:
+            hasher(h)
+        except (ExifReadError, ExifWriteError, struct.error) as e:
+            raise VerifyError(str(e)) from e
+    return h.digest.hexdigest(), h.bytes
+
+
+class Snapshot:
+    """What the checks need to know about a file before it is scrubbed."""
+
+    __slots__ = ("path", "tree", "digest", "bytes")
+
+    def __init__(self, path, tree, digest, size):
+        self.path = path
+        self.tree = tree
+        self.digest = digest
+        self.bytes = size
+
+
+def snapshot(path, data=None):
+    """
+    Snapshot of a file that is about to be scrubbed (in place or not).
+
+    data is the file's contents when they were already read; path is then
+    only recorded.
+    """
+    with (io.BytesIO(data) if data is not None else open(path, "rb")) as fp:
+        tree = read_exif_from_file(fp)
+        fp.seek(0)
+        digest, size = payload_digest(fp)
+    return Snapshot(path, tree, digest, size)
+
+
+class VerifyRules:
+    """
+    The settings a batch scrubs with, resolved the way scrub_files does.
+
+    Args:
+        policy: CompiledPolicy (default: the built-in one)
+        gps: GpsSettings (default: the policy's, else snap)
+        dates: TimeSettings (default: the policy's)
+        blocks: BlockSettings (default: the policy's, else strip the thumbnail)
+    """
+
+    def __init__(self, policy=None, gps=None, dates=None, blocks=None):
+        self.policy = policy or load_policy()
+        self.gps = gps or self.policy.gps or GpsSettings()
+        self.dates = dates or self.policy.time
+        self.blocks = blocks or self.policy.blocks or BlockSettings()
+
+
+def _text(value):
+    """Comparable form of a tag value (None and "" are the same)."""
+    if value is None:
+        return ""
+    if isinstance(value, bytes):
+        value = value.decode("latin-1")
+    if isinstance(value, str):
+        return value.rstrip("\x00").strip()
+    if isinstance(value, tuple):
+        return tuple(_text(item) for item in value)
+    try:
+        return float(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return repr(value)
+
+
+def _roundtrip(lat, lon):
+    """Position as it reads back after being written as DMS rationals."""
+    lat_dms, lat_ref = degrees_to_dms(lat, "N", "S")
+    lon_dms, lon_ref = degrees_to_dms(lon, "E", "W")
+    return dms_to_degrees(lat_dms, lat_ref), dms_to_degrees(lon_dms, lon_ref)
+
+
+def _gps_problems(old_gps, new_gps, settings):
+    problems = []
+    for name, tags in (("position", POSITION_TAGS), ("destination", DEST_TAGS)):
+        old_pos = read_coordinates(old_gps, tags)
+        new_pos = read_coordinates(new_gps, tags)
+        if old_pos is None or new_pos is None or settings.mode == "keep":
+            continue
+        if settings.mode == "strip":
+            problems.append(f"GPS {name} wasn't stripped")
+        elif settings.mode == "snap":
+            lats, lons = obfuscate_coordinates([old_pos[0]], [old_pos[1]], settings)
+            expected = _roundtrip(lats[0], lons[0])
+            if max(abs(new_pos[0] - expected[0]), abs(new_pos[1] - expected[1])) > SNAP_TOLERANCE:
+                problems.append(f"GPS {name} isn't snapped to the grid")
+        elif new_pos == old_pos:
+            problems.append(f"GPS {name} unchanged")
+    return problems
+
+
+def metadata_problems(before, after, rules, path):
+    """
+    Ways the output's EXIF breaks the rules.
+
+    Args:
+        before, after: ExifTree (or None) of the original and the output
+        rules: VerifyRules
+        path: the original's path (date offsets can depend on its directory)
+
+    Returns:
+        list of problem descriptions, empty if the output passes
+    """
+    policy = rules.policy
+    old = {ifd: before.values(ifd) if before else {} for ifd in IFDS}
+    new = {ifd: after.values(ifd) if after else {} for ifd in IFDS}
+    problems = []
+
+    for ifd in IFDS:
+        if ifd in policy.dropped_ifds:
+            if new[ifd]:
+                problems.append(f"{ifd} IFD wasn't dropped")
+            continue
+        default_drop = policy.defaults[ifd] is not None
+        for tag, value in new[ifd].items():
+            rule = policy.rules[ifd].get(tag)
+            if rule is None:
+                if default_drop and tag not in PROTECTED_TAGS:
+                    problems.append(f"{ifd} tag {tag} wasn't dropped")
+            elif rule["action"] == "drop":
+                problems.append(f"{ifd} tag {tag} wasn't dropped")
+            elif rule["action"] == "hash":
+                original = old[ifd].get(tag)
+                if isinstance(original, (str, bytes)) and _text(original) and _text(value) == _text(original):
+                    problems.append(f"{ifd} tag {tag} wasn't hashed")
+        for tag, rule in policy.rules[ifd].items():
+            if rule["action"] == "constant" and (tag in old[ifd] or rule.get("always")):
+                if _text(new[ifd].get(tag)) != _text(rule["value"]):
+                    problems.append(f"{ifd} tag {tag} isn't {rule['value']!r}")
+
+    offset = rules.dates.offset_for(path) if rules.dates else 0
+    if offset:
+        for ifd in ("IFD0", "Exif"):
+            for tag in DATETIME_TAGS:
+                original, value = old[ifd].get(tag), new[ifd].get(tag)
+                rule = policy.rules[ifd].get(tag)
+                if rule is not None and rule["action"] not in ("keep", "shift-time"):
+                    continue
+                if isinstance(original, str) and shift_datetime(original.strip(), offset) is not None \
+                        and _text(value) == _text(original):
+                    problems.append(f"{ifd} date {tag} wasn't shifted")
+
+    problems += _gps_problems(old["GPS"], new["GPS"], rules.gps)
+
+    if after is not None and after.container != "tiff":  # a TIFF's IFD1 is a page
+        if rules.blocks.thumbnail == "strip" and after.thumbnail_range is not None:
+            problems.append("thumbnail wasn't stripped")
+    if rules.blocks.makernote == "strip" and MAKERNOTE in new["Exif"]:
+        problems.append("MakerNote wasn't stripped")
+    return problems
+
+
+def check_output(before, dst_path, rules, lossless=True):
+    """
+    Verify a scrubbed file against the snapshot of its original.
+
+    Args:
+        before: Snapshot taken before scrubbing
+        lossless: False for re-encoded outputs, whose image data can't match
+
+    Returns:
+        (problems, bytes hashed, payload compared)
+    """
+    problems = []
+    hashed = 0
+    compared = False
+    try:
+        with open(dst_path, "rb") as fp:
+            with span("verify.metadata"):
+                after = read_exif_from_file(fp)
+            if lossless and before.digest is not None:
+                fp.seek(0)
+                digest, hashed = payload_digest(fp)
+                compared = True
+                if digest != before.digest:
+                    problems.append("image data changed")
+    except (OSError, ExifReadError, VerifyError) as e:
+        return [f"can't read the output: {e}"], hashed, compared
+    with span("verify.metadata"):
+        problems += metadata_problems(before.tree, after, rules, before.path)
+    return problems, before.bytes + hashed, compared
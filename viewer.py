@@ -0,0 +1,651 @@
+"""
+The EXIFuscator main window.
+
+Imported by main.py only when the GUI is started, so the headless
+commands never load Qt.
+"""
+import os
+from functools import lru_cache
+
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
+                             QHBoxLayout, QPushButton, QLabel, QFileDialog, 
+                             QScrollArea, QSplitter, QFrame, QToolBar, QTableView,
+                             QHeaderView)
+
+from PyQt5.QtCore import Qt, QThreadPool, QTimer
+from PyQt5.QtGui import QPixmap, QIcon
+import assets
+from exif_blocks import BlockSettings, build_payload, patch_blocks_in_place
+from exif_patch import PatchError
+from exif_writer import save_with_exif
+from gps_obfuscation import GpsSettings, apply_gps
+from metadata_model import ExifTableModel
+from metadata_session import get_document, session
+from obfuscate import randomize_document
+from preview import PreviewCache, PreviewTask, preview_size
+from scrub_policy import load_policy
+from time_shift import apply_time_shift
+from value_provider import get_provider
+
+# Used when qdarkstyle isn't installed
+FALLBACK_DARK_STYLESHEET = """
+    QMainWindow, QWidget {
+        background-color: #2b2b2b;
+        color: #ffffff;
+    }
+    QTableView, QScrollArea {
+        background-color: #1e1e1e;
+        color: #ffffff;
+    }
+"""
+
+
+@lru_cache(maxsize=None)
+def dark_stylesheet():
+    """The dark theme's stylesheet; qdarkstyle is only tried (and built) once."""
+    try:
+        import qdarkstyle
+        return qdarkstyle.load_stylesheet_pyqt5()
+    except Exception:
+        return FALLBACK_DARK_STYLESHEET
+
+
+class ExifMetadataViewer(QMainWindow):
+    """
+    A simple GUI application for viewing EXIF metadata of images.
+    Built with PyQt5 and Pillow for easy customization and extension.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.current_image_path = None
+        self.document = None  # ImageDocument shared with the editor dialog
+        self.logo_name = assets.LOGO_WHITE  # decoded (and cached) per size by assets.pixmap
+        self.dark_mode = True  # Start in dark mode
+        self.debug_panel = None  # created the first time it's opened
+        self.gallery = None  # created when a folder is opened
+        
+        # Previews are decoded on the thread pool and cached per viewport size
+        self.thread_pool = QThreadPool.globalInstance()
+        self.preview_cache = PreviewCache()
+        self._preview_key = None
+        self._preview_signals = set()
+        # Re-fit the preview once the user stops resizing, not on every tick
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.setInterval(150)
+        self._resize_timer.timeout.connect(self.refit_preview)
+        
+        self.init_ui()
+        
+    
+    def init_ui(self):
+        """Initialize the user interface."""
+        self.setWindowTitle("EXIFuscator")
+        self.setWindowIcon(QIcon(assets.image_path(assets.FAVICON)))
+        self.setGeometry(100, 100, 1000, 700)
+
+        # Create menu bar first
+        self.create_menu_bar()
+        
+        # Create toolbar with logo and Load Image button
+        self.create_toolbar()
+
+        # Create central widget and main layout
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        
+        # Create main horizontal splitter
+        main_splitter = QSplitter(Qt.Horizontal)
+        central_widget.setLayout(QHBoxLayout())
+        central_widget.layout().addWidget(main_splitter)
+        
+        # Left panel for image display
+        self.setup_image_panel(main_splitter)
+        
+        # Right panel for metadata display
+        self.setup_metadata_panel(main_splitter)
+        
+        # Set splitter proportions (60% image, 40% metadata)
+        main_splitter.setSizes([600, 400])
+        
+        # Status bar
+        self.statusBar().showMessage("Ready - Click 'Load Image' to begin")
+    
+    def setup_image_panel(self, parent):
+        """Setup the left panel for image display."""
+        image_frame = QFrame()
+        image_frame.setFrameStyle(QFrame.StyledPanel)
+        image_layout = QVBoxLayout(image_frame)
+
+        # Image display area with scroll
+        self.image_scroll = QScrollArea()
+        self.image_scroll.setWidgetResizable(True)
+        self.image_scroll.setAlignment(Qt.AlignCenter)
+        
+        self.image_label = QLabel("No image loaded")
+        self.image_label.setAlignment(Qt.AlignCenter)
+        self.image_label.setStyleSheet("background-color: #000000; border: 2px dashed #ccc;")
+        self.image_label.setMinimumSize(400, 300)
+
+        self.image_scroll.setWidget(self.image_label)
+        image_layout.addWidget(self.image_scroll)
+
+        parent.addWidget(image_frame)
+
+    def setup_metadata_panel(self, parent):
+        """Setup the right panel for metadata display."""
+        metadata_frame = QFrame()
+        metadata_frame.setFrameStyle(QFrame.StyledPanel)
+        metadata_layout = QVBoxLayout(metadata_frame)
+        
+        # Top row with Load Image button aligned to the left
+        top_row = QHBoxLayout()
+        self.load_button_meta = QPushButton("Load Image")
+        self.load_button_meta.clicked.connect(self.load_image)
+        top_row.addWidget(self.load_button_meta)
+        top_row.setAlignment(Qt.AlignLeft)
+        metadata_layout.addLayout(top_row)
+
+        #Top row with Randomize button aligned to the right
+        top_row.addStretch()
+        self.load_button_meta = QPushButton("Randomize")
+        self.load_button_meta.clicked.connect(self.randomize_metadata)
+        top_row.addWidget(self.load_button_meta, alignment=Qt.AlignRight)
+        
+        # Metadata display area: a lazy table, plus a label for messages
+        self.metadata_message = QLabel("Load an image to view its EXIF metadata")
+        self.metadata_message.setWordWrap(True)
+        self.metadata_message.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        metadata_layout.addWidget(self.metadata_message)
+
+        self.metadata_model = ExifTableModel(self)
+        self.metadata_table = QTableView()
+        self.metadata_table.setModel(self.metadata_model)
+        self.metadata_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.metadata_table.setSelectionBehavior(QTableView.SelectRows)
+        self.metadata_table.setWordWrap(False)
+        self.metadata_table.verticalHeader().hide()
+        # Fixed row heights and no content-based column sizing, so a
+        # resize never has to measure every row
+        self.metadata_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.metadata_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Interactive)
+        self.metadata_table.horizontalHeader().setStretchLastSection(True)
+        self.metadata_table.setColumnWidth(0, 160)
+        self.metadata_table.hide()
+        metadata_layout.addWidget(self.metadata_table, 1)
+        
+        # Edit metadata button
+        self.edit_button = QPushButton("Edit Metadata")
+        self.edit_button.clicked.connect(self.write_metadata)
+        self.edit_button.setEnabled(False)
+        metadata_layout.addWidget(self.edit_button)
+        
+        # Save image button
+        self.save_button = QPushButton("Save Image")
+        self.save_button.clicked.connect(self.save_image)
+        self.save_button.setEnabled(False)
+        metadata_layout.addWidget(self.save_button)
+        parent.addWidget(metadata_frame)
+    
+    def create_toolbar(self):
+        """Create toolbar with theme toggles, centered logo, and Load Image button."""
+        toolbar = QToolBar()
+        toolbar.setMovable(False)
+        self.addToolBar(toolbar)
+        # keep a reference to the toolbar so other methods can query its size
+        self.toolbar = toolbar
+
+        # Create a container widget with horizontal layout for centering
+        container = QWidget()
+        layout = QHBoxLayout(container)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(10)
+
+        layout.addStretch(1) # this was the bane of our existance, no one likes stretch
+
+        # Moon icon button (left of logo) - toggles to dark mode
+        self.moon_button = QLabel()
+        self.moon_button.setPixmap(assets.pixmap(assets.MOON_ICON, 70))
+        self.moon_button.setCursor(Qt.PointingHandCursor)
+        self.moon_button.setToolTip("Switch to Dark Mode")
+        self.moon_button.mousePressEvent = lambda event: self.toggle_theme(True)
+        layout.addWidget(self.moon_button)
+
+        # Logo label - starts with the white logo (for dark mode)
+        self.logo_label = QLabel()
+        
+        if os.path.exists(assets.image_path(self.logo_name)):
+            # Initial scaling - will be adjusted on resize
+            self.update_logo_size()
+        else:
+            self.logo_label.setText("EXIFfuscator")
+            self.logo_label.setStyleSheet("font-weight: bold; font-size: 14pt;")
+        
+        self.logo_label.setAlignment(Qt.AlignCenter) # obscure ahh function
+        layout.addWidget(self.logo_label)
+
+        # Sun icon button (right of logo) - toggles to light mode
+        self.sun_button = QLabel()
+        self.sun_button.setPixmap(assets.pixmap(assets.SUN_ICON, 70))
+        self.sun_button.setCursor(Qt.PointingHandCursor)
+        self.sun_button.setToolTip("Switch to Light Mode")
+        self.sun_button.mousePressEvent = lambda event: self.toggle_theme(False)
+        layout.addWidget(self.sun_button)
+
+        layout.addStretch(1) # this was the bane of our existance, no one likes stretch
+
+        toolbar.addWidget(container)
+
+    def create_menu_bar(self):
+        """Create the application menu bar."""
+        menubar = self.menuBar()
+        
+        # File menu
+        file_menu = menubar.addMenu('File')
+        
+        # Load action
+        load_action = file_menu.addAction('Load Image')
+        load_action.setShortcut('Ctrl+O')
+        load_action.triggered.connect(self.load_image)
+        
+        # Browse a whole folder as thumbnails
+        folder_action = file_menu.addAction('Open Folder...')
+        folder_action.setShortcut('Ctrl+Shift+O')
+        folder_action.triggered.connect(self.open_folder)
+        
+        file_menu.addSeparator()
+        
+        # Exit action
+        exit_action = file_menu.addAction('Exit')
+        exit_action.setShortcut('Ctrl+Q')
+        exit_action.triggered.connect(self.close)
+        
+        # Help menu
+        help_menu = menubar.addMenu('Help')
+        about_action = help_menu.addAction('About')
+        about_action.triggered.connect(self.show_about)
+
+        # Timings of loads/saves, not recording until the panel is opened
+        debug_action = help_menu.addAction('Debug Timings')
+        debug_action.setShortcut('Ctrl+Shift+D')
+        debug_action.triggered.connect(self.toggle_debug_panel)
+    
+    def toggle_theme(self, to_dark_mode):
+        """
+        Toggle between light and dark mode.
+        
+        Args:
+            to_dark_mode (bool): True to switch to dark mode, False for light mode
+        """
+        # Only toggle if we're changing modes
+        if self.dark_mode == to_dark_mode:
+            return
+        
+        self.dark_mode = to_dark_mode
+        
+        # Get the application instance
+        app = QApplication.instance()
+        
+        if self.dark_mode:
+            # Apply dark theme (qdarkstyle, or a simple fallback)
+            app.setStyleSheet(dark_stylesheet())
+            # Use white logo for dark mode
+            self.logo_name = assets.LOGO_WHITE
+        else:
+            # Apply light theme (default Qt style)
+            app.setStyleSheet("")
+            # Use dark logo for light mode
+            self.logo_name = assets.LOGO_DARK
+        
+        # Update logo display
+        self.update_logo_size()
+        
+        # Update status message
+        mode_name = "Dark Mode" if self.dark_mode else "Light Mode"
+        self.statusBar().showMessage(f"Switched to {mode_name}")
+    
+    def load_image(self):
+        """Load and display an image, then extract its EXIF metadata."""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Select Image File",
+            "",
+            "Image Files (*.jpg *.jpeg *.png *.tiff *.tif *.webp *.bmp *.gif);;All Files (*)"
+        )
+       
+        
+        if file_path:
+            self.open_image(file_path)
+
+    def open_image(self, file_path):
+        """Display an image and its EXIF metadata (from the dialog or the gallery)."""
+        self.current_image_path = file_path
+
+        self.display_image(file_path)
+        self.extract_and_display_metadata(file_path)
+        self.save_button.setEnabled(True)
+        self.edit_button.setEnabled(True)
+        self.statusBar().showMessage(f"Loaded: {os.path.basename(file_path)}")
+
+    def open_folder(self, _=None, folder=None):
+        """Show a folder's images in the gallery dock."""
+        if folder is None:
+            folder = QFileDialog.getExistingDirectory(self, "Select Folder")
+        if not folder:
+            return
+        if self.gallery is None:
+            from gallery import GalleryPanel
+            self.gallery = GalleryPanel(self)
+            self.gallery.image_selected.connect(self.open_image)
+            self.addDockWidget(Qt.BottomDockWidgetArea, self.gallery)
+        self.gallery.show()
+        try:
+            self.gallery.open_folder(folder)
+        except OSError as e:
+            self.statusBar().showMessage(f"Error opening folder: {e}")
+            return
+        self.statusBar().showMessage(f"{len(self.gallery.model.paths)} images in {folder}")
+    
+    def randomize_metadata(self):
+        """Randomize the EXIF metadata of the current image (does not save automatically)."""
+        
+        if not self.current_image_path:
+            return
+
+        try:
+            #Get current Exif Metadata (parsed once per session, edits included)
+            document = self.current_document()
+            policy = load_policy()
+
+            # Start from the file's own values; otherwise every click shifts
+            # already shifted dates and moves an already moved position again
+            document.discard_edits()
+
+            #Apply the scrub policy; changes are recorded as pending edits for display and potential saving
+            randomize_document(document, get_provider(), policy)
+
+            # Shift every date by the session's offset, so images edited together stay consistent
+            apply_time_shift([document], policy.time)
+
+            # Move the GPS position (if any) to the center of its ~1 km grid cell
+            apply_gps([document], policy.gps or GpsSettings())
+            
+            # Update display without saving
+            self.update_metadata_display()
+            self.statusBar().showMessage("Metadata randomized (not saved yet - click 'Save Image' to apply)")
+        
+        except Exception as e:
+            self.statusBar().showMessage(f"Error reading EXIF data: {str(e)}")
+
+    def display_image(self, file_path):
+        """Display the selected image in the image panel (decoded in the background)."""
+        try:
+            available = self.image_scroll.viewport().size()
+            max_size = preview_size(available.width(), available.height())
+            key = PreviewCache.key_for(file_path, max_size)
+        except OSError as e:
+            self.image_label.setText(f"Error loading image: {str(e)}")
+            self.statusBar().showMessage("Error loading image")
+            return
+
+        self._preview_key = key
+        cached = self.preview_cache.get(key)
+        if cached is not None:
+            self.show_preview(cached)
+            return
+
+        task = PreviewTask(key, file_path, max_size)
+        task.signals.finished.connect(self.on_preview_loaded)
+        self._preview_signals.add(task.signals)  # keep alive until delivered
+        self.thread_pool.start(task)
+
+    def on_preview_loaded(self, key, qimage, error):
+        """Called on the GUI thread when a background preview decode finishes."""
+        self._preview_signals.discard(self.sender())
+        if not qimage.isNull():
+            self.preview_cache.put(key, qimage)
+        if key != self._preview_key:
+            return  # the user already moved on to another image or size
+        if qimage.isNull():
+            self.image_label.setText(f"Error loading image: {error}" if error else "Failed to load image")
+            self.statusBar().showMessage("Error: Failed to load image")
+        else:
+            self.show_preview(qimage)
+
+    def show_preview(self, qimage):
+        """Scale a decoded preview to the viewport and show it."""
+        # Scale image to fit while maintaining aspect ratio (cheap, the preview is small)
+        available = self.image_scroll.viewport().size()
+        scaled_pixmap = QPixmap.fromImage(qimage).scaled(
+            available,
+            Qt.KeepAspectRatio,
+            Qt.SmoothTransformation
+        )
+        self.image_label.setPixmap(scaled_pixmap)
+        self.image_label.setStyleSheet("")  # Remove placeholder styling
+    
+    def extract_and_display_metadata(self, file_path):
+        """Extract and display EXIF metadata from the image."""
+        try:
+            # Read just the EXIF block, the image itself is never opened
+            self.document = get_document(file_path)
+            exif_data = self.document.values()
+            
+            if exif_data:
+                self.update_metadata_display()
+            else:
+                self.show_metadata_message("No EXIF metadata found in this image.")
+                    
+        except Exception as e:
+            self.document = None
+            error_message = f"Error reading EXIF data: {str(e)}\n\n"
+            error_message += "This could be due to:\n"
+            error_message += "- Unsupported image format\n"
+            error_message += "- Corrupted image file\n"
+            error_message += "- Image has no EXIF data"
+            self.show_metadata_message(error_message)
+            self.statusBar().showMessage("Error reading EXIF data")
+
+       # self.load_button = QPushButton("Load Image")
+        #self.load_button.clicked.connect(self.load_image)
+        #self.load_button.setMinimumHeight(30)
+        #toolbar.addWidget(self.load_button)
+
+    def current_document(self):
+        """
+        The session document for the current image.
+
+        Goes through the cache every time so a file changed on disk is
+        re-parsed instead of showing stale values.
+        """
+        if self.current_image_path:
+            self.document = get_document(self.current_image_path)
+        return self.document
+
+    def update_metadata_display(self):
+        """Refresh the metadata table from the current document (unsaved edits in bold)."""
+        exif_data = self.document.values() if self.document else None
+        if exif_data:
+            self.metadata_model.set_values(exif_data, self.document.edits)
+            self.metadata_message.hide()
+            self.metadata_table.show()
+
+    def show_metadata_message(self, text):
+        """Show a message in place of the metadata table."""
+        self.metadata_model.clear()
+        self.metadata_table.hide()
+        self.metadata_message.setText(text)
+        self.metadata_message.show()
+    
+    def write_metadata(self, _=None):
+        """Open the metadata editor dialog (does not save automatically)."""
+        selected = self.gallery.selected_paths() if self.gallery is not None and self.gallery.isVisible() else []
+        if len(selected) > 1:
+            self.bulk_edit_metadata(selected)
+            return
+        if not self.current_image_path:
+            return
+        from Metadata_window import MetadataEditorDialog  # only needed once someone edits
+        dlg = MetadataEditorDialog(self, self.current_image_path)
+        if dlg.exec_() == dlg.Accepted:
+            # The dialog wrote its edits into the shared document, just show it
+            self.update_metadata_display()
+            self.statusBar().showMessage("Metadata edited (not saved yet - click 'Save Image' to apply)")
+
+    def bulk_edit_metadata(self, paths):
+        """Edit the tags shared by several images and save them all (in the background)."""
+        from Metadata_window import BulkEditTask, MetadataEditorDialog
+        from batch import output_path_for  # keeps the batch machinery out of GUI startup
+        dlg = MetadataEditorDialog(self, paths)
+        if dlg.exec_() != dlg.Accepted or not dlg.edits:
+            return
+        if dlg.overwrite_check.isChecked():
+            jobs = [(path, path) for path in paths]
+        else:
+            jobs = [(path, output_path_for(path, os.path.dirname(path), None)) for path in paths]
+
+        task = BulkEditTask(jobs, dlg.edits)
+        task.signals.progress.connect(
+            lambda done, total: self.statusBar().showMessage(f"Saving edits... {done}/{total}"))
+        task.signals.finished.connect(self.on_bulk_edit_finished)
+        self._bulk_signals = task.signals  # keep alive until delivered
+        self.edit_button.setEnabled(False)
+        self.thread_pool.start(task)
+
+    def on_bulk_edit_finished(self, results):
+        self.edit_button.setEnabled(True)
+        failed = [(src, error) for src, error, _ in results if error is not None]
+        reencoded = sum(1 for _, _, mode in results if mode == "re-encoded")
+        message = f"Edited {len(results) - len(failed)} images"
+        if reencoded:
+            message += f" ({reencoded} re-encoded)"
+        if failed:
+            message += f", {len(failed)} failed (first: {os.path.basename(failed[0][0])}: {failed[0][1]})"
+        self.statusBar().showMessage(message)
+        if self.gallery is not None:
+            self.gallery.refresh()
+        if self.current_image_path:
+            # Re-read the current image if it was overwritten
+            self.document = self.current_document()
+            self.update_metadata_display()
+
+    def save_image(self):
+        """Save the image with current metadata to a new file."""
+        if not self.current_image_path or not self.document or not self.document.values():
+            self.statusBar().showMessage("No image or metadata to save")
+            return
+        
+        # Get save file path from user
+        default_name = os.path.splitext(os.path.basename(self.current_image_path))[0]
+        default_ext = os.path.splitext(self.current_image_path)[1]
+        suggested_name = f"{default_name}_modified{default_ext}"
+        suggested_path = os.path.join(os.path.dirname(self.current_image_path), suggested_name)
+        
+        save_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Save Image As",
+            suggested_path,
+            "JPEG Images (*.jpg *.jpeg);;PNG Images (*.png);;TIFF Images (*.tiff *.tif);;WebP Images (*.webp);;All Files (*)"
+        )
+        
+        if save_path:
+            try:
+                # Original EXIF (from the cached bytes) with the pending edits applied
+                document = self.current_document()
+                blocks = load_policy().blocks or BlockSettings()
+                    
+                mode = None
+                if os.path.abspath(save_path) == document.path:
+                    # Same-length edits over the source only rewrite the changed bytes
+                    try:
+                        patch_blocks_in_place(document, blocks)
+                        mode = "patched in place"
+                    except PatchError:
+                        pass
+
+                if mode is None:
+                    # Splice the new EXIF into the original file (JPEGs are not re-encoded);
+                    # the thumbnail and MakerNote are handled on the raw bytes
+                    payload = build_payload(document, blocks)
+                    # The user picked the name, so a format change is allowed to re-encode
+                    lossless = save_with_exif(self.current_image_path, save_path, payload, reencode=True)
+                    mode = "lossless" if lossless else "re-encoded"
+
+                if os.path.abspath(save_path) == document.path:
+                    # The edits are in the file now; its tree (and offsets) changed
+                    # with them, so the document is parsed again from the new bytes
+                    session.invalidate(document.path)
+                    self.current_document()
+                    self.update_metadata_display()
+                    
+                self.statusBar().showMessage(f"Image saved successfully to: {os.path.basename(save_path)} ({mode})")
+            except Exception as e:
+                self.statusBar().showMessage(f"Error saving image: {str(e)}")
+
+    def resizeEvent(self, event):
+        """Handle window resize events safely."""
+        super().resizeEvent(event)
+        
+        # Update logo size dynamically (safe with cached pixmap)
+        self.update_logo_size()
+
+        # Re-fit the image preview after the resize settles
+        if self.current_image_path:
+            self._resize_timer.start()
+    
+    def refit_preview(self):
+        """Show the current image at the new viewport size (from cache when possible)."""
+        if self.current_image_path:
+            self.display_image(self.current_image_path)
+
+    def update_logo_size(self):
+        """
+        Update logo size based on toolbar height.
+        Adjust MAX_LOGO_HEIGHT and MIN_LOGO_HEIGHT to change logo size.
+        """
+        # Configuration - easy to edit
+        MAX_LOGO_HEIGHT = 200 / 3  # Maximum logo height in pixels
+        MIN_LOGO_HEIGHT = 100  # Minimum logo height in pixels
+        TOOLBAR_PADDING = 8   # Padding from toolbar edges
+        
+        # Safety checks
+        if not hasattr(self, 'logo_label'):
+            return
+        if not hasattr(self, 'toolbar'):
+            return
+        
+        try:
+            # Calculate logo height based on toolbar size
+            toolbar_height = self.toolbar.height()
+            logo_height = max(MIN_LOGO_HEIGHT, min(MAX_LOGO_HEIGHT, toolbar_height - TOOLBAR_PADDING))
+            
+            # Decoded at this height once, then cached
+            scaled = assets.pixmap(self.logo_name, logo_height)
+            if not scaled.isNull():
+                self.logo_label.setPixmap(scaled)
+        except Exception as e:
+            # Silently handle any errors to prevent crashes
+            print(f"Logo resize error (non-critical): {e}")
+    
+    def toggle_debug_panel(self):
+        """Show or hide the Debug Timings dock (see debug_panel.py)."""
+        if self.debug_panel is None:
+            from debug_panel import DebugPanel
+            self.debug_panel = DebugPanel(self)
+            self.addDockWidget(Qt.BottomDockWidgetArea, self.debug_panel)
+            self.debug_panel.show()
+            return
+        self.debug_panel.setVisible(not self.debug_panel.isVisible())
+
+    def show_about(self):
+        """Show about dialog."""
+        from PyQt5.QtWidgets import QMessageBox
+        QMessageBox.about(
+            self,
+            "About EXIFuscator",
+            "EXIFbuscator 1.0\n\n"
+            "A python GUI program to manage EXIF metadata in images and obfuscate values such as location coordinates and time.\n\n"
+            "Made by Angel Juarez, Erik Shaver, and Daniel\n\n"
+            "Logo made by @gabrielmaroni on github"
+        )
@@ -0,0 +1,387 @@
+"""
+Spool directory watcher.
+
+Scrubs images as they land in a directory: new files are picked up with
+inotify on Linux (polling everywhere else), held back until they stop
+changing, then scrubbed by a small pool of worker threads and written
+atomically to the output directory.
+
+Usage:
+    python main.py watch SPOOL/ -o scrubbed/ --remove-source
+"""
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import queue
+import select
+import signal
+import struct
+import sys
+import threading
+import time
+
+import instrumentation
+from batch import (IMAGE_EXTENSIONS, add_gps_arguments, add_trace_arguments,
+                   block_settings_from_args, gps_settings_from_args, time_settings_from_args,
+                   trace_from_args)
+from obfuscate import DB_PATH, scrub_file
+from scrub_policy import PolicyError, load_policy
+
+# inotify constants (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+def is_candidate(name):
+    """Skip hidden/temp files (ours included) and anything that isn't an image."""
+    if name.startswith(".") or name.endswith((".tmp", ".part")):
+        return False
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+class InotifySource:
+    """Reports files closed after writing or moved into the directory (Linux only)."""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.directory = directory
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+
+    def poll(self, timeout):
+        """Wait up to timeout seconds; return the paths that changed."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        paths = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\x00"))
+            offset += length
+            if name and is_candidate(name):
+                paths.append(os.path.join(self.directory, name))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingSource:
+    """Portable fallback: rescans the directory and reports new or changed files."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.snapshot = {}
+
+    def poll(self, timeout):
+        time.sleep(timeout)
+        current = {}
+        changed = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or not is_candidate(entry.name):
+                    continue
+                st = entry.stat()
+                key = (st.st_mtime_ns, st.st_size)
+                current[entry.path] = key
+                if self.snapshot.get(entry.path) != key:
+                    changed.append(entry.path)
+        # Only files still in the directory are remembered, so memory
+        # follows the spool size, not the number of files ever seen
+        self.snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def open_source(directory, force_polling=False):
+    """inotify where available, polling otherwise."""
+    if not force_polling and sys.platform.startswith("linux"):
+        try:
+            return InotifySource(directory)
+        except (OSError, AttributeError):
+            pass
+    return PollingSource(directory)
+
+
+class Debouncer:
+    """
+    Holds paths back until their size and mtime stop changing.
+
+    A file counts as finished once it has looked the same for `settle`
+    seconds, which covers uploaders that write in several passes.
+    """
+
+    def __init__(self, settle=2.0):
+        self.settle = settle
+        self.pending = {}  # path -> [stat key, first seen, last change]
+
+    def touch(self, path, now=None, first_seen=None):
+        now = time.monotonic() if now is None else now
+        entry = self.pending.get(path)
+        if entry is None:
+            self.pending[path] = [None, first_seen or now, now]
+        else:
+            entry[2] = now
+
+    def ready(self, now=None):
+        """Yield (path, first_seen) for files that have settled."""
+        now = time.monotonic() if now is None else now
+        for path, entry in list(self.pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self.pending[path]  # deleted or moved away again
+                continue
+            key = (st.st_mtime_ns, st.st_size)
+            if key != entry[0]:
+                entry[0] = key
+                entry[2] = now
+            elif now - entry[2] >= self.settle:
+                del self.pending[path]
+                yield path, entry[1]
+
+
+class WatchStats:
+    """Counters for queue depth, throughput and arrival-to-written latency."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.scrubbed = 0
+        self.failed = 0
+        self.deferred = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.latency_last = 0.0
+
+    def record(self, latency, ok):
+        with self.lock:
+            if ok:
+                self.scrubbed += 1
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+                self.latency_last = latency
+            else:
+                self.failed += 1
+
+    def snapshot(self, queue_depth, pending):
+        with self.lock:
+            return {
+                "queue_depth": queue_depth,
+                "pending": pending,
+                "scrubbed": self.scrubbed,
+                "failed": self.failed,
+                "deferred": self.deferred,
+                "latency_avg_s": round(self.latency_total / self.scrubbed, 4) if self.scrubbed else 0.0,
+                "latency_max_s": round(self.latency_max, 4),
+                "latency_last_s": round(self.latency_last, 4),
+            }
+
+
+class SpoolWatcher:
+    """
+    Watch input_dir and scrub every settled image into output_dir.
+
+    Args:
+        workers: scrubbing threads (saves are I/O-bound, threads are enough)
+        queue_size: bound on settled-but-unscrubbed files; when it's full,
+            files simply stay pending, so bursts don't grow memory
+        remove_source: delete the spool file once its scrubbed copy exists
+        reencode: re-encode files that can't be saved losslessly instead
+            of failing them
+    """
+
+    def __init__(self, input_dir, output_dir, workers=2, queue_size=64, settle=2.0,
+                 interval=0.5, force_polling=False, remove_source=False,
+                 db_path=DB_PATH, seed=None, gps=None, policy=None, blocks=None, dates=None,
+                 reencode=False, log=print):
+        if os.path.abspath(input_dir) == os.path.abspath(output_dir):
+            raise ValueError("Output directory must differ from the watched directory")
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.interval = interval
+        self.remove_source = remove_source
+        self.db_path = db_path
+        self.seed = seed
+        self.gps = gps
+        self.policy = policy
+        self.blocks = blocks
+        self.dates = dates
+        self.reencode = reencode
+        self.log = log
+        self.source = open_source(input_dir, force_polling)
+        self.debouncer = Debouncer(settle)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats = WatchStats()
+        self.stop_event = threading.Event()
+        self.threads = [
+            threading.Thread(target=self._worker, name=f"scrub-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+
+    @property
+    def mode(self):
+        return "inotify" if isinstance(self.source, InotifySource) else "polling"
+
+    def snapshot(self):
+        return self.stats.snapshot(self.queue.qsize(), len(self.debouncer.pending))
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            path, arrived = item
+            dst = os.path.join(self.output_dir, os.path.basename(path))
+            try:
+                scrub_file(path, dst, self.db_path, self.seed, self.gps, self.policy, self.blocks,
+                           self.dates, self.reencode)
+                if self.remove_source:
+                    os.remove(path)
+                self.stats.record(time.monotonic() - arrived, True)
+            except Exception as e:
+                self.stats.record(0.0, False)
+                self.log(f"FAILED {path}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _dispatch(self):
+        for path, arrived in self.debouncer.ready():
+            try:
+                self.queue.put_nowait((path, arrived))
+            except queue.Full:
+                # Try again next tick; keep the original arrival time
+                self.debouncer.touch(path, first_seen=arrived)
+                self.stats.deferred += 1
+
+    def run(self, stats_interval=10.0, stats_file=None, metrics_file=None):
+        """
+        Watch until stop() is called (or Ctrl+C).
+
+        Args:
+            stats_file: rewritten with the latest stats as JSON at every report
+            metrics_file: rewritten with the instrumentation timings (Prometheus text)
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        for thread in self.threads:
+            thread.start()
+
+        # Files already sitting in the spool are scrubbed too
+        for name in sorted(os.listdir(self.input_dir)):
+            if is_candidate(name):
+                self.debouncer.touch(os.path.join(self.input_dir, name))
+
+        next_report = time.monotonic() + stats_interval
+        try:
+            while not self.stop_event.is_set():
+                for path in self.source.poll(self.interval):
+                    self.debouncer.touch(path)
+                self._dispatch()
+                if time.monotonic() >= next_report:
+                    self.report(stats_file, metrics_file)
+                    next_report = time.monotonic() + stats_interval
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+            self.report(stats_file, metrics_file)
+
+    def report(self, stats_file=None, metrics_file=None):
+        snapshot = self.snapshot()
+        if metrics_file:
+            instrumentation.write_prometheus(metrics_file)
+        if stats_file:
+            with open(stats_file + ".tmp", "w") as fp:
+                json.dump(snapshot, fp)
+            os.replace(stats_file + ".tmp", stats_file)
+        self.log(" ".join(f"{k}={v}" for k, v in snapshot.items()))
+
+    def stop(self):
+        self.stop_event.set()
+
+    def shutdown(self):
+        """Finish what's queued, then stop the workers."""
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            if thread.is_alive():
+                thread.join()
+        self.source.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="exifuscator watch",
+        description="Scrub images as they arrive in a spool directory.",
+    )
+    parser.add_argument("input_dir", help="directory to watch")
+    parser.add_argument("-o", "--output-dir", required=True, help="where scrubbed files are written")
+    parser.add_argument("-j", "--workers", type=int, default=2, help="scrubbing threads (default: %(default)s)")
+    parser.add_argument("--queue-size", type=int, default=64, help="max settled files waiting for a worker (default: %(default)s)")
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds a file must stay unchanged (default: %(default)s)")
+    parser.add_argument("--interval", type=float, default=0.5, help="poll/wakeup interval in seconds (default: %(default)s)")
+    parser.add_argument("--poll", action="store_true", help="always poll instead of using inotify")
+    parser.add_argument("--remove-source", action="store_true", help="delete spool files after scrubbing")
+    parser.add_argument("--stats-interval", type=float, default=10.0, help="seconds between stats lines (default: %(default)s)")
+    parser.add_argument("--stats-file", help="also write the latest stats here as JSON")
+    parser.add_argument("--db", default=DB_PATH, help="metadata database (default: %(default)s)")
+    parser.add_argument("--seed", help="seed for reproducible values")
+    add_gps_arguments(parser)
+    add_trace_arguments(parser)
+    return parser
+
+
+def main(argv=None):
+    """Command line entry point. Returns a process exit code."""
+    args = build_parser().parse_args(argv)
+    log = lambda line: print(line, file=sys.stderr, flush=True)
+    try:
+        load_policy(args.policy)
+    except (OSError, PolicyError) as e:
+        log(f"Bad policy: {e}")
+        return 2
+    trace_from_args(args)
+    watcher = SpoolWatcher(
+        args.input_dir,
+        args.output_dir,
+        workers=args.workers,
+        queue_size=args.queue_size,
+        settle=args.settle,
+        interval=args.interval,
+        force_polling=args.poll,
+        remove_source=args.remove_source,
+        db_path=os.path.abspath(args.db),
+        seed=args.seed,
+        gps=gps_settings_from_args(args),
+        policy=args.policy,
+        blocks=block_settings_from_args(args),
+        dates=time_settings_from_args(args),
+        reencode=args.allow_reencode,
+        log=log,
+    )
+    # Stop cleanly (finishing queued files) when a service manager stops us
+    signal.signal(signal.SIGTERM, lambda *_: watcher.stop())
+    log(f"Watching {args.input_dir} ({watcher.mode}), writing to {args.output_dir}")
+    watcher.run(args.stats_interval, args.stats_file, args.metrics)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())